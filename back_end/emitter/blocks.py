@@ -0,0 +1,900 @@
+__author__ = 'samyvilar'
+
+from math import copysign
+from struct import Struct
+from collections import defaultdict, namedtuple
+from itertools import izip, imap, product
+
+from back_end.virtual_machine.instructions.architecture import instr_objs, Jump, Halt, SystemCall, Pass
+from back_end.virtual_machine.instructions.architecture import WideInstruction, VariableLengthInstruction
+from back_end.virtual_machine.instructions.architecture import Push, PushHalf, PushQuarter, PushOneEighth
+from back_end.virtual_machine.instructions.architecture import RelativeJump, AbsoluteJump, Call, AbsoluteCall, Return
+from back_end.virtual_machine.instructions.architecture import JumpTable, JumpTableHalf, JumpTableQuarter
+from back_end.virtual_machine.instructions.architecture import JumpTableOneEighth, LoadInstructionPointer
+from back_end.virtual_machine.instructions.architecture import LoadBaseStackPointer, SetBaseStackPointer
+from back_end.virtual_machine.instructions.architecture import LoadStackPointer, SetStackPointer, Allocate, Enter, Leave
+from back_end.virtual_machine.instructions.architecture import AddressOfLocal, LoadFlagInstruction
+from back_end.virtual_machine.instructions.buffer import signed_word, word_mask, LocationTable
+import back_end.virtual_machine.block_stack as block_stack
+from back_end.virtual_machine.block_stack import kinds, sizes, masks, instruction, camel_case, literal, stack_address
+from back_end.virtual_machine.block_stack import pop, convert, address_of_local, load_local, store_local
+from back_end.virtual_machine.block_stack import load_single, set_single, dup_single, swap_single
+from back_end.emitter.system_calls import __ids__ as system_call_ids
+from back_end.emitter.cpu import word_size, std_files, logger
+
+# Pure python virtual machine running the same (linked) machine words as the C virtual machine.
+# Each basic block is compiled the first time its jumped to into a python function taking and returning the stack
+# pointer, base pointer and flags along with the next block, so evaluate simply calls one block after the other.
+# Within a block, stack values are kept in local variables (s<depth>) until they have to be in memory: at the end of
+# the block, before calls, instructions moving or exposing the stack pointer and before locals below the base pointer
+# are accessed (locals are allocated by pushing their initial values), so no pointer can reference them beforehand.
+# Memory is only accessed through the functions of its accessors, either VirtualMemory (a dict of words) or the
+# (far smaller and faster) PagedMemory, whose pages of bytes are allocated as they are accessed.
+
+sign_bits = dict((kind, 1 << (8 * size - 1)) for kind, size in sizes.iteritems())
+shift_masks = dict(izip(kinds, (8 * word_size - 1, 31, 31, 31)))  # shifted values smaller than an int are ints ...
+suffixes = dict(izip(kinds, ('', '_half', '_quarter', '_one_eighth')))  # of the memory accessors ...
+
+float_kinds = '', 'Half'  # double and float ...
+as_float = dict(izip(float_kinds, ('as_double({0})', 'as_single({0})')))
+from_float = dict(izip(float_kinds, ('from_double({0})', 'from_single({0})')))
+
+number_of_addressable_words = 1 << 32  # same address space as the C virtual machine (see vm.h) ...
+alignment_mask = word_size - 1
+
+page_shift = 16
+page_size = 1 << page_shift
+page_mask = page_size - 1
+
+# bits of the flags word, same as cpu.h (see Compare in cpu.c) ...
+flag_indices = dict(izip(
+    (
+        'NonZeroFlag', 'ZeroFlag',
+        'NonCarryBorrowFlag', 'CarryBorrowFlag', 'NonZeroNonCarryBorrowFlag', 'ZeroCarryBorrowFlag',
+        'NonMostSignificantBitFlag', 'MostSignificantBitFlag',
+        'NonZeroNonMostSignificantBitFlag', 'ZeroMostSignificantBitFlag'
+    ),
+    xrange(10)
+))
+zero_flags = sum(1 << flag_indices[name] for name in (
+    'ZeroFlag', 'NonCarryBorrowFlag', 'ZeroCarryBorrowFlag', 'NonMostSignificantBitFlag', 'ZeroMostSignificantBitFlag'
+))
+non_zero_flags = dict(  # by (carry/borrow, most significant bit of the difference) ...
+    ((carry, msb), sum(1 << flag_indices[name] for name in (
+        'NonZeroFlag',
+        'CarryBorrowFlag' if carry else 'NonCarryBorrowFlag',
+        'ZeroCarryBorrowFlag' if carry else 'NonZeroNonCarryBorrowFlag',
+        'MostSignificantBitFlag' if msb else 'NonMostSignificantBitFlag',
+        'ZeroMostSignificantBitFlag' if msb else 'NonZeroNonMostSignificantBitFlag',
+    ))) for carry, msb in product((False, True), (False, True))
+)
+float_flags = dict(  # floats never borrow, only their sign is kept ...
+    (negative, non_zero_flags[False, negative] & ~((1 << flag_indices['NonCarryBorrowFlag']) |
+                                                  (1 << flag_indices['NonZeroNonCarryBorrowFlag'])))
+    for negative in (False, True)
+)
+
+
+def compare_wrapping(kind):  # words and halves, the difference wraps around ...
+    mask, sign_bit = masks[kind], sign_bits[kind]
+
+    def compare(left, right):
+        if left == right:
+            return zero_flags
+        return non_zero_flags[right > left, ((left - right) & mask) >= sign_bit]
+    return compare
+
+
+def compare_promoted(kind):  # smaller values are promoted to (signed) ints, any negative difference is then huge ...
+    sign_bit = sign_bits[kind]
+
+    def compare(left, right):
+        if left == right:
+            return zero_flags
+        return non_zero_flags[right > left, right > left or left - right >= sign_bit]
+    return compare
+
+
+double_struct, word_struct, single_struct, half_word_struct = Struct('=d'), Struct('=Q'), Struct('=f'), Struct('=I')
+
+
+def as_double(word):
+    return double_struct.unpack(word_struct.pack(word))[0]
+
+
+def from_double(value):
+    return word_struct.unpack(double_struct.pack(value))[0]
+
+
+def as_single(half_word):
+    return single_struct.unpack(half_word_struct.pack(half_word))[0]
+
+
+def from_single(value):
+    try:
+        return half_word_struct.unpack(single_struct.pack(value))[0]
+    except OverflowError as _:  # too large for a float ...
+        return from_single(copysign(float('inf'), value))
+
+
+def divide(left, right):  # floats divide by zero ...
+    try:
+        return left / right
+    except ZeroDivisionError as _:
+        return float('nan') if left == 0 or left != left else copysign(float('inf'), left) * copysign(1, right)
+
+
+def compare_float(to_float):
+    def compare(left, right):
+        difference = to_float(left) - to_float(right)
+        return zero_flags if difference == 0.0 else float_flags[difference < 0.0]
+    return compare
+
+
+def given_flags(flags, _):  # flags which aren't the result of a comparison (see evaluate) ...
+    return flags
+
+
+# Compare only records its operands, the flags are (comparison, left, right), so Load*Flag instructions compute the
+# one flag they need, when the comparison is in the same block as an expression of its operands (using the same
+# unsigned values as the comparisons above) ...
+flag_expressions = dict(izip(
+    ('NonZeroFlag', 'ZeroFlag', 'NonCarryBorrowFlag', 'CarryBorrowFlag', 'NonZeroNonCarryBorrowFlag',
+     'ZeroCarryBorrowFlag', 'NonMostSignificantBitFlag', 'MostSignificantBitFlag',
+     'NonZeroNonMostSignificantBitFlag', 'ZeroMostSignificantBitFlag'),
+    ('{l} != {r}', '{l} == {r}', '{l} >= {r}', '{l} < {r}', '{l} > {r}',
+     '{l} <= {r}', 'not {msb}', '{msb}',
+     '{l} != {r} and not {msb}', '{l} == {r} or {msb}')
+))
+float_flag_expressions = dict(izip(  # of the difference, which may be NaN ...
+    ('NonZeroFlag', 'ZeroFlag', 'NonCarryBorrowFlag', 'CarryBorrowFlag', 'NonZeroNonCarryBorrowFlag',
+     'ZeroCarryBorrowFlag', 'NonMostSignificantBitFlag', 'MostSignificantBitFlag',
+     'NonZeroNonMostSignificantBitFlag', 'ZeroMostSignificantBitFlag'),
+    ('not {d} == 0.0', '{d} == 0.0', '{d} == 0.0', 'False', 'False',
+     '{d} == 0.0', 'not {d} < 0.0', '{d} < 0.0',
+     'not ({d} == 0.0 or {d} < 0.0)', '{d} == 0.0 or {d} < 0.0')
+))
+
+
+def flag_expression(flag_name, kind, is_float, left, right):  # floats compare their difference (right) ...
+    if is_float:
+        return float_flag_expressions[flag_name].format(d=right)
+    return flag_expressions[flag_name].format(l=left, r=right, msb=(
+        '((({l} - {r}) & {m}) >= {s})' if sizes[kind] >= 4 else '({l} < {r} or {l} - {r} >= {s})'
+    ).format(l=left, r=right, m=literal(masks[kind]), s=literal(sign_bits[kind])))
+
+
+def word_accessors(memory):
+    # load/store functions by size of a memory of word aligned addresses, accesses of any other size or alignment are
+    # masked/shifted out of the words they span ...
+    get = memory.get
+
+    def loader(size, mask):
+        def load(address):
+            offset = address & alignment_mask
+            if offset + size > word_size:  # spans two words ...
+                address -= offset
+                return (get(address, 0) >> (offset << 3) | get(address + word_size, 0) << ((word_size - offset) << 3)) \
+                    & mask
+            return get(address - offset, 0) >> (offset << 3) & mask
+        return load
+
+    def storer(size, mask):
+        def store(address, value):
+            offset = address & alignment_mask
+            if not offset and size == word_size:
+                memory[address] = value
+                return
+            address, shift = address - offset, offset << 3
+            memory[address] = get(address, 0) & ~(mask << shift) | (value << shift) & word_mask
+            if offset + size > word_size:  # spans two words ...
+                shift = (word_size - offset) << 3
+                memory[address + word_size] = get(address + word_size, 0) & ~(mask >> shift) | value >> shift
+        return store
+
+    accessors = {}
+    for kind in kinds:
+        accessors['load' + suffixes[kind]] = loader(sizes[kind], masks[kind])
+        accessors['store' + suffixes[kind]] = storer(sizes[kind], masks[kind])
+
+    load_byte, store_byte = accessors['load_one_eighth'], accessors['store_one_eighth']
+
+    def read(address, number_of_bytes):
+        return bytearray(imap(load_byte, xrange(address, address + number_of_bytes)))
+
+    def write(address, values):
+        for address, value in izip(xrange(address, address + len(values)), bytearray(values)):
+            store_byte(address, value)
+
+    def copy(destination, source, number_of_bytes):  # (overlapping) blocks of memory ...
+        if (destination | source | number_of_bytes) & alignment_mask:
+            write(destination, read(source, number_of_bytes))
+        else:
+            memory.update(izip(
+                xrange(destination, destination + number_of_bytes, word_size),
+                [get(address, 0) for address in xrange(source, source + number_of_bytes, word_size)]
+            ))
+
+    accessors.update(read=read, write=write, copy=copy)
+    return accessors
+
+
+def page_accessors(pages):
+    # load/store functions by size of a memory of pages (bytearrays), accesses spanning two pages go through strings
+    # of bytes, blocks of memory are copied as slices ...
+    def read(address, number_of_bytes):
+        offset = address & page_mask
+        if offset + number_of_bytes <= page_size:
+            return pages[address >> page_shift][offset:offset + number_of_bytes]
+        values = bytearray()
+        while number_of_bytes:
+            size = min(number_of_bytes, page_size - offset)
+            values += pages[address >> page_shift][offset:offset + size]
+            address, number_of_bytes, offset = address + size, number_of_bytes - size, 0
+        return values
+
+    def write(address, values):
+        offset, number_of_bytes = address & page_mask, len(values)
+        if offset + number_of_bytes <= page_size:
+            pages[address >> page_shift][offset:offset + number_of_bytes] = values
+            return
+        values, start = memoryview(bytearray(values)), 0
+        while start < number_of_bytes:
+            size = min(number_of_bytes - start, page_size - offset)
+            pages[address >> page_shift][offset:offset + size] = values[start:start + size]
+            address, start, offset = address + size, start + size, 0
+
+    def loader(size, value_struct):
+        unpack, last = value_struct.unpack_from, page_size - size
+
+        def load(address):
+            offset = address & page_mask
+            if offset <= last:
+                return unpack(pages[address >> page_shift], offset)[0]
+            return unpack(read(address, size))[0]
+        return load
+
+    def storer(size, value_struct):
+        pack, pack_into, last = value_struct.pack, value_struct.pack_into, page_size - size
+
+        def store(address, value):
+            offset = address & page_mask
+            if offset <= last:
+                pack_into(pages[address >> page_shift], offset, value)
+            else:
+                write(address, pack(value))
+        return store
+
+    def load_byte(address):
+        return pages[address >> page_shift][address & page_mask]
+
+    def store_byte(address, value):
+        pages[address >> page_shift][address & page_mask] = value
+
+    def copy(destination, source, number_of_bytes):  # read makes a copy, so blocks may overlap ...
+        write(destination, read(source, number_of_bytes))
+
+    accessors = {}
+    for kind, value_struct in izip(kinds[:-1], imap(Struct, ('=Q', '=I', '=H'))):
+        accessors['load' + suffixes[kind]] = loader(sizes[kind], value_struct)
+        accessors['store' + suffixes[kind]] = storer(sizes[kind], value_struct)
+    accessors.update(
+        load_one_eighth=load_byte, store_one_eighth=store_byte, read=read, write=write, copy=copy
+    )
+    return accessors
+
+
+class CPU(object):
+    def __init__(self):
+        self.instr_pointer = self.stack_pointer = self.base_pointer = self.flags = 0
+
+
+class VirtualMemory(defaultdict):  # word aligned (byte) addresses to unsigned words ...
+    def __init__(self, number_of_words=number_of_addressable_words):
+        super(VirtualMemory, self).__init__(int)
+        self.end_of_physical_addr = number_of_words * word_size
+        self.accessors = word_accessors(self)
+        self.blocks = Blocks(self)
+        self.locations = LocationTable()
+
+    def word(self, address):
+        return self.get(address, 0)
+
+    def location(self, address):
+        return self.locations.location(address)
+
+    def load_words(self, words, relocations=(), start_addr=0, locations=None):
+        # the machine starts at 0, so nothing to relocate ...
+        self.update(izip(xrange(start_addr, start_addr + len(words) * word_size, word_size), words))
+        self.locations = self.locations if locations is None else locations
+        self.blocks.clear()
+
+
+class Pages(dict):  # page number to page, each one allocated (zeroed) the first time its accessed ...
+    def __missing__(self, page_number):
+        page = self[page_number] = bytearray(page_size)
+        return page
+
+
+class PagedMemory(object):
+    def __init__(self, number_of_words=number_of_addressable_words):
+        self.end_of_physical_addr = number_of_words * word_size
+        self.pages = Pages()
+        self.accessors = page_accessors(self.pages)
+        self.word = self.accessors['load']
+        self.blocks = Blocks(self)
+        self.locations = LocationTable()
+
+    def location(self, address):
+        return self.locations.location(address)
+
+    def load_words(self, words, relocations=(), start_addr=0, locations=None):
+        # the machine starts at 0, so nothing to relocate ...
+        self.accessors['write'](start_addr, Struct('={0}Q'.format(len(words))).pack(*words))
+        self.locations = self.locations if locations is None else locations
+        self.blocks.clear()
+
+
+def base_element(cpu, mem, kind=''):  # value (unsigned) of the given size just below the base pointer ...
+    return mem.accessors['load' + suffixes[kind]](cpu.base_pointer - sizes[kind])
+
+
+def load_image(image, mem):
+    if image.word_size != word_size:
+        raise ValueError('Image word size {g} does not match machine word size {e}'.format(
+            g=image.word_size, e=word_size
+        ))
+    mem.load_words(image.words(), image.relocations, locations=image.locations)
+
+
+def arguments(mem, base_pointer, number_of_arguments):  # past the return address and the return values address ...
+    return imap(mem.accessors['load'], xrange(
+        base_pointer + 2 * word_size, base_pointer + (2 + number_of_arguments) * word_size, word_size
+    ))
+
+
+def string(mem, address):
+    load_byte, characters = mem.accessors['load_one_eighth'], []
+    while load_byte(address):
+        characters.append(chr(load_byte(address)))
+        address += 1
+    return ''.join(characters)
+
+
+def open_file(mem, os, base_pointer):
+    # long long __open__(const char * file_path, const char *mode); returns file_id on success or -1 of failure.
+    file_path, mode = imap(string, (mem, mem), arguments(mem, base_pointer, 2))
+    try:
+        file_obj = open(file_path, mode)
+    except (IOError, ValueError) as ex:
+        logger.warning('failed to open file {f}, error: {m}'.format(f=file_path, m=ex))
+        return -1
+    os.opened_files[file_obj.fileno()] = file_obj
+    return file_obj.fileno()
+
+
+def read_file(mem, os, base_pointer):
+    # long long __read__(long long file_id, char *dest, unsigned long long number_of_bytes); returns bytes read.
+    file_id, destination, number_of_bytes = arguments(mem, base_pointer, 3)
+    if file_id not in os.opened_files:
+        logger.warning('trying to read from a non-opened file_id {f}'.format(f=file_id))
+        return 0
+    values = os.opened_files[file_id].read(number_of_bytes)
+    mem.accessors['write'](destination, values)
+    return len(values)
+
+
+def write_file(mem, os, base_pointer):
+    # long long __write__(long long file_id, char *buffer, unsigned long long number_of_bytes); 0 on success or -1.
+    file_id, source, number_of_bytes = arguments(mem, base_pointer, 3)
+    if file_id not in os.opened_files:
+        logger.warning('trying to write to a non-opened file_id {f}'.format(f=file_id))
+        return -1
+    file_obj = os.opened_files[file_id]
+    file_obj.write(str(mem.accessors['read'](source, number_of_bytes)))
+    file_obj.flush()
+    return 0
+
+
+def close_file(mem, os, base_pointer):
+    # long long __close__(long long file_id); returns 0 on success or -1 on failure.
+    file_id, = arguments(mem, base_pointer, 1)
+    if file_id not in os.opened_files:
+        logger.warning('trying to close a non-opened file_id {f}'.format(f=file_id))
+        return -1
+    if file_id not in dict(std_files):
+        os.opened_files.pop(file_id).close()
+    return 0
+
+
+def tell_file(mem, os, base_pointer):
+    # long long __tell__(long long file_id);
+    file_id, = arguments(mem, base_pointer, 1)
+    return os.opened_files[file_id].tell() if file_id in os.opened_files else -1
+
+
+def seek_file(mem, os, base_pointer):
+    # long long __seek__(long long file_id, long long offset, long long whence);
+    file_id, offset, whence = arguments(mem, base_pointer, 3)
+    if file_id not in os.opened_files:
+        return -1
+    os.opened_files[file_id].seek(signed_word(offset), whence)
+    return 0
+
+
+call_ids = dict((name, call_id) for name, call_id, _ in system_call_ids)
+exit_call_id = call_ids['exit']
+default_calls = dict(izip(
+    imap(call_ids.__getitem__, ('__open__', '__read__', '__write__', '__close__', '__tell__', '__seek__')),
+    (open_file, read_file, write_file, close_file, tell_file, seek_file)
+))
+
+
+class Kernel(object):
+    def __init__(self, calls=None, open_files=std_files):
+        self.calls = calls or default_calls
+        self.opened_files = dict(open_files)
+
+
+def system_call(mem, os, cpu, address, stack_pointer, base_pointer, flags):
+    # the (called) stubs push the id, the return address is at the base pointer followed by the return values address
+    load, store = mem.accessors['load'], mem.accessors['store']
+    call_id = load(stack_pointer) & 0xFF
+    stack_pointer += word_size
+    if call_id == exit_call_id:  # reset the stack, leaving the exit status on top and stop the machine ...
+        status = load(base_pointer + word_size)
+        for file_obj in os.opened_files.itervalues():
+            file_obj.flush()
+        stack_pointer = base_pointer = cpu.stack_pointer
+        store(stack_pointer - word_size, status)
+        cpu.instr_pointer = address
+        return None, stack_pointer - word_size, base_pointer, flags
+    if call_id not in os.calls:
+        logger.error('Invalid System call {0}'.format(call_id))
+        cpu.instr_pointer = address
+        return None, stack_pointer, base_pointer, flags
+    store(load(base_pointer + word_size), os.calls[call_id](mem, os, base_pointer) & word_mask)
+    return mem.blocks[load(base_pointer)], stack_pointer, base_pointer, flags
+
+
+class Stack(block_stack.Stack):  # values in the locals s<depth>, memory through the accessors of the block ...
+    stack_pointer, base_pointer, temporary, scratch = 'sp', 'bp', 's{0}', 't{0}'
+
+    def assign(self, name, value):
+        self.emit('{n} = {v}'.format(n=name, v=value))
+
+    def load(self, kind, address):
+        return 'load{s}({a})'.format(s=suffixes[kind], a=address)
+
+    def store(self, kind, address, value):
+        self.emit('store{s}({a}, {v})'.format(s=suffixes[kind], a=address, v=value))
+
+
+Decoded = namedtuple('Decoded', ('address', 'type', 'operands'))
+
+
+def decode(mem, address):  # the instructions of the block at address, up to and including its first jump ...
+    while True:
+        instr_type = instr_objs.get(mem.word(address))
+        if instr_type is None:
+            raise ValueError('{l} Invalid instruction {w:#x} at {a:#x}'.format(
+                l=mem.location(address), w=mem.word(address), a=address
+            ))
+        number_of_operands = 0
+        if issubclass(instr_type, VariableLengthInstruction):
+            number_of_operands = 2 + 2 * signed_word(mem.word(address + 2 * word_size))
+        elif issubclass(instr_type, WideInstruction):
+            number_of_operands = 1
+        yield Decoded(address, instr_type, tuple(imap(
+            mem.word, xrange(address + word_size, address + (1 + number_of_operands) * word_size, word_size)
+        )))
+        if issubclass(instr_type, (Jump, Halt, SystemCall)):
+            break
+        address += (1 + number_of_operands) * word_size
+
+
+class Block(object):
+    def __init__(self, mem, address, namespace):
+        self.address, self.namespace = address, namespace
+        self.name = 'block_{0:#x}'.format(address)
+        self.lines = ['def {n}(sp, bp, fl):'.format(n=self.name)]
+        self.stack, self.comparison = Stack(self.emit), None  # (kind, is_float) of the last Compare in the block ...
+        for instr in decode(mem, address):
+            self.stack.operands = 0
+            self.emit('# {a:#x}: {i}'.format(a=instr.address, i=instr.type.__name__))
+            rules[instr.type](self, instr)
+
+    def emit(self, line, indent=4):
+        self.lines.append(' ' * indent + line)
+
+    def operand(self, instr, index=0):
+        return signed_word(instr.operands[index])
+
+    def target(self, instr, index=0):  # relative jumps (and jump tables) are relative to the end of the instruction ...
+        return instr.address + 2 * word_size + self.operand(instr, index)
+
+    def next(self, instr):
+        return instr.address + (1 + len(instr.operands)) * word_size
+
+    def jump(self, address):  # known address or expression ...
+        address = literal(address) if isinstance(address, (int, long)) else address
+        self.emit('return blocks[{a}], sp, bp, fl'.format(a=address))
+
+    def branch(self, condition, instr):  # the stack has being written ...
+        self.emit('if {c}:'.format(c=condition))
+        self.emit('return blocks[{a}], sp, bp, fl'.format(a=literal(self.target(instr))), indent=8)
+        self.jump(self.next(instr))
+
+    def function(self):
+        exec compile('\n'.join(self.lines), '<{n}>'.format(n=self.name), 'exec') in self.namespace
+        return self.namespace.pop(self.name)
+
+
+class Blocks(dict):  # the compiled blocks by address, each one compiled the first time its jumped to ...
+    def __init__(self, mem):
+        super(Blocks, self).__init__()
+        self.mem = mem
+        self.namespace = dict(
+            mem.accessors,
+            blocks=self, mem=mem, os=None, cpu=None, system_call=system_call,
+            as_double=as_double, from_double=from_double, as_single=as_single, from_single=from_single, divide=divide,
+            compare_float=compare_float(as_double), compare_float_half=compare_float(as_single),
+        )
+        self.namespace.update(
+            ('compare' + suffixes[kind], (compare_wrapping if sizes[kind] >= 4 else compare_promoted)(kind))
+            for kind in kinds
+        )
+
+    def __missing__(self, address):
+        block = self[address] = Block(self.mem, address, self.namespace).function()
+        return block
+
+
+def evaluate(cpu, mem, os=None):
+    cpu.instr_pointer, cpu.base_pointer = 0, mem.end_of_physical_addr
+    cpu.stack_pointer = mem.end_of_physical_addr
+    mem.blocks.namespace.update(cpu=cpu, os=Kernel() if os is None else os)
+
+    block, stack_pointer, base_pointer = mem.blocks[cpu.instr_pointer], cpu.stack_pointer, cpu.base_pointer
+    flags = given_flags, 0, None
+    while block:
+        block, stack_pointer, base_pointer, flags = block(stack_pointer, base_pointer, flags)
+    cpu.stack_pointer, cpu.base_pointer, cpu.flags = stack_pointer, base_pointer, flags[0](flags[1], flags[2])
+
+
+def push(kind):
+    def instr(block, instr):
+        block.stack.push(kind, literal(instr.operands[0], kind), is_literal=True)
+    return instr
+
+
+def binary(expression, kind):
+    def instr(block, _):
+        right, left = block.stack.pop(kind), block.stack.pop(kind)
+        block.stack.push(kind, expression.format(
+            l=left, r=right, m=literal(masks[kind]), s=literal(shift_masks[kind])
+        ))
+    return instr
+
+
+def not_instr(kind):
+    def instr(block, _):
+        block.stack.push(kind, '{v} ^ {m}'.format(v=block.stack.pop(kind), m=literal(masks[kind])))
+    return instr
+
+
+def binary_float(expression, kind):
+    def instr(block, _):
+        right, left = block.stack.pop(kind), block.stack.pop(kind)
+        block.stack.push(kind, from_float[kind].format(expression.format(
+            l=as_float[kind].format(left), r=as_float[kind].format(right)
+        )))
+    return instr
+
+
+def compare(name, kind):
+    def instr(block, _):
+        right, left = block.stack.pop(kind), block.stack.pop(kind)
+        block.emit('cl, cr = {l}, {r}'.format(l=left, r=right))
+        block.emit('fl = {n}{s}, cl, cr'.format(n=name, s=suffixes[kind]))
+        block.comparison = kind, name == 'compare_float'
+    return instr
+
+
+def load_flag(flag_name):
+    def instr(block, _):
+        if block.comparison is None:  # compared in a previous block ...
+            block.stack.push('', '(fl[0](fl[1], fl[2]) >> {i}) & 1'.format(i=flag_indices[flag_name]))
+        else:
+            kind, is_float = block.comparison
+            if is_float:
+                block.emit('cd = {l} - {r}'.format(l=as_float[kind].format('cl'), r=as_float[kind].format('cr')))
+            block.stack.push('', '1 if {e} else 0'.format(
+                e=flag_expression(flag_name, kind, is_float, 'cl', 'cd' if is_float else 'cr')
+            ))
+    return instr
+
+
+def signed(value, kind):
+    return '(({v} ^ {s}) - {s})'.format(v=value, s=literal(sign_bits[kind]))
+
+
+def jump_if(kind, condition):
+    def instr(block, instr):
+        value = block.stack.pop(kind)
+        block.stack.flush()
+        block.branch(condition.format(value), instr)
+    return instr
+
+
+def compare_and_jump(kind, is_signed, operator):
+    def instr(block, instr):
+        right, left = block.stack.pop(kind), block.stack.pop(kind)
+        block.stack.flush()
+        if is_signed:
+            right, left = signed(right, kind), signed(left, kind)
+        block.branch('{l} {o} {r}'.format(l=left, o=operator, r=right), instr)
+    return instr
+
+
+def compare_float_and_jump(condition):
+    def instr(block, instr):
+        right, left = block.stack.pop(''), block.stack.pop('')
+        block.stack.flush()
+        block.emit('ft = as_double({l}) - as_double({r})'.format(l=left, r=right))
+        block.branch(condition, instr)
+    return instr
+
+
+def jump_table(kind):
+    def instr(block, instr):
+        value = block.stack.pop(kind)
+        block.stack.flush()
+        number_of_cases = block.operand(instr, 1)
+        table = dict(  # keys are unique, unless they only differ by bits above the values size (first one wins) ...
+            (instr.operands[index] & masks[kind], block.target(instr, index + number_of_cases))
+            for index in reversed(xrange(2, 2 + number_of_cases))
+        )
+        name = 'table_{0:#x}'.format(instr.address)
+        block.namespace[name] = table
+        block.jump('{n}.get({v}, {d})'.format(n=name, v=value, d=literal(block.target(instr))))
+    return instr
+
+
+def relative_jump(block, instr):
+    block.stack.flush()
+    block.jump(block.target(instr))
+
+
+def _call(block, instr, address):
+    block.emit('store(sp - {w}, {r})'.format(w=word_size, r=literal(block.next(instr))))
+    block.emit('sp = bp = sp - {w}'.format(w=word_size))
+    block.jump(address)
+
+
+def call(block, instr):
+    block.stack.flush()
+    _call(block, instr, block.target(instr))
+
+
+def absolute_call(block, instr):
+    address = block.stack.pop('')
+    block.stack.flush()
+    _call(block, instr, address)
+
+
+def absolute_jump(block, _):
+    address = block.stack.pop('')
+    block.stack.flush()
+    block.jump(address)
+
+
+def return_instr(block, _):
+    block.stack.flush()
+    block.jump('load(bp)')
+
+
+def halt(block, instr):
+    block.stack.flush()
+    block.emit('cpu.instr_pointer = {a}'.format(a=literal(instr.address)))
+    block.emit('return None, sp, bp, fl')
+
+
+def system_call_instr(block, instr):
+    block.stack.flush()
+    block.emit('return system_call(mem, os, cpu, {a}, sp, bp, fl)'.format(a=literal(instr.address)))
+
+
+def load_instruction_pointer(block, instr):
+    block.stack.push('', literal(instr.address), is_literal=True)
+
+
+def load_base_stack_pointer(block, _):
+    block.stack.flush()
+    block.stack.push('', 'bp')
+
+
+def set_base_stack_pointer(block, _):
+    block.emit('bp = {v}'.format(v=block.stack.pop('')))
+
+
+def load_stack_pointer(block, _):  # the stack is exposed, write it to memory ...
+    block.stack.flush()
+    block.stack.push('', 'sp')
+
+
+def set_stack_pointer(block, _):
+    value = block.stack.pop('')
+    block.stack.flush()
+    block.emit('sp = {v}'.format(v=value))
+
+
+def allocate(block, instr):
+    block.stack.flush()
+    block.emit('sp = {a}'.format(a=stack_address(block.operand(instr), 'sp')))
+
+
+def enter(block, instr):  # allocate the return value and save the base pointer ...
+    block.stack.flush()
+    block.emit('sp = {a}'.format(a=stack_address(-block.operand(instr), 'sp')))
+    block.stack.push('', 'bp')
+
+
+def leave(block, instr):
+    block.stack.flush()
+    block.emit('sp = {a}'.format(a=stack_address(block.operand(instr), 'bp')))
+    block.emit('bp = load(sp)')
+    block.emit('sp = sp + {w}'.format(w=word_size))
+
+
+def postfix_update(kind):
+    def instr(block, instr):
+        stack = block.stack
+        address = stack.operand(stack.pop(''))  # the value takes the place of the address ...
+        stack.push(kind, 'load{s}({a})'.format(s=suffixes[kind], a=address))
+        block.emit('store{s}({a}, ({v} + {q}) & {m})'.format(
+            s=suffixes[kind], a=address, v=stack.peek(kind), q=literal(instr.operands[0], kind), m=literal(masks[kind])
+        ))
+    return instr
+
+
+# multiple values (number of elements of the instructions size) are copied in one go ...
+def load_multiple(kind):
+    def instr(block, instr):
+        address = block.stack.pop('')
+        block.stack.flush()
+        block.emit('sp = sp - {b}'.format(b=block.operand(instr) * sizes[kind]))
+        block.emit('copy(sp, {a}, {b})'.format(a=address, b=block.operand(instr) * sizes[kind]))
+    return instr
+
+
+def set_multiple(kind):  # the values are left on the stack ...
+    def instr(block, instr):
+        address = block.stack.pop('')
+        block.stack.flush()
+        block.emit('copy({a}, sp, {b})'.format(a=address, b=block.operand(instr) * sizes[kind]))
+    return instr
+
+
+def dup_multiple(kind):
+    def instr(block, instr):
+        block.stack.flush()
+        block.emit('copy(sp - {b}, sp, {b})'.format(b=block.operand(instr) * sizes[kind]))
+        block.emit('sp = sp - {b}'.format(b=block.operand(instr) * sizes[kind]))
+    return instr
+
+
+def swap_multiple(kind):  # using the free space below the stack ...
+    def instr(block, instr):
+        block.stack.flush()
+        block.emit('copy(sp - {b}, sp, {b})'.format(b=block.operand(instr) * sizes[kind]))
+        block.emit('copy(sp, sp + {b}, {b})'.format(b=block.operand(instr) * sizes[kind]))
+        block.emit('copy(sp + {b}, sp - {b}, {b})'.format(b=block.operand(instr) * sizes[kind]))
+    return instr
+
+
+rules = {
+    Pass: lambda block, instr: None,
+    RelativeJump: relative_jump,
+    AbsoluteJump: absolute_jump,
+    Call: call,
+    AbsoluteCall: absolute_call,
+    Return: return_instr,
+    Halt: halt,
+    SystemCall: system_call_instr,
+    LoadInstructionPointer: load_instruction_pointer,
+    LoadBaseStackPointer: load_base_stack_pointer,
+    SetBaseStackPointer: set_base_stack_pointer,
+    LoadStackPointer: load_stack_pointer,
+    SetStackPointer: set_stack_pointer,
+    Allocate: allocate,
+    Enter: enter,
+    Leave: leave,
+    AddressOfLocal: address_of_local,
+}
+rules.update(izip((Push, PushHalf, PushQuarter, PushOneEighth), imap(push, kinds)))
+rules.update(izip((JumpTable, JumpTableHalf, JumpTableQuarter, JumpTableOneEighth), imap(jump_table, kinds)))
+rules.update(
+    (flag_type, load_flag(flag_type.__name__[len('Load'):]))
+    for flag_type in LoadFlagInstruction.__subclasses__()
+)
+
+for _kind in kinds:
+    rules.update((
+        (instruction('Pop' + _kind), pop(_kind)),
+        (instruction('Not' + _kind), not_instr(_kind)),
+        (instruction('Compare' + _kind), compare('compare', _kind)),
+        (instruction('JumpTrue' + _kind), jump_if(_kind, '{0}')),
+        (instruction('JumpFalse' + _kind), jump_if(_kind, 'not {0}')),
+        (instruction('LoadLocal' + _kind), load_local(_kind)),
+        (instruction('StoreLocal' + _kind), store_local(_kind)),
+        (instruction('LoadSingle' + _kind), load_single(_kind)),
+        (instruction('SetSingle' + _kind), set_single(_kind)),
+        (instruction('PostfixUpdate' + _kind), postfix_update(_kind)),
+        (instruction('DupSingle' + _kind), dup_single(_kind)),
+        (instruction('SwapSingle' + _kind), swap_single(_kind)),
+        (instruction('Load' + _kind), load_multiple(_kind)),
+        (instruction('Set' + _kind), set_multiple(_kind)),
+        (instruction('Dup' + _kind), dup_multiple(_kind)),
+        (instruction('Swap' + _kind), swap_multiple(_kind)),
+    ))
+    rules.update(
+        (instruction(_name + _kind), binary(_expression, _kind)) for _name, _expression in (
+            ('Add', '({l} + {r}) & {m}'), ('Subtract', '({l} - {r}) & {m}'), ('Multiply', '({l} * {r}) & {m}'),
+            ('Divide', '{l} // {r}'), ('Mod', '{l} % {r}'),
+            ('ShiftLeft', '({l} << ({r} & {s})) & {m}'), ('ShiftRight', '{l} >> ({r} & {s})'),
+            ('Or', '{l} | {r}'), ('And', '{l} & {r}'), ('Xor', '{l} ^ {r}'),
+        )
+    )
+    for _signed, _from_kind in product(('', 'Signed'), kinds):  # integral => float ...
+        _value = signed('{0}', _from_kind) if _signed else '{0}'
+        rules[instruction('ConvertToFloatFrom' + _signed + _from_kind)] = convert(
+            _from_kind, '', 'from_double(float({v}))'.format(v=_value)
+        )
+        rules[instruction('ConvertToHalfFloatFrom' + _signed + _from_kind)] = convert(
+            _from_kind, 'Half', 'from_single(float({v}))'.format(v=_value)
+        )
+    rules[instruction('ConvertTo{k}FromFloat'.format(k=_kind))] = convert(
+        '', _kind, 'int(as_double({{0}})) & {m}'.format(m=literal(masks[_kind]))
+    )
+    rules[instruction('ConvertTo{k}FromHalfFloat'.format(k=_kind))] = convert(
+        'Half', _kind, 'int(as_single({{0}})) & {m}'.format(m=literal(masks[_kind]))
+    )
+
+for _to_signed, _to_kind, _from_signed, _from_kind in product(('', 'Signed'), kinds, ('', 'Signed'), kinds):
+    _name = 'ConvertTo{ts}{tk}From{fs}{fk}'.format(ts=_to_signed, tk=_to_kind, fs=_from_signed, fk=_from_kind)
+    if _to_kind != _from_kind and instruction(_name):  # signed to or from, the value is sign extended ...
+        rules[instruction(_name)] = convert(_from_kind, _to_kind, '{v} & {m}'.format(
+            v=signed('{0}', _from_kind) if _to_signed or _from_signed else '{0}', m=literal(masks[_to_kind])
+        ))
+
+rules.update((
+    (instruction('ConvertToHalfFloatFromFloat'), convert('', 'Half', 'from_single(as_double({0}))')),
+    (instruction('ConvertToFloatFromHalfFloat'), convert('Half', '', 'from_double(as_single({0}))')),
+))
+
+for _kind in float_kinds:
+    rules.update(
+        (instruction(_name + 'Float' + _kind), binary_float(_expression, _kind)) for _name, _expression in (
+            ('Add', '{l} + {r}'), ('Subtract', '{l} - {r}'), ('Multiply', '{l} * {r}'), ('Divide', 'divide({l}, {r})')
+        )
+    )
+    rules[instruction('CompareFloat' + _kind)] = compare('compare_float', _kind)
+
+for (_condition, _operator), _signed, _kind in product(
+    (('EQUAL', '=='), ('NOT_EQUAL', '!='), ('LESS', '<'), ('GREATER', '>'), ('LESS_OR_EQUAL', '<='),
+     ('GREATER_OR_EQUAL', '>=')),
+    ('', 'Signed', 'Unsigned'),
+    ('', 'Half'),
+):
+    _name = 'JumpIf' + camel_case(_condition) + _signed + _kind
+    if instruction(_name):
+        rules[instruction(_name)] = compare_and_jump(_kind, _signed == 'Signed', _operator)
+
+rules.update(  # the difference is tested, so each condition is the exact inverse of another (NaN) ...
+    (instruction('JumpIf' + _name + 'Float'), compare_float_and_jump(_condition)) for _name, _condition in (
+        ('Equal', 'ft == 0.0'), ('NotEqual', 'not ft == 0.0'),
+        ('Less', 'ft < 0.0'), ('GreaterOrEqual', 'not ft < 0.0'),
+        ('LessOrEqual', 'ft <= 0.0'), ('Greater', 'not ft <= 0.0'),
+    )
+)
@@ -27,6 +27,7 @@ from back_end.virtual_machine.instructions.architecture import LoadNonZeroNonCar
 from back_end.virtual_machine.instructions.architecture import LoadNonZeroNonMostSignificantBitFlag
 from back_end.virtual_machine.instructions.architecture import LoadZeroMostSignificantBitFlag, Binary, NumericBinary
 from back_end.virtual_machine.instructions.architecture import push_integral, push_real, Address
+from back_end.virtual_machine.instructions.words import pack_binaries
 
 logger = logging.getLogger('virtual_machine')
 
@@ -461,7 +462,8 @@ try:
     from back_end.virtual_machine.c.cpu import c_evaluate as evaluate, CPU, Kernel, VirtualMemory, base_element
     from back_end.virtual_machine.c.cpu import word_type, half_word_type, quarter_word_type, one_eighth_word_type
     from back_end.virtual_machine.c.cpu import word_size, half_word_size, quarter_word_size, one_eighth_word_size
-    from back_end.virtual_machine.c.cpu import word_type_factories, word_type_sizes, pack_binaries
+    from back_end.virtual_machine.c.cpu import word_type_factories, word_type_sizes, load_image
+    from back_end.virtual_machine.c.cpu import load_native, c_resume as resume, checkpoint, restore, reset, run_until
 except ImportError as er:
 
     class Kernel(object):
@@ -485,8 +487,8 @@ except ImportError as er:
             for flag_name in self.flag_names:
                 setattr(self, flag_name, machine_integral_type(0))
 
-    class VirtualMemory(defaultdict):
-        def __init__(self, default_factory=machine_integral_type):
+    class VirtualMemory(defaultdict):  # the loaded elements themselves, (keep_code has no effect) ...
+        def __init__(self, default_factory=machine_integral_type, keep_code=True):
             super(VirtualMemory, self).__init__(default_factory)
 
     evaluate = evaluate
@@ -494,10 +496,5 @@ except ImportError as er:
     def base_element(cpu, mem, _):
         return mem[cpu.base_pointer]
 
-    def pack_binaries(*args):
-        for value in args[0]:
-            yield value
-
-    logger.warning('Failed to import C implementations, reverting to Python')
-    print er
+    logger.warning('Failed to import C implementations, reverting to Python {e}'.format(e=er))
     _ = 1
\ No newline at end of file
@@ -10,10 +10,19 @@ from front_end.parser import SymbolTable
 from back_end.emitter.declarations.declaration import get_directives
 from back_end.emitter.statements.statement import statement as _statement_func
 from back_end.emitter.expressions.expression import expression as _expression_func
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
 
 
 def _apply(declarations, symbol_table, directives):
-    return (directives[type(dec)](dec, symbol_table) for dec in declarations)
+    return (buffered(directives[type(dec)](dec, symbol_table)) for dec in declarations)
+
+
+def buffered(symbol):
+    # emit the binaries of symbol into its own buffer, (in order, since emitting a symbol may depend on previous ones)
+    # symbols of libraries pickled before buffers (or system calls) may still hold Instruction objects ...
+    if not isinstance(symbol.binaries, InstructionBuffer):
+        symbol.binaries = InstructionBuffer(symbol.binaries)
+    return symbol
 
 
 def emit(
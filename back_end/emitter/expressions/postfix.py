@@ -16,12 +16,9 @@ from front_end.parser.types import c_type, ArrayType, FunctionType, PointerType,
 from front_end.parser.types import IntegralType, VoidType
 
 
-from back_end.virtual_machine.instructions.architecture import Address, add, set_instr, load, load_stack_pointer
-from back_end.virtual_machine.instructions.architecture import Pass, multiply, is_load, Loads, Offset
-from back_end.virtual_machine.instructions.architecture import set_base_stack_pointer, allocate, relative_jump
-from back_end.virtual_machine.instructions.architecture import absolute_jump, push
-from back_end.virtual_machine.instructions.architecture import set_stack_pointer
-from back_end.virtual_machine.instructions.architecture import load_base_stack_pointer
+from back_end.virtual_machine.instructions.architecture import add, set_instr, load, load_stack_pointer
+from back_end.virtual_machine.instructions.architecture import multiply, is_load, Loads, Offset
+from back_end.virtual_machine.instructions.architecture import call, absolute_call, enter, leave, push, allocate
 from back_end.emitter.c_types import size, size_extended, struct_member_offset, size_arrays_as_pointers
 
 from back_end.virtual_machine.instructions.architecture import get_postfix_update
@@ -56,17 +53,13 @@ def func_type(expr):
 
 def call_function(function_call_expr, symbol_table):
     l, expr = loc(function_call_expr), left_exp(function_call_expr)
-    return chain(  # if expression is a simple identifier of function type, no need for AbsoluteJump, use RelativeJump
-        set_base_stack_pointer(load_stack_pointer(l), l),
-        relative_jump(Offset(symbol_table[name(expr)].get_address_obj(l).obj, l), l),
-    ) if isinstance(expr, IdentifierExpression) and isinstance(c_type(expr), FunctionType) else absolute_jump(
-        chain(
-            symbol_table['__ expression __'](expr, symbol_table),   # load callee address
-            # calculate new base stack pointer excluding the callees address ...
-            # give the callee a new frame... if we where to reset the base stack ptr before evaluating the left_expr
-            # we run the risk of failing to properly load function address if it was store as a local function pointer
-            set_base_stack_pointer(add(load_stack_pointer(l), push(size(void_pointer_type), l), l), l)
-        ),
+    return call(  # if expression is a simple identifier of function type, no need for AbsoluteCall, use Call
+        Offset(symbol_table[name(expr)].get_address_obj(l).obj, l), l
+    ) if isinstance(expr, IdentifierExpression) and isinstance(c_type(expr), FunctionType) else absolute_call(
+        # load callee address, AbsoluteCall gives the callee its new frame once the address has being popped ...
+        # if we where to reset the base stack ptr before evaluating the left_expr
+        # we run the risk of failing to properly load function address if it was store as a local function pointer
+        symbol_table['__ expression __'](expr, symbol_table),
         l
     )
 
@@ -78,7 +71,6 @@ def push_frame(
         omit_pointer_for_return_value=False,
 ):
     return chain(
-        load_base_stack_pointer(location),  # save previous base stack pointer ...
         arguments_instrs,
         # Pointer to where to store return values, if applicable (ie non-zero return size)...
         () if omit_pointer_for_return_value else
@@ -88,51 +80,19 @@ def push_frame(
 
 
 def pop_frame(location=LocationNotSet, total_size_of_arguments=0, omit_pointer_for_return_value=False):
-    # return pop_frame_instr(location)  # method 1 requires special instruction that has to manage blocks
-
-    # method 2 (5 instructions LoadBaseStackPtr, Push, Add, SetStackPtr, SetBaseStackPtr)
-    # method 2 seems to be faster even though it has an extra instruction compare to method 3,
-    # not really sure why ... probably because the optimizer is removing some of them
-
-    return set_base_stack_pointer(
-        set_stack_pointer(
-            add(
-                # remove parameters and ret addr ...
-                load_base_stack_pointer(location),
-                push(    # remove parameters, ret address pointer, and ptr for ret value if it was emitted ...
-                    sum((
-                        total_size_of_arguments, size(void_pointer_type),
-                        (not omit_pointer_for_return_value) * size(void_pointer_type))),
-                    location
-                ),
-                location
-            ),
-            location
-        ),
+    # Leave resets the stack pointer relative to the callees base stack pointer (pointing to the ret address)
+    # and restores the callers base stack pointer, replacing LoadBaseStackPtr, Push, Add, SetStackPtr, SetBaseStackPtr
+    return leave(  # remove parameters, ret address, and ptr for ret value if it was emitted ...
+        sum((
+            total_size_of_arguments, size(void_pointer_type),
+            (not omit_pointer_for_return_value) * size(void_pointer_type))),
         location
     )
 
-    # method 3 (4 instructions (LoadBaseStackPtr, SetStackPtr, Allocate, SetBaseStackPtr))
-    # return set_base_stack_pointer(
-    #     chain(
-    #         set_stack_pointer(load_base_stack_pointer(location), location),  # load callees base pointer ...
-    #         allocate(  # de-allocate everything ...
-    #             -(
-    #                 total_size_of_arguments +  # remove parameters ...
-    #                 size(void_pointer_type) +  # remove ret address pointer ...
-    #                 # remove ptr for ret value if it was emitted ...
-    #                 ((not omit_pointer_for_return_value) * size(void_pointer_type))
-    #             ),
-    #             location
-    #         )
-    #     ),
-    #     location
-    # )
-
 
 def function_call(expr, symbol_table):
     assert not isinstance(c_type(expr), ArrayType)
-    l, return_instr = loc(expr), Pass(loc(expr))
+    l = loc(expr)
     total_size_of_arguments = sum(imap(size_arrays_as_pointers, imap(c_type, right_exp(expr))))
     return_size = size(c_type(expr), overrides={VoidType: 0})
     omit_pointer_for_return_value = not return_size
@@ -151,7 +111,7 @@ def function_call(expr, symbol_table):
     expression = symbol_table['__ expression __']
     return chain(
         # Allocate space for return value, save frame.
-        allocate(return_size, l),
+        enter(return_size, l),
         push_frame(
             # Push arguments in reverse order (right to left) ...
             chain.from_iterable(imap(expression, reverse(right_exp(expr)), repeat(symbol_table))),
@@ -159,9 +119,7 @@ def function_call(expr, symbol_table):
             total_size_of_arguments=total_size_of_arguments,
             omit_pointer_for_return_value=omit_pointer_for_return_value
         ),
-        push(Address(return_instr, l), l),  # make callee aware of were to return to.
-        call_function(expr, symbol_table),
-        (return_instr,),
+        call_function(expr, symbol_table),  # make callee aware of were to return to, and jump to it.
         # Pop Frame, first stack pointer then base stack pointer
         pop_frame(
             location=l,
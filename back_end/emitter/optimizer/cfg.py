@@ -0,0 +1,277 @@
+__author__ = 'samyvilar'
+
+from itertools import imap, ifilter, chain, izip
+
+from back_end.virtual_machine.instructions.words import word_size
+from back_end.virtual_machine.instructions.architecture import Instruction, Address, Offset, Halt
+from back_end.virtual_machine.instructions.architecture import Jump, AbsoluteJump, RelativeJump, JumpTable
+from back_end.virtual_machine.instructions.architecture import JumpTrue, JumpTrueHalf, JumpTrueQuarter
+from back_end.virtual_machine.instructions.architecture import JumpTrueOneEighth, JumpFalse, JumpFalseHalf
+from back_end.virtual_machine.instructions.architecture import JumpFalseQuarter, JumpFalseOneEighth, Call, AbsoluteCall
+from back_end.virtual_machine.instructions.architecture import compare_and_jump_flags, referenced_obj, operns
+
+# Control flow graph over an instruction stream, either a single function (Code symbol binaries) or a linked program.
+# Blocks are maximal sequences of instructions with a single entry (the first) and a single exit (the last),
+# (embedded) data splits blocks but isn't part of any.
+# Targets may either be objects (un-addressed streams) or ints (after set_addresses or from an InstructionBuffer).
+# Control is assumed to eventually return from Call/AbsoluteCall to the next instruction, as well as from any jump
+# followed by an instruction whose address is pushed (Address operand, the return point of older binaries).
+# Any other jump leaving the graph, or AbsoluteJump (Return), is an exit.
+
+conditional_jumps = {
+    JumpTrue, JumpTrueHalf, JumpTrueQuarter, JumpTrueOneEighth,
+    JumpFalse, JumpFalseHalf, JumpFalseQuarter, JumpFalseOneEighth
+}
+conditional_jumps.update(compare_and_jump_flags)
+
+
+def is_conditional_jump(instr):
+    return type(instr) in conditional_jumps
+
+
+def is_call(instr):
+    return isinstance(instr, (Call, AbsoluteCall))
+
+
+def jump_operands(instr):  # operands referencing the targets of a jump, none for AbsoluteJump (target on the stack)
+    if isinstance(instr, JumpTable):
+        return tuple(ifilter(lambda o: isinstance(o, Offset), operns(instr)))
+    if isinstance(instr, RelativeJump):
+        return operns(instr)[:1]
+    return ()
+
+
+def address(elem):
+    return elem.address if type(getattr(elem, 'address', None)) in {int, long} else None
+
+
+class BasicBlock(object):
+    def __init__(self, index, instrs, contiguous):
+        self.index, self.instrs = index, instrs
+        self.contiguous = contiguous  # whether or not it immediately follows the previous block (no data in between)
+        self.successors, self.predecessors = [], []
+        self.immediate_dominator = None
+        self.loop = None  # inner most loop containing this block ...
+
+    @property
+    def first(self):
+        return self.instrs[0]
+
+    @property
+    def last(self):
+        return self.instrs[-1]
+
+    @property
+    def loop_depth(self):
+        return self.loop.depth if self.loop else 0
+
+    def __len__(self):
+        return len(self.instrs)
+
+    def __iter__(self):
+        return iter(self.instrs)
+
+    def __repr__(self):
+        return 'BasicBlock({i}, {f} ... {l}, successors: {s})'.format(
+            i=self.index, f=self.first, l=self.last, s=[block.index for block in self.successors]
+        )
+
+
+class Loop(object):  # natural loop(s) sharing the same header ...
+    def __init__(self, header):
+        self.header, self.blocks = header, {header}
+        self.parent, self.children = None, []
+
+    @property
+    def depth(self):
+        return 1 + (self.parent.depth if self.parent else 0)
+
+    def __contains__(self, block):
+        return block in self.blocks
+
+    def __repr__(self):
+        return 'Loop(header: {h}, blocks: {b}, depth: {d})'.format(
+            h=self.header.index, b=sorted(block.index for block in self.blocks), d=self.depth
+        )
+
+
+class ControlFlowGraph(object):
+    def __init__(self, instrs):
+        instrs = tuple(instrs)
+        self.instrs = dict((id(elem), elem) for elem in instrs if isinstance(elem, Instruction))
+        self.addresses = dict(  # only addressed streams have any ...
+            (address(elem), elem) for elem in instrs if address(elem) is not None
+        )
+        self.address_taken = set(imap(id, ifilter(self.__contains__, imap(self.referenced, ifilter(
+            lambda o: isinstance(o, Address), chain.from_iterable(imap(operns, instrs, ((),) * len(instrs)))
+        )))))
+        self.blocks, self._blocks, self.exits = [], {}, []
+        self.split(instrs)
+        self.link()
+        self.entry = self.blocks[0] if self.blocks else None
+        self.order = self.reverse_post_order()
+        self.set_dominators()
+        self.loops = self.find_loops()
+
+    def __contains__(self, instr):
+        return id(instr) in self.instrs and self.instrs[id(instr)] is instr
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def block(self, instr):  # block containing instr ...
+        return self._blocks[id(instr)]
+
+    def referenced(self, operand, instr=None):  # object referenced by an operand, None if unknown
+        obj = referenced_obj(operand, None)
+        if type(obj) in {int, long}:
+            if isinstance(operand, Offset):
+                if address(instr) is None:
+                    return None
+                obj += address(instr) + (2 * word_size if isinstance(instr, RelativeJump) else 0)
+            return self.addresses.get(obj)
+        return obj
+
+    def targets(self, instr):  # (targets within the graph, whether or not any target lies outside of it)
+        targets = tuple(imap(self.referenced, jump_operands(instr), (instr,) * len(jump_operands(instr))))
+        internal = tuple(ifilter(self.__contains__, targets))
+        return internal, isinstance(instr, AbsoluteJump) or len(internal) != len(targets)
+
+    def split(self, instrs):
+        leaders = set(self.address_taken)
+        leaders.update(imap(id, chain.from_iterable(
+            self.targets(instr)[0] for instr in ifilter(lambda elem: isinstance(elem, Jump), instrs)
+        )))
+
+        current, contiguous, end_of_instr = [], True, None
+        for elem in instrs:
+            if isinstance(elem, Instruction):
+                end_of_instr = address(elem) is not None and address(elem) + len(elem) * word_size
+            elif end_of_instr and address(elem) is not None and address(elem) < end_of_instr:
+                continue  # skip the operands of the previous instruction, for streams from set_addresses ...
+
+            if not isinstance(elem, Instruction) or id(elem) in leaders:
+                contiguous = self.add_block(current, contiguous) and isinstance(elem, Instruction)
+                current = []
+            if isinstance(elem, Instruction):
+                current.append(elem)
+                if isinstance(elem, (Jump, Halt)):
+                    contiguous = self.add_block(current, contiguous)
+                    current = []
+        self.add_block(current, contiguous)
+
+    def add_block(self, instrs, contiguous):  # returns whether or not the next block may follow this one ...
+        if instrs:
+            block = BasicBlock(len(self.blocks), instrs, contiguous)
+            self.blocks.append(block)
+            self._blocks.update((id(instr), block) for instr in instrs)
+            return True
+        return contiguous
+
+    def following(self, block):  # the block control falls into from block, None if there isn't one ...
+        if block.index + 1 < len(self.blocks) and self.blocks[block.index + 1].contiguous:
+            return self.blocks[block.index + 1]
+
+    def add_edge(self, block, successor):
+        if successor not in block.successors:
+            block.successors.append(successor)
+            successor.predecessors.append(block)
+
+    def link(self):
+        for block in self.blocks:
+            instr, following, successors, external = block.last, self.following(block), [], False
+            if isinstance(instr, Jump):
+                targets, external = self.targets(instr)
+                if following is not None and (  # branch or call ...
+                    is_conditional_jump(instr) or is_call(instr) or id(following.first) in self.address_taken
+                ):
+                    successors.append(following)
+                    external = False
+                successors.extend(imap(self.block, targets))
+            elif following is not None and not isinstance(instr, Halt):
+                successors.append(following)
+
+            for successor in successors:
+                self.add_edge(block, successor)
+            if external or not successors:
+                self.exits.append(block)
+
+    def reverse_post_order(self):  # blocks reachable from the entry in reverse post order ...
+        if self.entry is None:
+            return []
+        order, visited, stack = [], {self.entry}, [(self.entry, iter(self.entry.successors))]
+        while stack:
+            block, successors = stack[-1]
+            for successor in ifilter(lambda s: s not in visited, successors):
+                visited.add(successor)
+                stack.append((successor, iter(successor.successors)))
+                break
+            else:
+                order.append(stack.pop()[0])
+        return order[::-1]
+
+    def set_dominators(self):  # Cooper, Harvey, Kennedy: A Simple, Fast Dominance Algorithm
+        if not self.order:
+            return
+        indices = dict(izip(self.order, xrange(len(self.order))))
+        dominators = {self.entry: self.entry}
+
+        def intersect(block_0, block_1):
+            while block_0 is not block_1:
+                while indices[block_0] > indices[block_1]:
+                    block_0 = dominators[block_0]
+                while indices[block_1] > indices[block_0]:
+                    block_1 = dominators[block_1]
+            return block_0
+
+        changed = True
+        while changed:
+            changed = False
+            for block in self.order[1:]:
+                predecessors = tuple(ifilter(dominators.__contains__, block.predecessors))
+                dominator = reduce(intersect, predecessors)
+                if dominators.get(block) is not dominator:
+                    dominators[block], changed = dominator, True
+
+        for block in self.order[1:]:
+            block.immediate_dominator = dominators[block]
+
+    def reachable(self, block):
+        return block is self.entry or block.immediate_dominator is not None
+
+    def dominators(self, block):  # block and all of its dominators (from the inner most to the entry) ...
+        while block is not None:
+            yield block
+            block = block.immediate_dominator
+
+    def dominates(self, block_0, block_1):
+        return self.reachable(block_1) and any(block is block_0 for block in self.dominators(block_1))
+
+    def find_loops(self):
+        loops = {}
+        for block in self.order:
+            for header in ifilter(lambda s, block=block: self.dominates(s, block), block.successors):  # back edge
+                loop = loops.setdefault(header, Loop(header))
+                blocks = [block]
+                while blocks:  # every block reaching the back edge without going through the header ...
+                    body_block = blocks.pop()
+                    if body_block not in loop.blocks:
+                        loop.blocks.add(body_block)
+                        blocks.extend(ifilter(self.reachable, body_block.predecessors))
+
+        loops = sorted(loops.itervalues(), key=lambda l: len(l.blocks))  # inner most loops first ...
+        for index, loop in enumerate(loops):
+            loop.parent = next((l for l in loops[index + 1:] if loop.header in l.blocks), None)
+            if loop.parent:
+                loop.parent.children.append(loop)
+        for loop in reversed(loops):  # inner loops override outer loops ...
+            for block in loop.blocks:
+                block.loop = loop
+        return sorted(loops, key=lambda l: l.header.index)
+
+
+def control_flow_graph(instrs):
+    return ControlFlowGraph(instrs)
@@ -0,0 +1,33 @@
+__author__ = 'samyvilar'
+
+from itertools import ifilter, imap, chain
+
+from back_end.emitter.optimizer.cfg import control_flow_graph
+from back_end.virtual_machine.instructions.architecture import Instruction, operns
+
+
+def reachable_blocks(graph, instrs):
+    # blocks reachable from the entry, as well as blocks referenced by reachable code or data (other than by jumps)
+    # along with everything reachable from them ...
+    reachable, pending = set(), list(graph.order[:1])
+    while pending:
+        while pending:
+            block = pending.pop()
+            if block not in reachable:
+                reachable.add(block)
+                pending.extend(block.successors)
+        referenced = imap(graph.block, ifilter(graph.__contains__, (
+            graph.referenced(operand, elem)
+            for elem in instrs if not isinstance(elem, Instruction) or graph.block(elem) in reachable
+            for operand in chain(operns(elem, ()), (elem,) if not isinstance(elem, Instruction) else ())
+        )))
+        pending.extend(ifilter(lambda b: b not in reachable, referenced))
+    return reachable
+
+
+def remove_unreachable(instrs):
+    # remove instructions that can never be executed (after return/goto/break ...), data is always kept.
+    instrs = tuple(instrs)
+    graph = control_flow_graph(instrs)
+    reachable = reachable_blocks(graph, instrs)
+    return (elem for elem in instrs if not isinstance(elem, Instruction) or graph.block(elem) in reachable)
@@ -0,0 +1,35 @@
+__author__ = 'samyvilar'
+
+from itertools import chain, ifilter
+
+from back_end.emitter.optimizer.optimize import replacement, linked
+from back_end.emitter.optimizer.cfg import jump_operands
+from back_end.virtual_machine.instructions.architecture import RelativeJump, Offset, Instruction
+from back_end.virtual_machine.instructions.architecture import referenced_obj, opern
+
+# Jump threading: any jump (conditional, unconditional or JumpTable case) whose target is an unconditional
+# RelativeJump is re-targeted at the final destination of the chain of jumps.
+# Jumps to the next instruction and jumps over jumps are handled by the peephole rules, which should follow ...
+
+
+def destination(instr, ids):
+    visited = set()  # guard against (infinite) loops consisting only of jumps ...
+    while type(instr) is RelativeJump and id(instr) not in visited and id(instr) in ids:
+        visited.add(id(instr))
+        target = replacement(referenced_obj(opern(instr), None))
+        if not isinstance(target, Instruction):
+            break
+        instr = target
+    return instr
+
+
+@linked
+def thread_jumps(instrs):
+    ids = set(id(instr) for instr in instrs)
+    for operand in chain.from_iterable(
+        jump_operands(instr) for instr in ifilter(lambda i: isinstance(i, RelativeJump), instrs)
+    ):
+        target = replacement(referenced_obj(operand, None))
+        if isinstance(operand, Offset) and isinstance(target, Instruction):
+            operand.obj = destination(target, ids)
+    return instrs
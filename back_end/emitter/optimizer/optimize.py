@@ -1,51 +1,43 @@
 __author__ = 'samyvilar'
 
-from collections import defaultdict
-from itertools import chain, imap, izip, repeat, ifilter
+from itertools import chain, imap, repeat, ifilter
 
-from utils.sequences import takewhile, peek, consume, __required__, exhaust, peek_or_terminal, terminal
+from utils.sequences import takewhile, peek, consume, exhaust, peek_or_terminal, terminal
 from utils.rules import get_rule, set_rules
-from utils.errors import error_if_not_type, raise_error
+from utils.errors import raise_error
 from back_end.emitter.object_file import Reference
 
-from back_end.virtual_machine.instructions.architecture import Allocate, Pass, Operand
+from back_end.virtual_machine.instructions.architecture import Allocate, Pass, Operand, AddressOfLocal
+from back_end.virtual_machine.instructions.architecture import load_local_instrs, store_local_instrs
 from back_end.virtual_machine.instructions.architecture import Instruction, referenced_obj, pop_instrs, operns, opern
 from front_end.loader.locations import loc
 
-new_instructions = {}  # keep track of the new instructions so new_instructions[id(old_instr)] = new_instr
+# Every instruction is its own handle, replacing an instruction binds it to its replacement, references keep pointing
+# at the (old) instruction until update_instruction_references re-binds them to the last instruction in the chain.
+# Since only referenced instructions are kept alive (by the referencing operands), dropped instructions are freed
+# immediately, and no id() book keeping is required (ids may be re-used once an object is garbage collected) ...
 
-new_references = {}
 
-# TODO: bug, need to keep referencing previously deleted instructions!
-# it seems pythons internal memory allocator may be reusing previously garbage collected objects
-# which creates havoc for the optimizer since the id of the new object is reused
-# and hence 'supposedly' new objects are in fact referenced old, applying update_instruction_references() fails ...
-# removed_instrs = []
-old_instructions = defaultdict(list)
-# keep track of the removed instructions so old_instructions[id(new_instr)] = old_instrs
-
-deleted_instructions = []
+def replacement(instr):
+    # follow the chain of replacements, re-binding every instruction along the way to the final one ...
+    new_instr = instr
+    while hasattr(new_instr, 'replacement'):
+        new_instr = new_instr.replacement
+    while instr is not new_instr:
+        instr.replacement, instr = new_instr, instr.replacement
+    return new_instr
 
 
 def replace_instr(old_instr, new_instr):
-    if id(old_instr) == id(new_instr):  # instructions are identical do nothing ...
+    if old_instr is new_instr:  # instructions are identical do nothing ...
         return
 
-    _ = id(old_instr) in new_instructions and raise_error(  # we are replacing an old instructions twice!!
+    _ = hasattr(old_instr, 'replacement') and raise_error(  # we are replacing an old instructions twice!!
         'We are replacing an old instruction {i} with {n} twice!'.format(i=old_instr, n=new_instr))
+    _ = replacement(new_instr) is old_instr and raise_error(
+        'Replacing instruction {i} with {n} creates a cycle!'.format(i=old_instr, n=new_instr))
 
-    if id(old_instr) in old_instructions:
-        # we are replacing a previously new instruction ...
-        # replacing new_instr so we need to replace previous references with this new_instr
-        # instead of the old one ... get all the instructions that where referencing the older instruction ...
-        previous_instructions = old_instructions[id(old_instr)]
-        new_instructions.update(izip(imap(id, previous_instructions), repeat(new_instr)))  # update all previous
-        old_instructions[id(new_instr)] = previous_instructions  # in case this new instruction should be updated again
-        deleted_instructions.append(old_instr)
-    else:
-        new_instructions[id(old_instr)] = new_instr
-        old_instructions[id(new_instr)].append(old_instr)  # a new instruction may replace more than 1 instruction.
-
+    old_instr.replacement = new_instr
     return new_instr
 
 
@@ -70,14 +62,14 @@ def remove_allocation(instrs):
         if total:  # non-zero allocates changes the state of the stack.
             if total in pop_instrs:
                 new_instr = next(pop_instrs[total](loc(alloc_instrs[0])))
-            elif len(alloc_instrs) != 1:
+            elif len(alloc_instrs) == 1:
                 new_instr = alloc_instrs[0]
             else:
                 new_instr = Allocate(loc(alloc_instrs[-1]), total)
             yield replace_instrs(new_instr, alloc_instrs)
         else:  # stack remains unchanged, get next instruction for referencing, it one exists ...
             if peek_or_terminal(instrs) is terminal:
-                yield replace_instr(Pass(loc(alloc_instrs[-1])), alloc_instrs)
+                yield replace_instrs(Pass(loc(alloc_instrs[-1])), alloc_instrs)
             else:
                 replace_instrs(peek(instrs), alloc_instrs)
 
@@ -91,18 +83,19 @@ def remove_pass(instrs):
         replace_instrs(peek(instrs), pass_instrs)
 
 
-def get_new_instr(addr_operand, default):
-    if isinstance(referenced_obj(addr_operand, None), Reference) and id(addr_operand) in new_references:
-        # replace Reference by instruction
-        default = addr_operand.obj = error_if_not_type(new_references[id(addr_operand)].obj, Reference)
+def fuse_local_access(instrs):
+    """ replace AddressOfLocal followed by a single Load or Set by the equivalent LoadLocal or StoreLocal """
+    addr_instr = consume(instrs)
+    fused_instr_type = load_local_instrs.get(type(peek_or_terminal(instrs))) or \
+        store_local_instrs.get(type(peek_or_terminal(instrs)))
+    if fused_instr_type is None:
+        yield addr_instr
+    else:
+        yield replace_instrs(fused_instr_type(loc(addr_instr), opern(addr_instr)), (addr_instr, consume(instrs)))
+
 
-    # if id(addr_operand.obj) not in new_instructions:
-    #     print 'no address !!!', id(addr_operand.obj)
-    # else:
-    #     print id(addr_operand.obj), ' --> ', id(new_instructions[id(addr_operand.obj)])
-    return new_instructions.get(id(addr_operand.obj), default)
-    # _ = new_instr is __required__ and raise_error('No entry for instruction {i}'.format(i=addr_operand.obj))
-    # return new_instr
+def get_new_instr(addr_operand, default):
+    return replacement(referenced_obj(addr_operand, default))
 
 
 def update_instruction_references(instrs):  # update operand references, since they may referencing omitted instructions
@@ -131,12 +124,23 @@ zero_level_optimization = no_optimization
 
 def first_level_optimization(instrs):
     return get_rule(first_level_optimization, peek(instrs), hash_funcs=(type,))(instrs)
-set_rules(first_level_optimization, ((Allocate, remove_allocation), (Pass, remove_pass)), zero_level_optimization)
+set_rules(
+    first_level_optimization,
+    ((Allocate, remove_allocation), (Pass, remove_pass), (AddressOfLocal, fuse_local_access)),
+    zero_level_optimization
+)
+
+
+def linked(optimization):
+    # whole stream optimizations only apply to linked instructions (references across symbols are still unresolved
+    # until then), anything else (symbol streams) is passed through as is ...
+    def optimize_linked(instrs, *args, **kwargs):
+        instrs = iter(instrs)
+        if not isinstance(peek_or_terminal(instrs), Instruction):
+            return chain(() if peek_or_terminal(instrs) is terminal else (consume(instrs),), instrs)
+        return optimization(list(chain((consume(instrs),), instrs)), *args, **kwargs)
+    return optimize_linked
 
 
 def optimize(instrs, level=zero_level_optimization):
-    global new_instructions, old_instructions, deleted_instructions
-    new_instructions = {}
-    old_instructions = defaultdict(list)
-    deleted_instructions = []
     return update_instruction_references(chain.from_iterable(imap(level, takewhile(peek, repeat(instrs)))))
\ No newline at end of file
@@ -0,0 +1,312 @@
+__author__ = 'samyvilar'
+
+from itertools import chain, imap, ifilter, izip
+
+from back_end.emitter.optimizer.optimize import replace_instr, replacement, update_instruction_references, linked
+
+from back_end.virtual_machine.instructions.architecture import Instruction, Operand, Reference, Word, Pass, Allocate
+from back_end.virtual_machine.instructions.architecture import Push, Pop, DupSingle, SwapSingle, Swap, RelativeJump
+from back_end.virtual_machine.instructions.architecture import Add, Subtract, Multiply, And, Or, Xor
+from back_end.virtual_machine.instructions.architecture import ShiftLeft, ShiftRight, Offset
+from back_end.virtual_machine.instructions.architecture import JumpTrue, JumpTrueHalf, JumpTrueQuarter
+from back_end.virtual_machine.instructions.architecture import JumpTrueOneEighth, JumpFalse, JumpFalseHalf
+from back_end.virtual_machine.instructions.architecture import JumpFalseQuarter, JumpFalseOneEighth
+from back_end.virtual_machine.instructions.architecture import inverted_compare_and_jump_instrs
+from back_end.virtual_machine.instructions.architecture import AddressOfLocal, load_local_instrs, store_local_instrs
+from back_end.virtual_machine.instructions.architecture import referenced_obj, operns, opern, pop_instrs
+from back_end.virtual_machine.instructions.words import word_size, word_mask
+from front_end.loader.locations import loc
+
+# Windowed peephole optimizations, each rule matches a fixed sequence of instruction types (exact types, not
+# subclasses, since instructions of different widths/semantics subclass one another) and returns the sequence of
+# instructions replacing the window or None if it doesn't apply.
+# Rules are re-applied until no rule fires, jump targets are respected: a window may only start at a jump target
+# (the replacement takes over as the target), any other referenced instruction within it must be kept along with
+# every instruction following it, ie the window may only be shortened before it.
+# Instruction and Operand act as wild cards matching any instruction or operand respectively.
+
+word_bits = 8 * word_size
+
+
+def matches(element, element_type):
+    return type(element) is element_type or (element_type in wild_cards and isinstance(element, element_type))
+wild_cards = {Instruction, Operand}
+
+
+class PeepholeRule(object):
+    def __init__(self, name, pattern, func):
+        self.name, self.pattern, self.func, self.hits = name, pattern, func, 0
+
+    def __len__(self):
+        return len(self.pattern)
+
+    def match(self, window):
+        return len(window) == len(self.pattern) and all(imap(matches, window, self.pattern))
+
+    def __call__(self, window):
+        return self.func(*window)
+
+    def __repr__(self):
+        return '{n}({p}): {h}'.format(n=self.name, p=', '.join(t.__name__ for t in self.pattern), h=self.hits)
+
+
+peephole_rules = []  # all registered rules, in order of registration (priority) ...
+
+
+def peephole_rule(*pattern):
+    def register(func):
+        peephole_rules.append(PeepholeRule(func.__name__, pattern, func))
+        return func
+    return register
+
+
+def hit_counts(rules=None):  # rules sharing the same function (different patterns) are counted together ...
+    counts = {}
+    for rule in (peephole_rules if rules is None else rules):
+        counts[rule.name] = counts.get(rule.name, 0) + rule.hits
+    return counts
+
+
+def reset_hit_counts(rules=None):
+    for rule in (peephole_rules if rules is None else rules):
+        rule.hits = 0
+
+
+def signed(value):
+    value &= word_mask
+    return value - (word_mask + 1) if value >> (word_bits - 1) else value
+
+
+def immediate(instr):  # the integral value pushed by instr, None if its not known (addresses) ...
+    operand = opern(instr)
+    if type(operand) in {int, long}:
+        return operand
+    if isinstance(operand, Word) and not isinstance(operand, Reference) and type(operand.value) in {int, long}:
+        return operand.value
+    return None
+
+
+folds = {
+    Add: lambda a, b: a + b,
+    Subtract: lambda a, b: a - b,
+    Multiply: lambda a, b: a * b,
+    And: lambda a, b: a & b,
+    Or: lambda a, b: a | b,
+    Xor: lambda a, b: a ^ b,
+    ShiftLeft: lambda a, b: a << b if 0 <= b < word_bits else None,
+}
+
+
+def fold_constants(binary_type):  # Push a; Push b; Op -> Push (a Op b)
+    def fold(push_0, push_1, instr):
+        operand_0, operand_1 = immediate(push_0), immediate(push_1)
+        if operand_0 is not None and operand_1 is not None:
+            value = folds[binary_type](operand_0, operand_1)
+            return None if value is None else (Push(loc(push_0), signed(value)),)
+    fold.__name__ = 'fold_' + binary_type.__name__.lower()
+    return fold
+
+for _binary_type in folds:
+    peephole_rule(Push, Push, _binary_type)(fold_constants(_binary_type))
+
+
+def combine_constants(binary_type):  # Push a; Op; Push b; Op -> Push (a Op b); Op for associative, Add/Subtract
+    def combine(push_0, instr_0, push_1, instr_1):
+        operand_0, operand_1 = immediate(push_0), immediate(push_1)
+        if operand_0 is not None and operand_1 is not None:
+            return Push(loc(push_0), signed(folds[binary_type](operand_0, operand_1))), instr_0
+    combine.__name__ = 'combine_' + binary_type.__name__.lower()
+    return combine
+
+for _binary_type in (Add, Multiply, And, Or, Xor):
+    peephole_rule(Push, _binary_type, Push, _binary_type)(combine_constants(_binary_type))
+
+
+@peephole_rule(Push, Add, Push, Subtract)
+def combine_add_subtract(push_0, add, push_1, subtract):
+    operand_0, operand_1 = immediate(push_0), immediate(push_1)
+    if operand_0 is not None and operand_1 is not None:
+        return Push(loc(push_0), signed(operand_0 - operand_1)), add
+
+
+@peephole_rule(Push, Subtract, Push, Add)
+def combine_subtract_add(push_0, subtract, push_1, add):
+    operand_0, operand_1 = immediate(push_0), immediate(push_1)
+    if operand_0 is not None and operand_1 is not None:
+        return Push(loc(push_0), signed(operand_1 - operand_0)), add
+
+
+identities = {Add: 0, Subtract: 0, Or: 0, Xor: 0, ShiftLeft: 0, ShiftRight: 0, Multiply: 1, And: -1}
+
+
+def remove_identity(binary_type):  # Push 0; Add -> (nothing), Push 1; Multiply -> (nothing) ...
+    def remove(push, instr):
+        if immediate(push) is not None and signed(immediate(push)) == identities[binary_type]:
+            return ()
+    remove.__name__ = 'remove_identity_' + binary_type.__name__.lower()
+    return remove
+
+for _binary_type in identities:
+    peephole_rule(Push, _binary_type)(remove_identity(_binary_type))
+
+
+@peephole_rule(Push, Pop)
+def remove_push_pop(push, pop):
+    return ()
+
+
+@peephole_rule(DupSingle, Pop)
+def remove_dup_pop(dup, pop):
+    return ()
+
+
+@peephole_rule(SwapSingle, SwapSingle)
+def remove_swap_single_swap_single(swap_0, swap_1):
+    return ()
+
+
+@peephole_rule(Swap, Swap)
+def remove_swap_swap(swap_0, swap_1):
+    if opern(swap_0) == opern(swap_1) and type(opern(swap_0)) in {int, long}:
+        return ()
+
+
+@peephole_rule(Pop, Pop)
+def combine_pops(pop_0, pop_1):
+    return Allocate(loc(pop_0), 2 * word_size),
+
+
+@peephole_rule(Allocate, Pop)
+def combine_allocate_pop(allocate, pop):
+    if type(opern(allocate)) in {int, long}:
+        return Allocate(loc(allocate), opern(allocate) + word_size),
+
+
+@peephole_rule(Allocate, Allocate)
+def combine_allocates(allocate_0, allocate_1):
+    if type(opern(allocate_0)) in {int, long} and type(opern(allocate_1)) in {int, long}:
+        return Allocate(loc(allocate_0), opern(allocate_0) + opern(allocate_1)),
+
+
+@peephole_rule(Allocate)
+def remove_empty_allocate(allocate):
+    if type(opern(allocate)) in {int, long}:
+        if not opern(allocate):
+            return ()
+        if opern(allocate) in pop_instrs:
+            return next(pop_instrs[opern(allocate)](loc(allocate))),
+
+
+@peephole_rule(AddressOfLocal, Push, Add)
+def combine_local_offset(addr_instr, push, add):  # AddressOfLocal a; Push b; Add -> AddressOfLocal (a + b)
+    if type(opern(addr_instr)) in {int, long} and immediate(push) is not None:
+        return AddressOfLocal(loc(addr_instr), signed(opern(addr_instr) + immediate(push))),
+
+
+def fuse_local_access(addr_instr, instr):  # AddressOfLocal a; LoadSingle -> LoadLocal a, same for SetSingle/StoreLocal
+    return (load_local_instrs.get(type(instr)) or store_local_instrs[type(instr)])(loc(addr_instr), opern(addr_instr)),
+
+for _instr_type in chain(load_local_instrs, store_local_instrs):
+    peephole_rule(AddressOfLocal, _instr_type)(fuse_local_access)
+
+
+@peephole_rule(Pass)
+def remove_pass(instr):
+    return ()
+
+
+def jump_target(jump):
+    return replacement(referenced_obj(opern(jump), None))
+
+
+@peephole_rule(RelativeJump, Instruction)
+def remove_jump_to_next(jump, instr):
+    return (instr,) if jump_target(jump) is instr else None
+
+
+inverted_jumps = dict(chain(
+    izip((JumpFalse, JumpFalseHalf, JumpFalseQuarter, JumpFalseOneEighth),
+         (JumpTrue, JumpTrueHalf, JumpTrueQuarter, JumpTrueOneEighth)),
+    izip((JumpTrue, JumpTrueHalf, JumpTrueQuarter, JumpTrueOneEighth),
+         (JumpFalse, JumpFalseHalf, JumpFalseQuarter, JumpFalseOneEighth)),
+    inverted_compare_and_jump_instrs.iteritems()
+))
+
+
+def invert_jump_over_jump(branch, jump, instr):  # JumpFalse L; RelativeJump M; L: -> JumpTrue M; L:
+    if jump_target(branch) is instr:
+        return inverted_jumps[type(branch)](loc(branch), Offset(jump_target(jump), loc(jump))), instr
+
+for _jump_type in inverted_jumps:
+    peephole_rule(_jump_type, RelativeJump, Instruction)(invert_jump_over_jump)
+
+
+def referenced_objects(instrs):
+    return imap(
+        referenced_obj,
+        ifilter(
+            lambda o: isinstance(referenced_obj(o, None), (Operand, Instruction)),
+            chain.from_iterable(imap(operns, instrs, ((),) * len(instrs)))
+        )
+    )
+
+
+def index_rules(rules):  # rules by the type of the first instruction in their window, keeping their order ...
+    rules_by_type = {}
+    for rule in rules:
+        rules_by_type.setdefault(rule.pattern[0], []).append(rule)
+    return rules_by_type
+
+
+def keeps_targets(window, new_instrs, targets):
+    # any referenced instruction (other than the first) must be kept, along with all the instructions following it.
+    return all(
+        len(window) - index <= len(new_instrs) and all(
+            imap(lambda instr, new_instr: instr is new_instr, window[index:], new_instrs[index - len(window):])
+        )
+        for index in xrange(1, len(window)) if id(window[index]) in targets
+    )
+
+
+def apply_rules(instrs, rules_by_type, targets):
+    # single pass over the instructions, applying rules (repeatedly) at every position, returns the number of hits.
+    # After a rule fires back track enough so that windows overlapping the replacement are re-examined ...
+    hits, index, back_track = 0, 0, max(imap(len, chain.from_iterable(rules_by_type.itervalues()))) - 1
+    while index < len(instrs):
+        for rule in rules_by_type.get(type(instrs[index]), ()):
+            window = instrs[index:index + len(rule)]
+            if not rule.match(window):
+                continue
+            new_instrs = rule(window)
+            if new_instrs is None or not keeps_targets(window, new_instrs, targets):
+                continue
+
+            if id(window[0]) in targets and window[0] is not (new_instrs[:1] or (None,))[0]:
+                # the replacement takes over the (first) instruction, or the next one if there is one ...
+                if new_instrs:
+                    new_target = new_instrs[0]
+                elif index + len(window) < len(instrs):
+                    new_target = instrs[index + len(window)]
+                else:  # nothing to take over, leave it as is ...
+                    continue
+                replace_instr(window[0], new_target)
+                targets.add(id(new_target))
+
+            instrs[index:index + len(window)] = new_instrs
+            rule.hits += 1
+            hits += 1
+            index = max(index - back_track, 0)
+            break
+        else:
+            index += 1
+    return hits
+
+
+@linked
+def peephole_optimization(instrs, rules=None):
+    # every referenced object is kept alive (by the referencing operand) so its id can't be re-used ...
+    targets = set(imap(id, imap(replacement, referenced_objects(instrs))))
+    rules_by_type = index_rules(peephole_rules if rules is None else rules)
+    while apply_rules(instrs, rules_by_type, targets):  # until we reach a fixed point ...
+        pass
+    return update_instruction_references(instrs)
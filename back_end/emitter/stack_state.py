@@ -7,7 +7,7 @@ from front_end.parser.types import CType, c_type
 from front_end.parser.ast.declarations import Declaration, Declarator
 
 from back_end.emitter.c_types import size
-from back_end.virtual_machine.instructions.architecture import load_base_stack_pointer, add, push
+from back_end.virtual_machine.instructions.architecture import address_of_local
 
 from back_end.emitter.expressions.static import bind_load_address_func
 
@@ -38,7 +38,7 @@ class Stack(object):
 
 def bind_instructions(obj, offset):
     def load_address(self, location):
-        return add(load_base_stack_pointer(location), push(self.offset, location), location)
+        return address_of_local(self.offset, location)
 
     obj.offset = offset
     obj.load_address = bind_load_address_func(load_address, obj)
@@ -12,8 +12,8 @@ from front_end.parser.ast.statements import LabelStatement
 from front_end.parser.types import c_type, void_pointer_type, VoidType, char_type, ArrayType
 
 from back_end.virtual_machine.instructions.architecture import Pass, relative_jump, allocate, load
-from back_end.virtual_machine.instructions.architecture import Offset, load_base_stack_pointer, add, push, set_instr
-from back_end.virtual_machine.instructions.architecture import Integer, absolute_jump, Allocate, RelativeJump, Address
+from back_end.virtual_machine.instructions.architecture import Offset, address_of_local, set_instr
+from back_end.virtual_machine.instructions.architecture import Integer, return_instr, Allocate, RelativeJump, Address
 from back_end.emitter.c_types import size
 
 from back_end.emitter.expressions.cast import cast
@@ -46,7 +46,7 @@ def continue_statement(stmnt, symbol_table):
 
 
 def return_instrs(location):  # Jump back, caller is responsible for cleaning up as well as set up.
-    return absolute_jump(load(load_base_stack_pointer(location), size(void_pointer_type), location), location)
+    return return_instr(location)
 
 
 def return_statement(stmnt, symbol_table):
@@ -61,7 +61,7 @@ def return_statement(stmnt, symbol_table):
         cast(symbol_table['__ expression __'](exp(stmnt), symbol_table), c_type(exp(stmnt)), return_type, loc(stmnt)),
         set_instr(
             load(
-                add(load_base_stack_pointer(loc(stmnt)), push(size(void_pointer_type), loc(stmnt)), loc(stmnt)),
+                address_of_local(size(void_pointer_type), loc(stmnt)),  # pointer to the return value ...
                 size(void_pointer_type),
                 loc(stmnt)
             ),
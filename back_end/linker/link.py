@@ -1,7 +1,7 @@
 __author__ = 'samyvilar'
 
-from itertools import chain, ifilter, ifilterfalse, imap, starmap, izip, repeat
-from back_end.emitter.cpu import word_size
+from itertools import chain, ifilter, ifilterfalse, imap, starmap, repeat
+from back_end.virtual_machine.instructions.words import word_size
 
 try:
     import cPickle as pickle
@@ -10,17 +10,22 @@ except ImportError as _:
 
 from front_end.loader.locations import loc
 from utils.symbol_table import SymbolTable
+from utils.rules import identity
 import back_end.emitter.object_file as object_file
+from back_end.emitter.object_file import Reference
+from back_end.emitter.emit import buffered
 from back_end.emitter.c_types import size
 
 from front_end.parser.types import void_pointer_type
 
-from back_end.virtual_machine.instructions.architecture import halt, Byte, Double, Instruction, referenced_obj
+from back_end.virtual_machine.instructions.architecture import halt, Byte, Double, Instruction
 from back_end.virtual_machine.instructions.architecture import Address, Offset, operns, RelativeJump, Word, Pass
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
 
 from back_end.emitter.declarations.declaration import declaration
 from back_end.emitter.statements.statement import statement
 from back_end.emitter.expressions.expression import expression
+from back_end.emitter.optimizer.dead_code import remove_unreachable
 
 from front_end.parser.ast.declarations import Declaration, name, Extern
 
@@ -49,25 +54,36 @@ def insert(symbol, symbol_table):  # insert definition if it has any binaries el
     ((symbol.binaries and insert_definition) or insert_declaration)(symbol, symbol_table)
 
 
-def static(instrs, symbol_table=None, libraries=()):
-    symbol_table = SymbolTable() if symbol_table is None else symbol_table
-    references = {}
-    for instr in instrs:
-        for o in operns(instr, ()):
-            if isinstance(referenced_obj(o, None), object_file.Reference):
-                references[referenced_obj(o).name] = o
-        yield instr
-
-    for ref_name in ifilterfalse(symbol_table.__contains__, references.iterkeys()):
-        try:
-            l = next(ifilter(lambda lib, ref_name=ref_name: ref_name in lib, libraries))
-            for instr in static(binaries(l[ref_name], symbol_table), symbol_table, libraries):
-                yield instr
-        except StopIteration as _:
-            raise ValueError('{l} Could no locate symbol {s}'.format(l=loc(references[ref_name]), s=ref_name))
+def binaries(symbol, symbol_table, program, optimizer=identity):
+    # link the binaries of symbol into program, Code is optimized (as Instruction objects) along the way ...
+    insert(symbol, symbol_table)
+    instrs = buffered(symbol).binaries
+    if instrs and isinstance(symbol, object_file.Code) and optimizer is not identity:
+        instrs = InstructionBuffer(optimizer(instrs.instructions()), program.word_size)
+    if instrs:
+        program.link(instrs, symbol.name)
+    return instrs
 
 
-def shared(instrs, symbol_table=None, libraries=()):
+def static(program, symbol_table=None, libraries=(), optimizer=identity):
+    # link in the library symbols referenced but not defined, as well as those they reference in turn ...
+    symbol_table = SymbolTable() if symbol_table is None else symbol_table
+    pending = [program]
+    while pending:
+        instrs = pending.pop()
+        for ref_name, index in instrs.referenced_symbols().iteritems():
+            if ref_name in symbol_table:
+                continue
+            lib = next(ifilter(lambda lib, ref_name=ref_name: ref_name in lib, libraries), None)
+            if lib is None:
+                raise ValueError('{l} Could no locate symbol {s}'.format(
+                    l=instrs.location(index * instrs.word_size), s=ref_name
+                ))
+            pending.append(binaries(lib[ref_name], symbol_table, program, optimizer))
+    return program
+
+
+def shared(program, symbol_table=None, libraries=(), optimizer=identity):
     raise NotImplementedError
 
 
@@ -75,29 +91,15 @@ def library(symbols, symbol_table=None):
     symbol_table = symbol_table or SymbolTable()
     for symbol in symbols:
         insert(symbol, symbol_table)
-        symbol.binaries = tuple(symbol.binaries)
+        buffered(symbol)
     return symbol_table
 
-terminal = object()
-
-
-def binaries(symbol, symbol_table):
-    insert(symbol, symbol_table)
-    bins = iter(symbol.binaries)
-    first_element = next(bins, terminal)
-    if first_element is not terminal:
-        symbol.first_element = first_element
-        yield first_element
-        for instr in bins:
-            yield instr
-
 
 def set_binaries(symbol):
     assert not symbol.binaries and isinstance(symbol, object_file.Data)
-    instrs = starmap(Byte, repeat((0, loc(symbol)), symbol.size))
-    first_instr = next(instrs, terminal)
-    symbol.first_element = Pass(loc(symbol)) if first_instr is terminal else first_instr  # zero sized decl use Pass
-    symbol.binaries = chain((symbol.first_element,), instrs)
+    symbol.binaries = InstructionBuffer(  # zero sized declarations use Pass ...
+        starmap(Byte, repeat((0, loc(symbol)), symbol.size)) if symbol.size else (Pass(loc(symbol)),)
+    )
     return symbol.binaries
 
 
@@ -123,36 +125,77 @@ class Library(object):
         return self._source
 
 
+def references(symbol):  # names of all the symbols referenced by the binaries of symbol ...
+    return buffered(symbol).binaries.referenced_symbols().iterkeys()
+
+
+def gc_sections(symbols, roots, libraries=()):
+    # only keep the symbols reachable from roots (symbol names), either defined in symbols or within a library,
+    # removing any unreachable instructions within functions along the way ...
+    symbol_table, ordered_symbols, reachable, pending = SymbolTable(), [], {}, list(roots)
+    for symbol in symbols:  # emit all binaries in order, since emitting a symbol may depend on previous ones ...
+        insert(symbol, symbol_table)
+        ordered_symbols.append(buffered(symbol))
+
+    while pending:
+        symbol_name = pending.pop()
+        if symbol_name in reachable:
+            continue
+        if symbol_name in symbol_table:
+            symbol = symbol_table[symbol_name]
+        else:  # unresolved symbols are left for the linker to report ...
+            symbol = next((lib[symbol_name] for lib in libraries if symbol_name in lib), None)
+            if symbol is None:
+                continue
+            ordered_symbols.append(symbol)
+        if isinstance(symbol, object_file.Code) and symbol.binaries:
+            symbol.binaries = InstructionBuffer(remove_unreachable(buffered(symbol).binaries.instructions()))
+        reachable[symbol_name] = symbol
+        pending.extend(references(symbol))
+
+    return ifilter(lambda s: reachable.get(s.name) is s, ordered_symbols)
+
+
 default_entry_point = Declaration('main', FunctionType(IntegerType()))
 
 
-def executable(symbols, symbol_table=None, entry_point=default_entry_point, libraries=(), linker=static):
+def executable(
+    symbols,
+    symbol_table=None,
+    entry_point=default_entry_point,
+    libraries=(),
+    linker=static,
+    gc=False,
+    optimizer=identity
+):
+    # link all the symbols (and those referenced within libraries) into a single InstructionBuffer, starting with
+    # the call to the entry point, declarations (uninitialized data) follow and __end__ (the heap) comes last ...
     location = '__SOP__'  # Start of Program
     symbol_table = SymbolTable() if symbol_table is None else symbol_table
-    __end__ = Word(0, location)
     libs = tuple(imap(Library, libraries))
+    program = InstructionBuffer()
+    __end__ = object_file.Data('__end__', (Word(0, location),), 0, None, location)  # start of the heap ...
+    insert(__end__, symbol_table)
 
     symbols = chain(
         symbols,  # add heap pointer(s) ...
         (
             object_file.Data(
-                '__base_heap_ptr__', (Address(__end__, location),), size(void_pointer_type), None, location
+                '__base_heap_ptr__', (Address(Reference('__end__'), location),), size(void_pointer_type), None, location
             ),
             object_file.Data(
-                '__heap_ptr__', (Address(__end__, location),), size(void_pointer_type), None, location
+                '__heap_ptr__', (Address(Reference('__end__'), location),), size(void_pointer_type), None, location
             ),
         )
     )
 
-    def declarations(symbol_table):
-        # iterate over all symbols withing symbol_table that do not have binaries (they should be declarations)
-        for v in chain.from_iterable(imap(set_binaries, ifilterfalse(lambda s: s.binaries, symbol_table.itervalues()))):
-            yield v   # emit default binaries for declarations ...
+    if gc:  # omit any symbol (and instruction) unreachable from the entry point ...
+        symbols = gc_sections(symbols, (name(entry_point),), libs)
 
     # inject declaration into temp symbol_table to generate entry point function call instructions ...
     st = {'__ expression __': expression}
     _ = declaration(entry_point, st)
-    instr_seq = chain(
+    program.extend(optimizer(chain(
         statement(  # call entry point ...
             FunctionCallExpression(
                 IdentifierExpression(name(entry_point), c_type(entry_point), location),
@@ -163,25 +206,26 @@ def executable(symbols, symbol_table=None, entry_point=default_entry_point, libr
             st
         ),
         halt(location),  # Halt machine on return ...
-        chain.from_iterable(starmap(binaries, izip(symbols, repeat(symbol_table)))),
-    )            # link all foreign symbols and emit binaries for declarations ...
-    return chain(linker(instr_seq, symbol_table, libs), declarations(symbol_table), (__end__,))
+    )))
+    for symbol in symbols:
+        binaries(symbol, symbol_table, program, optimizer)
+    linker(program, symbol_table, libs, optimizer)  # link all foreign symbols ...
 
+    for symbol in ifilterfalse(lambda s: s.binaries, symbol_table.itervalues()):  # emit binaries for declarations ...
+        program.link(set_binaries(symbol), symbol.name)
+    program.link(buffered(__end__).binaries, __end__.name)
+    return program
 
-def resolve(instrs, symbol_table):
-    # resolve all references ... replace Address(obj=Reference(symbol_name)) by Address(obj=instr)
-    references = []
-    for instr in instrs:
-        references.extend(
-            ifilter(lambda o: isinstance(referenced_obj(o, None), object_file.Reference), operns(instr, ()))
-        )
-        yield instr
 
-    for operand in references:
-        symbol = symbol_table[operand.obj.name]
-        if not hasattr(symbol, 'first_element'):
-            raise ValueError('{l} Unable to resolve symbol {s}'.format(l=loc(symbol), s=symbol))
-        operand.obj = symbol.first_element
+def resolve(instrs, symbol_table):
+    # resolve all references ... each reference to a symbol (of symbol_table) by the index of the first word of its
+    # binaries, sealing the linked instructions ...
+    for symbol_name, index in instrs.referenced_symbols().iteritems():
+        if symbol_name not in symbol_table or symbol_name not in instrs.symbols:
+            raise ValueError('{l} Unable to resolve symbol {s}'.format(
+                l=instrs.location(index * instrs.word_size), s=symbol_name
+            ))
+    return instrs.seal()
 
 
 def set_addresses(instrs, addresses=None):  # assign addresses ...
@@ -0,0 +1,176 @@
+__author__ = 'samyvilar'
+
+import sys
+import mmap
+import struct
+from array import array
+from itertools import izip, imap
+
+from front_end.loader.locations import loc
+from back_end.virtual_machine.instructions.architecture import Address, Offset
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer, LocationTable
+from back_end.virtual_machine.instructions.buffer import word_format, machine_word, location_key
+
+# Executable image layout, every field is little endian and every section is word aligned:
+#   header: magic, version, word_size, number_of_words, entry_point,
+#           number_of_relocations, number_of_location_runs, size_of_file_names, number_of_symbols, size_of_symbol_names
+#   words: the pre-addressed machine words exactly as the C virtual machine reads them (addresses are virtual)
+#   relocations: the virtual address of every word holding a virtual address (translated to physical at load time)
+#   location runs: (start address, file id, line, column) quadruples sorted by start address
+#   symbols: the virtual address of the first word of every linked symbol, sorted
+#   file names: '\0' separated file names indexed by file id
+#   symbol names: '\0' separated names of the symbols, in the same order.
+magic = '\x7fCVMIMG\x00'
+version = 2
+header_format = '<8s9Q'
+header_size = struct.calcsize(header_format)
+
+
+def encode(elements, word_size, locations=True):
+    # elements must be the output of linker.set_addresses, references are only resolved once its been exhausted
+    # so record them and update their words at the end ...
+    words, relocations, location_runs, file_ids = array(word_format), array(word_format), array(word_format), {}
+    references, previous_key = [], None
+
+    for element in elements:
+        index = element.address / word_size
+        if index != len(words):
+            raise ValueError('{l} Expected a contiguous address {e} got {g}'.format(
+                l=loc(element), e=len(words) * word_size, g=element.address
+            ))
+        if isinstance(element, (Address, Offset)) and type(element.obj) not in {int, long}:
+            references.append((index, element))
+            words.append(0)
+        else:
+            words.append(machine_word(element))
+
+        if isinstance(element, Address):
+            relocations.append(element.address)
+
+        if locations:
+            key = location_key(loc(element), file_ids)
+            if key != previous_key:
+                location_runs.extend((element.address,) + key)
+                previous_key = key
+
+    for index, element in references:
+        if type(element.obj) not in {int, long}:
+            raise ValueError('{l} Expected an int/long got {g}'.format(l=loc(element), g=type(element.obj)))
+        words[index] = machine_word(element)
+
+    file_names = sorted(file_ids.iterkeys(), key=file_ids.__getitem__)
+    return words, relocations, location_runs, file_names
+
+
+def little_endian(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def dump(elements, file_obj, word_size, locations=True, entry_point=0):
+    # elements is either an InstructionBuffer or the output of linker.set_addresses (which has no symbols) ...
+    if isinstance(elements, InstructionBuffer):
+        words, relocations, location_runs, file_names = elements.encode(locations)
+        symbols = elements.symbol_addresses() if locations else ()
+    else:
+        words, relocations, location_runs, file_names = encode(elements, word_size, locations)
+        symbols = ()
+    file_names = '\0'.join(file_names)
+    symbol_addresses = array(word_format, (address for address, _ in symbols))
+    symbol_names = '\0'.join(name for _, name in symbols)
+    file_obj.write(struct.pack(
+        header_format,
+        magic,
+        version,
+        word_size,
+        len(words),
+        entry_point,
+        len(relocations),
+        len(location_runs) / 4,
+        len(file_names),
+        len(symbol_addresses),
+        len(symbol_names),
+    ))
+    for section in imap(little_endian, (words, relocations, location_runs, symbol_addresses)):
+        file_obj.write(section.tostring())
+    file_obj.write(file_names)
+    file_obj.write(symbol_names)
+
+
+def is_image(file_name):
+    with open(file_name, 'rb') as file_obj:
+        return file_obj.read(len(magic)) == magic
+
+
+class Image(object):
+    # Memory mapped executable image, words are never copied by python (copy on write mapping) ...
+    def __init__(self, file_name):
+        with open(file_name, 'rb') as file_obj:
+            self.mapping = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        header = struct.unpack(header_format, self.mapping[:header_size])
+        if header[0] != magic:
+            raise ValueError('{f} is not an executable image'.format(f=file_name))
+        if header[1] != version:
+            raise ValueError('{f} unsupported image version {v}, expected {e}'.format(
+                f=file_name, v=header[1], e=version
+            ))
+        _, _, self.word_size, self.number_of_words, self.entry_point, \
+            number_of_relocations, number_of_location_runs, size_of_file_names, \
+            number_of_symbols, size_of_symbol_names = header
+
+        self.words_offset = header_size
+        self.relocations_offset = self.words_offset + self.number_of_words * self.word_size
+        self.locations_offset = self.relocations_offset + number_of_relocations * self.word_size
+        self.symbols_offset = self.locations_offset + 4 * number_of_location_runs * self.word_size
+        self.file_names_offset = self.symbols_offset + number_of_symbols * self.word_size
+        self.symbol_names_offset = self.file_names_offset + size_of_file_names
+
+        self.relocations = self.section(self.relocations_offset, number_of_relocations)
+        symbol_names = self.mapping[self.symbol_names_offset:self.symbol_names_offset + size_of_symbol_names]
+        self.locations = LocationTable(
+            self.section(self.locations_offset, 4 * number_of_location_runs),
+            self.mapping[self.file_names_offset:self.file_names_offset + size_of_file_names].split('\0'),
+            izip(self.section(self.symbols_offset, number_of_symbols), symbol_names.split('\0'))
+        )
+
+    def section(self, offset, length):
+        values = array(word_format)
+        values.fromstring(self.mapping[offset:offset + length * self.word_size])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    @property
+    def size(self):
+        return self.number_of_words * self.word_size
+
+    def words(self):
+        return self.section(self.words_offset, self.number_of_words)
+
+    @property
+    def location_values(self):  # (file id, line, column) of every location run ...
+        return tuple(izip(self.locations.file_ids, self.locations.lines, self.locations.columns))
+
+    def location(self, address):
+        return self.locations.location(address)
+
+    @property
+    def symbols(self):  # {address: name} of every linked symbol ...
+        return self.locations.symbols
+
+    def close(self):
+        self.mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def read(file_name):
+    return Image(file_name)
+
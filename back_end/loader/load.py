@@ -2,9 +2,21 @@ __author__ = 'samyvilar'
 
 from front_end.loader.locations import loc
 from back_end.virtual_machine.instructions.architecture import Address, Offset
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer, LocationTable
+from back_end.loader.image import encode
+from back_end.virtual_machine.instructions.words import word_size
 
 
-def load(elem_seq, mem):
+def load(elem_seq, mem):  # elem_seq is either an InstructionBuffer or the output of linker.set_addresses
+    if hasattr(mem, 'load_words'):  # encode everything into a single buffer and let the machine relocate it ...
+        if isinstance(elem_seq, InstructionBuffer):
+            return mem.load_words(elem_seq.seal().words, elem_seq.relocations, locations=elem_seq.location_table())
+        words, relocations, location_runs, file_names = encode(elem_seq, word_size)
+        return mem.load_words(words, relocations, locations=LocationTable(location_runs, file_names))
+
+    if isinstance(elem_seq, InstructionBuffer):
+        elem_seq = elem_seq.elements()
+
     references = []
     for element in elem_seq:
         mem[element.address] = element
@@ -0,0 +1,578 @@
+__author__ = 'samyvilar'
+
+import os
+import shutil
+import subprocess
+from tempfile import mkdtemp
+from itertools import izip, imap, product
+
+from back_end.virtual_machine.instructions.architecture import Push, PushHalf, PushQuarter, PushOneEighth, Pass, Halt
+from back_end.virtual_machine.instructions.architecture import RelativeJump, AbsoluteJump, Call, AbsoluteCall, Return
+from back_end.virtual_machine.instructions.architecture import JumpTable, JumpTableHalf, JumpTableQuarter, SystemCall
+from back_end.virtual_machine.instructions.architecture import JumpTableOneEighth, LoadInstructionPointer
+from back_end.virtual_machine.instructions.architecture import LoadBaseStackPointer, SetBaseStackPointer
+from back_end.virtual_machine.instructions.architecture import LoadStackPointer, SetStackPointer, Allocate, Enter, Leave
+from back_end.virtual_machine.instructions.architecture import AddressOfLocal, LoadFlagInstruction
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer, signed_word
+from back_end.emitter.optimizer.cfg import control_flow_graph
+import back_end.virtual_machine.block_stack as block_stack
+from back_end.virtual_machine.block_stack import kinds, masks, instruction, camel_case, stack_address
+from back_end.virtual_machine.block_stack import pop, convert, address_of_local, load_local, store_local
+from back_end.virtual_machine.block_stack import load_single, set_single, dup_single, swap_single
+from back_end.virtual_machine.instructions.words import word_size
+
+# Ahead of time translation of a linked program into C, compiled by the host compiler into a shared object that
+# embeds the programs image and exports native_evaluate (same signature and kernel as the C virtual machines evaluate).
+# Every basic block becomes a C label, jumps with a known target are gotos, any other (Return, AbsoluteJump, ...) goes
+# through a table of the blocks addresses, anything else continues in the interpreter (see invalid below).
+# Within a block, values are kept in C temporaries (_s<depth>) until they have to be in memory: at the end of the
+# block, before calls, instructions moving or exposing the stack pointer and anything single stepped.
+# Locals are allocated by pushing their initial values, so they are also written before the locals below the base
+# pointer are accessed, otherwise the addresses of the values pushed since then were never exposed (LoadStackPointer
+# and LoadBaseStackPointer write everything beforehand) so no pointer can reference them.
+# Rarely used instructions (Load, Set, Dup, Swap and system calls other than exit) are single stepped through the
+# interpreter (libvm's evaluate) using a copy of the instruction followed by Halt.
+
+c_types = dict(izip(kinds, ('word_type', 'half_word_type', 'quarter_word_type', 'one_eighth_word_type')))
+signed_c_types = dict((kind, 'signed_' + c_type) for kind, c_type in c_types.iteritems())
+c_suffixes = dict(izip(kinds, ('', '_HALF', '_QUARTER', '_ONE_EIGHTH')))
+
+float_kinds = '', 'Half'  # float (c double) and half float (c float) ...
+as_float = dict(izip(float_kinds, ('word_as_float({0})', 'half_word_as_float_half({0})')))
+from_float = dict(izip(float_kinds, ('float_as_word({0})', 'half_float_as_half_word_type({0})')))
+
+vm_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'virtual_machine', 'c')
+compiler_flags = '-Ofast', '-march=native', '-fno-strict-aliasing', '-fPIC', '-shared'
+magic = '\x7fELF'
+
+
+def literal(value, kind=''):
+    return block_stack.literal(value, kind, 'ULL')
+
+
+class Stack(block_stack.Stack):  # values in the temporaries _s<depth>, memory through pointers of the values type ...
+    stack_pointer, base_pointer, temporary, scratch = '_stack_pointer', '_base_pointer', '_s{0}', 'operand_{0}'
+
+    def __init__(self, emit):
+        super(Stack, self).__init__(emit, number_of_operands=2)  # system calls use two operands ...
+
+    def assign(self, name, value):
+        self.emit('{n} = {v};'.format(n=name, v=value))
+
+    def load(self, kind, address):
+        return '*({t} *)({a})'.format(t=c_types[kind], a=address)
+
+    def store(self, kind, address, value):
+        self.emit('*({t} *)({a}) = ({t}){v};'.format(t=c_types[kind], a=address, v=value))
+
+
+class Translation(object):
+    def __init__(self, instrs):
+        self.instrs = instrs.seal()
+        self.relocations = set(instrs.relocations)
+        self.graph = control_flow_graph(instrs)
+        self.blocks = dict((block.first.address, block) for block in self.graph)
+        self.lines, self.steps = [], []
+        self.stack = Stack(self.emit)
+        for block in self.graph:
+            self.block(block)
+
+    def emit(self, line, indent=8):
+        self.lines.append(' ' * indent + line)
+
+    def word(self, instr, index=1):  # the word index words past the instruction, either a value or an address ...
+        address = instr.address + index * word_size
+        if address in self.relocations:
+            return '((word_type)mem + {0:#x})'.format(self.instrs.words[address / word_size])
+        return self.instrs.words[address / word_size]
+
+    def operand(self, instr, index=1):
+        return signed_word(self.instrs.words[instr.address / word_size + index])
+
+    def target(self, instr, index=1):  # relative jumps (and jump tables) are relative to the end of the instruction ...
+        return instr.address + 2 * word_size + self.operand(instr, index)
+
+    def goto(self, address):
+        return 'goto block_{0};'.format(address) if address in self.blocks else 'resume({0:#x});'.format(address)
+
+    def block(self, block):
+        self.emit('block_{0}:'.format(block.first.address), indent=4)
+        for instr in block:
+            self.stack.operands = 0
+            self.emit('// {a:#x}: {i}'.format(a=instr.address, i=type(instr).__name__))
+            rules.get(type(instr), step)(self, instr)
+        if type(block.last) not in terminals:
+            self.stack.flush()
+            self.emit(self.goto(block.last.address + len(block.last) * word_size))
+
+
+def step(translation, instr):  # single step the instruction through the interpreter ...
+    words = tuple(imap(translation.word, (instr,) * len(instr), xrange(len(instr))))
+    if any(type(word) not in {int, long} for word in words):
+        raise ValueError('{i} at {a:#x} references an address and has no native implementation'.format(
+            i=type(instr).__name__, a=instr.address
+        ))
+    translation.stack.flush()
+    name = '_step_{0}'.format(instr.address)
+    translation.steps.append('static word_type {n}[] = {{{w}, INSTR_ID(HALT)}};'.format(
+        n=name, w=', '.join(imap(literal, words))
+    ))
+    translation.emit('step({n});'.format(n=name))
+
+
+def push(kind):
+    def instr(translation, instr):
+        translation.stack.push(kind, literal(translation.word(instr), kind), is_literal=True)
+    return instr
+
+
+def binary(operator, kind):
+    def instr(translation, _):
+        right, left = translation.stack.pop(kind), translation.stack.pop(kind)
+        translation.stack.push(kind, '({t}){l} {o} ({t}){r}'.format(t=c_types[kind], l=left, o=operator, r=right))
+    return instr
+
+
+def not_instr(kind):
+    def instr(translation, _):
+        translation.stack.push(kind, '~({t}){v}'.format(t=c_types[kind], v=translation.stack.pop(kind)))
+    return instr
+
+
+def binary_float(operator, kind):
+    def instr(translation, _):
+        right, left = translation.stack.pop(kind), translation.stack.pop(kind)
+        translation.stack.push(kind, from_float[kind].format('{l} {o} {r}'.format(
+            l=as_float[kind].format(left), o=operator, r=as_float[kind].format(right)
+        )))
+    return instr
+
+
+def compare(kind):  # same flags as the interpreter, the left operand is the deepest ...
+    def instr(translation, _):
+        stack, c_type = translation.stack, c_types[kind]
+        right, left = stack.pop(kind), stack.pop(kind)
+        difference = stack.operand('({t}){l} - ({t}){r}'.format(t=c_type, l=left, r=right))
+        zero = stack.operand('~(word_type)({d} == 0) + 1'.format(d=difference))
+        translation.emit(
+            '_flags = (BIT(NON_ZERO_FLAG_INDEX) | (DEFAULT_CARRY_BORROW_FLAGS << (({t}){r} > ({t}){l})) | '
+            '(DEFAULT_MOST_SIGNIFICANT_BIT_FLAGS << ({d} >= MSB_MASK{s}()))) ^ ({z} & NON_ZERO_RELATED_FLAGS);'.format(
+                t=c_type, r=right, l=left, d=difference, s=c_suffixes[kind], z=zero
+            )
+        )
+        translation.emit('_flags += {z} & (ZERO_RELATED_FLAGS | BIT(NON_ZERO_FLAG_INDEX));'.format(z=zero))
+    return instr
+
+
+def compare_float(kind):
+    def instr(translation, _):
+        stack = translation.stack
+        right, left = stack.pop(kind), stack.pop(kind)
+        zero = stack.operand('~(word_type)((float_temp = {l} - {r}) == 0.0) + 1'.format(
+            l=as_float[kind].format(left), r=as_float[kind].format(right)
+        ))
+        translation.emit(
+            '_flags = (BIT(NON_ZERO_FLAG_INDEX) | (DEFAULT_MOST_SIGNIFICANT_BIT_FLAGS << (float_temp < 0.0))) '
+            '^ ({z} & BIT(NON_ZERO_NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX));'.format(z=zero)
+        )
+        translation.emit(
+            '_flags += {z} & (ZERO_RELATED_FLAGS | BIT(NON_CARRY_BORROW_FLAG_INDEX) | BIT(NON_ZERO_FLAG_INDEX));'.format(
+                z=zero
+            )
+        )
+    return instr
+
+
+def load_flag(flag_index):
+    def instr(translation, _):
+        translation.stack.push('', 'flag_from_value(_flags, {f})'.format(f=flag_index))
+    return instr
+
+
+def jump_if(kind, condition):
+    def instr(translation, instr):
+        value = translation.stack.pop(kind)
+        translation.stack.flush()
+        translation.emit('if (({t}){v} {c} 0) {g}'.format(
+            t=c_types[kind], v=value, c=condition, g=translation.goto(translation.target(instr))
+        ))
+    return instr
+
+
+def compare_and_jump(kind, c_type, operator):
+    def instr(translation, instr):
+        right, left = translation.stack.pop(kind), translation.stack.pop(kind)
+        translation.stack.flush()
+        translation.emit('if (({t}){l} {o} ({t}){r}) {g}'.format(
+            t=c_type, l=left, o=operator, r=right, g=translation.goto(translation.target(instr))
+        ))
+    return instr
+
+
+def compare_float_and_jump(condition):
+    def instr(translation, instr):
+        right, left = translation.stack.pop(''), translation.stack.pop('')
+        translation.stack.flush()
+        translation.emit('float_temp = word_as_float({l}) - word_as_float({r});'.format(l=left, r=right))
+        translation.emit('if ({c}) {g}'.format(c=condition, g=translation.goto(translation.target(instr))))
+    return instr
+
+
+def jump_table(kind):
+    def instr(translation, instr):
+        value = translation.stack.pop(kind)
+        translation.stack.flush()
+        number_of_cases = translation.operand(instr, 2)
+        translation.emit('switch (({t}){v})'.format(t=c_types[kind], v=value))
+        translation.emit('{')
+        cases = set()
+        for index in xrange(3, 3 + number_of_cases):
+            key = translation.word(instr, index) & masks[kind]
+            if key not in cases:  # keys are unique, unless they only differ by bits above the values size ...
+                cases.add(key)
+                translation.emit('    case {k}: {g}'.format(
+                    k=literal(key), g=translation.goto(translation.target(instr, index + number_of_cases))
+                ))
+        translation.emit('    default: {g}'.format(g=translation.goto(translation.target(instr))))
+        translation.emit('}')
+    return instr
+
+
+def relative_jump(translation, instr):
+    translation.stack.flush()
+    translation.emit(translation.goto(translation.target(instr)))
+
+
+def call(translation, instr):
+    translation.stack.flush()
+    translation.emit('push(_stack_pointer, (word_type)mem + {r:#x});'.format(r=instr.address + len(instr) * word_size))
+    translation.emit('_base_pointer = _stack_pointer;')
+    translation.emit(translation.goto(translation.target(instr)))
+
+
+def absolute_call(translation, instr):
+    address = translation.stack.pop('')
+    translation.stack.flush()
+    translation.emit('push(_stack_pointer, (word_type)mem + {r:#x});'.format(r=instr.address + len(instr) * word_size))
+    translation.emit('_base_pointer = _stack_pointer;')
+    translation.emit('indirect_jump({a});'.format(a=address))
+
+
+def absolute_jump(translation, _):
+    address = translation.stack.pop('')
+    translation.stack.flush()
+    translation.emit('indirect_jump({a});'.format(a=address))
+
+
+def return_instr(translation, _):
+    translation.stack.flush()
+    translation.emit('indirect_jump(*(word_type *)_base_pointer);')
+
+
+def halt(translation, instr):
+    translation.stack.flush()
+    translation.emit('halt({a:#x});'.format(a=instr.address))
+
+
+def system_call(translation, instr):
+    translation.stack.flush()
+    translation.emit('system_call({a:#x});'.format(a=instr.address))
+
+
+def load_instruction_pointer(translation, instr):
+    translation.stack.push('', '((word_type)mem + {a:#x})'.format(a=instr.address), is_literal=True)
+
+
+def load_base_stack_pointer(translation, _):
+    translation.stack.flush()
+    translation.stack.push('', '_base_pointer')
+
+
+def set_base_stack_pointer(translation, _):
+    translation.emit('_base_pointer = {v};'.format(v=translation.stack.pop('')))
+
+
+def load_stack_pointer(translation, _):  # the stack is exposed, write it to memory ...
+    translation.stack.flush()
+    translation.stack.push('', '_stack_pointer')
+
+
+def set_stack_pointer(translation, _):
+    value = translation.stack.pop('')
+    translation.stack.flush()
+    translation.emit('_stack_pointer = {v};'.format(v=value))
+
+
+def allocate(translation, instr):
+    translation.stack.flush()
+    translation.emit('_stack_pointer = {a};'.format(a=stack_address(translation.operand(instr), '_stack_pointer')))
+
+
+def enter(translation, instr):  # allocate the return value and save the base pointer ...
+    translation.stack.flush()
+    translation.emit('_stack_pointer = {a};'.format(a=stack_address(-translation.operand(instr), '_stack_pointer')))
+    translation.stack.push('', '_base_pointer')
+
+
+def leave(translation, instr):
+    translation.stack.flush()
+    translation.emit('_stack_pointer = {a};'.format(a=stack_address(translation.operand(instr), '_base_pointer')))
+    translation.emit('_base_pointer = pop(_stack_pointer);')
+
+
+def postfix_update(kind):
+    def instr(translation, instr):
+        stack = translation.stack
+        address = stack.operand(stack.pop(''))  # the value takes the place of the address ...
+        stack.push(kind, '*({t} *){a}'.format(t=c_types[kind], a=address))
+        translation.emit('*({t} *){a} += ({t}){q};'.format(
+            t=c_types[kind], a=address, q=literal(translation.word(instr), kind)
+        ))
+    return instr
+
+
+def flag_index_name(flag_type):  # LoadZeroCarryBorrowFlag => ZERO_CARRY_BORROW_FLAG_INDEX ...
+    name = flag_type.__name__[len('Load'):]
+    return ''.join('_' + c if c.isupper() and index else c for index, c in enumerate(name)).upper() + '_INDEX'
+
+
+rules = {
+    Pass: lambda translation, instr: None,
+    RelativeJump: relative_jump,
+    AbsoluteJump: absolute_jump,
+    Call: call,
+    AbsoluteCall: absolute_call,
+    Return: return_instr,
+    Halt: halt,
+    SystemCall: system_call,
+    LoadInstructionPointer: load_instruction_pointer,
+    LoadBaseStackPointer: load_base_stack_pointer,
+    SetBaseStackPointer: set_base_stack_pointer,
+    LoadStackPointer: load_stack_pointer,
+    SetStackPointer: set_stack_pointer,
+    Allocate: allocate,
+    Enter: enter,
+    Leave: leave,
+    AddressOfLocal: address_of_local,
+}
+rules.update(izip((Push, PushHalf, PushQuarter, PushOneEighth), imap(push, kinds)))
+rules.update(izip((JumpTable, JumpTableHalf, JumpTableQuarter, JumpTableOneEighth), imap(jump_table, kinds)))
+rules.update((flag_type, load_flag(flag_index_name(flag_type))) for flag_type in LoadFlagInstruction.__subclasses__())
+
+for _kind in kinds:
+    rules.update((
+        (instruction('Pop' + _kind), pop(_kind)),
+        (instruction('Not' + _kind), not_instr(_kind)),
+        (instruction('Compare' + _kind), compare(_kind)),
+        (instruction('JumpTrue' + _kind), jump_if(_kind, '!=')),
+        (instruction('JumpFalse' + _kind), jump_if(_kind, '==')),
+        (instruction('LoadLocal' + _kind), load_local(_kind)),
+        (instruction('StoreLocal' + _kind), store_local(_kind)),
+        (instruction('LoadSingle' + _kind), load_single(_kind)),
+        (instruction('SetSingle' + _kind), set_single(_kind)),
+        (instruction('PostfixUpdate' + _kind), postfix_update(_kind)),
+        (instruction('DupSingle' + _kind), dup_single(_kind)),
+        (instruction('SwapSingle' + _kind), swap_single(_kind)),
+    ))
+    rules.update(
+        (instruction(_name + _kind), binary(_operator, _kind)) for _name, _operator in (
+            ('Add', '+'), ('Subtract', '-'), ('Multiply', '*'), ('Divide', '/'), ('Mod', '%'),
+            ('ShiftLeft', '<<'), ('ShiftRight', '>>'), ('Or', '|'), ('And', '&'), ('Xor', '^'),
+        )
+    )
+    for _signed, _from_kind in product(('', 'Signed'), kinds):  # integral => float ...
+        _from_type = (signed_c_types if _signed else c_types)[_from_kind]
+        rules[instruction('ConvertToFloatFrom' + _signed + _from_kind)] = convert(
+            _from_kind, '', 'float_as_word((float_type)({f}){{0}})'.format(f=_from_type)
+        )
+        rules[instruction('ConvertToHalfFloatFrom' + _signed + _from_kind)] = convert(
+            _from_kind, 'Half', 'half_float_as_half_word_type((half_float_type)({f}){{0}})'.format(f=_from_type)
+        )
+    rules[instruction('ConvertTo{k}FromFloat'.format(k=_kind))] = convert(
+        '', _kind, '({t})word_as_float({{0}})'.format(t=c_types[_kind])
+    )
+    rules[instruction('ConvertTo{k}FromHalfFloat'.format(k=_kind))] = convert(
+        'Half', _kind, '({t})half_word_as_float_half({{0}})'.format(t=c_types[_kind])
+    )
+
+for _to_signed, _to_kind, _from_signed, _from_kind in product(('', 'Signed'), kinds, ('', 'Signed'), kinds):
+    _name = 'ConvertTo{ts}{tk}From{fs}{fk}'.format(ts=_to_signed, tk=_to_kind, fs=_from_signed, fk=_from_kind)
+    if _to_kind != _from_kind and instruction(_name):  # signed to or from, the value is sign extended ...
+        rules[instruction(_name)] = convert(_from_kind, _to_kind, '({t})({f}){{0}}'.format(
+            t=(signed_c_types if _to_signed else c_types)[_to_kind],
+            f=(signed_c_types if _to_signed or _from_signed else c_types)[_from_kind],
+        ))
+
+rules.update((
+    (instruction('ConvertToHalfFloatFromFloat'), convert(
+        '', 'Half', 'half_float_as_half_word_type((half_float_type)word_as_float({0}))'
+    )),
+    (instruction('ConvertToFloatFromHalfFloat'), convert(
+        'Half', '', 'float_as_word((float_type)half_word_as_float_half({0}))'
+    )),
+))
+
+for _kind in float_kinds:
+    rules.update(
+        (instruction(_name + 'Float' + _kind), binary_float(_operator, _kind))
+        for _name, _operator in (('Add', '+'), ('Subtract', '-'), ('Multiply', '*'), ('Divide', '/'))
+    )
+    rules[instruction('CompareFloat' + _kind)] = compare_float(_kind)
+
+for (_condition, _operator), _signed, _kind in product(
+    (('EQUAL', '=='), ('NOT_EQUAL', '!='), ('LESS', '<'), ('GREATER', '>'), ('LESS_OR_EQUAL', '<='),
+     ('GREATER_OR_EQUAL', '>=')),
+    ('', 'Signed', 'Unsigned'),
+    ('', 'Half'),
+):
+    _name = 'JumpIf' + camel_case(_condition) + _signed + _kind
+    if instruction(_name):
+        rules[instruction(_name)] = compare_and_jump(
+            _kind, (signed_c_types if _signed == 'Signed' else c_types)[_kind], _operator
+        )
+
+rules.update(  # the difference is tested, so each condition is the exact inverse of another (NaN) ...
+    (instruction('JumpIf' + _name + 'Float'), compare_float_and_jump(_condition)) for _name, _condition in (
+        ('Equal', 'float_temp == 0.0'), ('NotEqual', '!(float_temp == 0.0)'),
+        ('Less', 'float_temp < 0.0'), ('GreaterOrEqual', '!(float_temp < 0.0)'),
+        ('LessOrEqual', 'float_temp <= 0.0'), ('Greater', '!(float_temp <= 0.0)'),
+    )
+)
+
+terminals = {  # instructions that never fall through to the next one ...
+    RelativeJump, AbsoluteJump, Call, AbsoluteCall, Return, Halt, SystemCall,
+    JumpTable, JumpTableHalf, JumpTableQuarter, JumpTableOneEighth
+}
+
+
+prelude = r"""
+#define NUMBER_OF_WORDS {number_of_words}
+
+// single step instrs (ending with Halt) through the interpreter ...
+#define step(instrs) do {{                                                                                  \
+        set_stack_pointer(cpu, _stack_pointer); set_base_pointer(cpu, _base_pointer); set_flags(cpu, _flags);  \
+        set_instr_pointer(cpu, (word_type)(instrs));                                                           \
+        evaluate(cpu, mem, os);                                                                                \
+        _stack_pointer = stack_pointer(cpu); _base_pointer = base_pointer(cpu); _flags = flags(cpu);           \
+    }} while (0)
+
+// jump to the block at the (physical) address addr, anything else continues in the interpreter ...
+#define indirect_jump(addr) do {{                                                                           \
+        _instr_pointer = (addr);                                                                               \
+        _index = _instr_pointer - (word_type)mem;                                                              \
+        if (_index >= NUMBER_OF_WORDS * WORD_SIZE || _index % WORD_SIZE)                                       \
+            goto invalid;                                                                                      \
+        goto *(&&invalid + blocks[_index / WORD_SIZE]);                                                        \
+    }} while (0)
+
+#define resume(address) do {{ _instr_pointer = (word_type)mem + (address); goto invalid; }} while (0)
+#define halt(address) do {{ _instr_pointer = (word_type)mem + (address); goto end; }} while (0)
+
+// exit is handled here, as the interpreter does, any other system call returns through the stubs Halt ...
+#define system_call(address) do {{                                                                          \
+        if ((unsigned char)*(word_type *)_stack_pointer == (unsigned char)SYS_CALL_EXIT)                       \
+        {{                                                                                                     \
+            operand_1 = *(word_type *)(_base_pointer + WORD_SIZE);                                             \
+            for (_file = opened_files(os); _file; _file = next_file_node(_file))                               \
+                fflush(file_pointer(_file));                                                                   \
+            _stack_pointer = _initial_stack_pointer;                                                           \
+            _base_pointer = _initial_base_pointer;                                                             \
+            push(_stack_pointer, operand_1);                                                                   \
+            halt(address);                                                                                     \
+        }}                                                                                                     \
+        operand_0 = *(word_type *)_base_pointer;                                                               \
+        *(word_type *)_base_pointer = (word_type)&_system_call[1];                                             \
+        step(_system_call);                                                                                    \
+        *(word_type *)_base_pointer = operand_0;                                                               \
+        if (instr_pointer(cpu) != (word_type)&_system_call[1])  /* the interpreter halted ... */               \
+            halt(address);                                                                                     \
+        indirect_jump(operand_0);                                                                              \
+    }} while (0)
+
+static word_type _system_call[] = {{INSTR_ID(SYSTEM_CALL), INSTR_ID(HALT)}};
+"""
+
+
+def words(values, per_line=4):
+    values = tuple(imap(literal, values)) or ('0',)
+    for index in xrange(0, len(values), per_line):
+        yield '    ' + ', '.join(values[index:index + per_line]) + ','
+
+
+def translate(instrs):  # C source lines of the (linked) instructions ...
+    instrs = instrs if isinstance(instrs, InstructionBuffer) else InstructionBuffer(instrs, word_size)
+    translation = Translation(instrs)
+    stack = translation.stack
+
+    yield '// Generated by back_end/native/translate.py, do not edit.'
+    yield '#include "cpu.h"'
+    yield '#include "kernel.h"'
+    for line in prelude.format(number_of_words=len(instrs.words)).splitlines():
+        yield line
+    yield 'word_type native_number_of_words = NUMBER_OF_WORDS;'
+    yield 'word_type native_words[NUMBER_OF_WORDS + 1] = {'  # (never empty) ...
+    for line in words(instrs.words):
+        yield line
+    yield '};'
+    yield 'word_type native_number_of_relocations = {0};'.format(len(instrs.relocations))
+    yield 'word_type native_relocations[{0}] = {{'.format(len(instrs.relocations) + 1)
+    for line in words(instrs.relocations):
+        yield line
+    yield '};'
+    for line in translation.steps:
+        yield line
+    yield ''
+    yield 'FUNC_SIGNATURE(native_evaluate)'
+    yield '{'
+    yield '    static const int blocks[NUMBER_OF_WORDS + 1] = {  // offsets of the blocks by word index ...'
+    for address in sorted(translation.blocks):
+        yield '        [{i}] = &&block_{a} - &&invalid,'.format(i=address / word_size, a=address)
+    yield '    };'
+    yield '    register word_type'
+    yield '        _stack_pointer = stack_pointer(cpu), _base_pointer = base_pointer(cpu),'
+    yield '        _instr_pointer = instr_pointer(cpu), _flags = flags(cpu);'
+    yield '    word_type _initial_stack_pointer = _stack_pointer, _initial_base_pointer = _base_pointer, _index;'
+    yield '    word_type {0};'.format(', '.join(imap('operand_{0}'.format, xrange(stack.number_of_operands))))
+    if stack.depth:
+        yield '    word_type {0};'.format(', '.join(imap('_s{0}'.format, xrange(stack.depth))))
+    yield '    float_type float_temp;'
+    yield '    file_node_type *_file;'
+    yield ''
+    yield '    indirect_jump(_instr_pointer);'
+    for line in translation.lines:
+        yield line
+    yield ''
+    yield '    invalid:  // not the start of a block, continue in the interpreter ...'
+    yield '        set_stack_pointer(cpu, _stack_pointer); set_base_pointer(cpu, _base_pointer); set_flags(cpu, _flags);'
+    yield '        set_instr_pointer(cpu, _instr_pointer);'
+    yield '        evaluate(cpu, mem, os);'
+    yield '        return ;'
+    yield ''
+    yield '    end:'
+    yield '        set_stack_pointer(cpu, _stack_pointer); set_base_pointer(cpu, _base_pointer); set_flags(cpu, _flags);'
+    yield '        set_instr_pointer(cpu, _instr_pointer);'
+    yield '}'
+
+
+def build(instrs, file_name, source_file_name=None, compiler='gcc', flags=compiler_flags):
+    # translate and compile the instructions into the shared object file_name (linked against libvm),
+    # the source is kept in its own directory so cpu.h always comes from vm_dir ...
+    directory = None if source_file_name else mkdtemp()
+    source_file_name = source_file_name or os.path.join(directory, 'native.c')
+    try:
+        with open(source_file_name, 'w') as source_file:
+            for line in translate(instrs):
+                source_file.write(line + '\n')
+        subprocess.check_call((compiler,) + tuple(flags) + (
+            '-I', vm_dir, source_file_name, '-o', file_name, '-L', vm_dir, '-lvm', '-Wl,-rpath,' + vm_dir
+        ))
+    except (OSError, subprocess.CalledProcessError) as er:
+        raise ValueError('Failed to compile {f} using {c}: {e}'.format(f=file_name, c=compiler, e=er))
+    finally:
+        if directory:
+            shutil.rmtree(directory)
+
+
+def is_shared_object(file_name):
+    with open(file_name, 'rb') as file_obj:
+        return file_obj.read(len(magic)) == magic
@@ -0,0 +1,162 @@
+__author__ = 'samyvilar'
+
+from itertools import izip, imap
+
+import back_end.virtual_machine.instructions.architecture as architecture
+from back_end.virtual_machine.instructions.words import word_size
+
+# Shared by the translations of basic blocks, to python (back_end/emitter/blocks.py) and to C (back_end/native):
+# values pushed within a block are kept in temporaries until they have to be in memory, each translation only gives
+# the names of its pointers and temporaries along with the syntax of its assignments, loads and stores (see Stack).
+# The rules below only use the translations stack and operand(instr), the value of the instructions first operand.
+
+kinds = '', 'Half', 'Quarter', 'OneEighth'  # suffixes of the instruction names ...
+sizes = dict(izip(kinds, (word_size, word_size / 2, word_size / 4, word_size / 8)))
+masks = dict((kind, (1 << (8 * size)) - 1) for kind, size in sizes.iteritems())
+
+
+def instruction(name, default=None):
+    return getattr(architecture, name, default)
+
+
+def camel_case(name):  # LESS_OR_EQUAL => LessOrEqual ...
+    return ''.join(imap(str.capitalize, name.split('_')))
+
+
+def literal(value, kind='', suffix=''):  # anything but an int (an expression) is left as is ...
+    return '{0:#x}{1}'.format(value & masks[kind], suffix) if type(value) in {int, long} else value
+
+
+def stack_address(offset, pointer):
+    return '{p} {o} {m}'.format(p=pointer, o='-' if offset < 0 else '+', m=abs(offset)) if offset else pointer
+
+
+class Stack(object):
+    # Values pushed within the current block that have yet to be written to memory (deepest first), each one being
+    # either a literal or a temporary, the machines stack pointer is stack_pointer + offset ...
+    stack_pointer = base_pointer = None  # names of the pointers ...
+    temporary = scratch = None  # formats of the names of the values and of the scratch operands, by index ...
+
+    def __init__(self, emit, number_of_operands=0):
+        self.emit, self.values, self.offset = emit, [], 0
+        self.operands = 0  # scratch operands used by the current instruction ...
+        self.depth, self.number_of_operands = 0, number_of_operands  # temporaries to declare ...
+
+    def assign(self, name, value):
+        raise NotImplementedError
+
+    def load(self, kind, address):  # expression of the value of the given kind at address ...
+        raise NotImplementedError
+
+    def store(self, kind, address, value):
+        raise NotImplementedError
+
+    def address(self, offset=0):
+        return stack_address(self.offset + offset, self.stack_pointer)
+
+    def operand(self, value):  # copy of value in a scratch operand ...
+        name = self.scratch.format(self.operands)
+        self.operands += 1
+        self.number_of_operands = max(self.number_of_operands, self.operands)
+        self.assign(name, value)
+        return name
+
+    def push(self, kind, value, is_literal=False):
+        name = value if is_literal else self.temporary.format(len(self.values))
+        if name != value:
+            self.assign(name, value)
+        self.values.append((kind, name))
+        self.offset -= sizes[kind]
+        self.depth = max(self.depth, len(self.values))
+
+    def peek(self, kind):
+        if self.values and self.values[-1][0] == kind:
+            return self.values[-1][1]
+        self.flush()  # different sizes, the value (or part of it) is in memory ...
+        return self.operand(self.load(kind, self.address()))
+
+    def pop(self, kind):
+        value = self.peek(kind)
+        if self.values:
+            self.values.pop()
+        self.offset += sizes[kind]
+        return value
+
+    def drop(self, kind):
+        if not self.values or self.values[-1][0] != kind:
+            self.flush()
+        self.values = self.values[:-1]
+        self.offset += sizes[kind]
+
+    def flush(self):  # write the values to memory and update the stack pointer ...
+        offset = self.offset
+        for kind, value in reversed(self.values):
+            self.store(kind, stack_address(offset, self.stack_pointer), value)
+            offset += sizes[kind]
+        if self.offset:
+            self.assign(self.stack_pointer, self.address())
+        self.values, self.offset = [], 0
+
+
+def pop(kind):
+    def instr(translation, _):
+        translation.stack.drop(kind)
+    return instr
+
+
+def convert(from_kind, to_kind, expression):
+    def instr(translation, _):
+        translation.stack.push(to_kind, expression.format(translation.stack.pop(from_kind)))
+    return instr
+
+
+def local(translation, instr):  # the address of the local, which may have yet to be written if below the base ...
+    if translation.operand(instr) < 0:
+        translation.stack.flush()
+    return stack_address(translation.operand(instr), translation.stack.base_pointer)
+
+
+def address_of_local(translation, instr):
+    translation.stack.push('', local(translation, instr))
+
+
+def load_local(kind):
+    def instr(translation, instr):
+        translation.stack.push(kind, translation.stack.load(kind, local(translation, instr)))
+    return instr
+
+
+def store_local(kind):  # the value is left on the stack ...
+    def instr(translation, instr):
+        value = translation.stack.peek(kind)
+        translation.stack.store(kind, local(translation, instr), value)
+    return instr
+
+
+def load_single(kind):
+    def instr(translation, _):
+        translation.stack.push(kind, translation.stack.load(kind, translation.stack.pop('')))
+    return instr
+
+
+def set_single(kind):  # the value is left on the stack ...
+    def instr(translation, _):
+        address = translation.stack.pop('')
+        translation.stack.store(kind, address, translation.stack.peek(kind))
+    return instr
+
+
+def dup_single(kind):
+    def instr(translation, _):
+        translation.stack.push(kind, translation.stack.peek(kind))
+    return instr
+
+
+def swap_single(kind):
+    def instr(translation, _):
+        stack = translation.stack
+        top, below = stack.pop(kind), stack.pop(kind)
+        below = stack.operand(below)
+        stack.push(kind, top)
+        stack.push(kind, below)
+    return instr
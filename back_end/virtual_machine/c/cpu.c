@@ -7,11 +7,16 @@
 
 #define NUMBER_OF_FILE_NODES_PER_BLOCK 256
 
+#if !defined(THREADED) && !defined(PROFILED)  // the threaded and profiled builds share the same kernel state ...
 file_node_type
     *file_nodes_block = (file_node_type[NUMBER_OF_FILE_NODES_PER_BLOCK]){},
     *recycle_file_nodes = NULL;
 
 word_type available_file_nodes = NUMBER_OF_FILE_NODES_PER_BLOCK;
+#else
+extern file_node_type *file_nodes_block, *recycle_file_nodes;
+extern word_type available_file_nodes;
+#endif
 
 
 #define _new(recycled, _block, _available, _dest_ptr, _next_obj, _quantity) {      \
@@ -37,21 +42,95 @@ word_type available_file_nodes = NUMBER_OF_FILE_NODES_PER_BLOCK;
 
 // de-comment if planning to use ...
 #ifdef PRINT_INSTRS
-    const word_type _instr_sizes_[] = {INSTRUCTION_SIZES};
-    const char *_instr_names_[] = {INSTRUCTION_NAMES};
+    #if !defined(THREADED) && !defined(PROFILED)
+        const word_type _instr_sizes_[] = {INSTRUCTION_SIZES};
+        const char *_instr_names_[] = {INSTRUCTION_NAMES};
+    #endif
     #define get_instr_name(instr_id) (_instr_names_[instr_id])
 #endif
 
+#ifdef THREADED
+signed_word_type threaded_offsets[MAX_POSSIBLE_INSTRUCTION_ID + 1];
+
+INLINE_FUNC_SIGNATURE(evaluate_threaded)
+#elif defined(PROFILED)
+profile_type vm_profile;
+
+// inlined, calling out of the evaluator costs more than the calls it tracks (its registers being spilled) ...
+static inline void record_call(profile_frame_type *frame, word_type count) {
+    profile_call_type *call;
+    word_type probes, index = ((frame->call_site ^ (frame->callee << 7)) / WORD_SIZE) & vm_profile.calls_mask;
+    for (probes = 0; probes <= vm_profile.calls_mask; probes++, index = (index + 1) & vm_profile.calls_mask)
+    {
+        call = vm_profile.calls + index;
+        if (!call->calls || (call->call_site == frame->call_site && call->callee == frame->callee))
+        {
+            call->call_site = frame->call_site, call->callee = frame->callee;
+            call->calls++, call->instructions += count - frame->count;
+            return ;
+        }
+    }
+}
+
+// the calls whose frames are deeper (the stack grows down) than base_pointer returned, (rarely any) ...
+__attribute__((noinline, cold)) static void profile_unwind_frames(word_type base_pointer, word_type count) {
+    while (vm_profile.depth && vm_profile.frames[vm_profile.depth - 1].base_pointer < base_pointer)
+        record_call(vm_profile.frames + --vm_profile.depth, count);
+}
+
+static inline void profile_unwind(word_type base_pointer, word_type count) {
+    if (vm_profile.depth && vm_profile.frames[vm_profile.depth - 1].base_pointer < base_pointer)
+        profile_unwind_frames(base_pointer, count);
+}
+
+static inline void profile_return(word_type base_pointer, word_type count) {
+    profile_unwind(base_pointer, count);
+    if (vm_profile.depth && vm_profile.frames[vm_profile.depth - 1].base_pointer == base_pointer)
+        record_call(vm_profile.frames + --vm_profile.depth, count);
+}
+
+static inline void profile_call(
+    word_type call_site, word_type callee, word_type caller_base_pointer, word_type base_pointer, word_type count
+) {
+    profile_frame_type *frame;
+    // frames deeper than the caller's returned, without a Return (code emitted before it existed) ...
+    profile_unwind(caller_base_pointer, count);
+    if (vm_profile.depth < vm_profile.number_of_frames)
+    {
+        frame = vm_profile.frames + vm_profile.depth++;
+        frame->call_site = call_site, frame->callee = callee, frame->base_pointer = base_pointer, frame->count = count;
+    }
+}
+
+INLINE_FUNC_SIGNATURE(evaluate_profiled)
+#else
 INLINE_FUNC_SIGNATURE(evaluate)
+#endif
 {
+    #ifdef __clang__
+        #pragma clang diagnostic push
+        #pragma clang diagnostic ignored "-Winitializer-overrides"
+    #endif
+        static const void* offsets[] = {INSTR_IMPLEMENTATION_ADDRESS(get_label(INVALID))};
+    #ifdef __clang__
+        #pragma clang diagnostic pop
+    #endif
+
+    #ifdef THREADED
+        register word_type _temp_id;
+
+        if (!cpu)  // set threaded_offsets so instructions may be threaded ahead of time (see thread_instructions) ...
+        {
+            for (_temp_id = 0; _temp_id <= MAX_POSSIBLE_INSTRUCTION_ID; _temp_id++)
+                threaded_offsets[_temp_id] = (char *)offsets[_temp_id] - (char *)&&get_label(THREAD);
+            return ;
+        }
+    #endif
+
     register word_type
         _stack_pointer = stack_pointer(cpu),
         _base_pointer = base_pointer(cpu),
         _instr_pointer = instr_pointer(cpu);
-
-    word_type // keep track of initial pointers for exit system call ...
-        _initial_stack_pointer = _stack_pointer,
-        _initial_base_pointer = _base_pointer;
     
     register word_type _flags = flags(cpu);
     
@@ -65,6 +144,13 @@ INLINE_FUNC_SIGNATURE(evaluate)
     register void *_temp;
     register float_type float_temp;
 
+    register word_type _top = 0; // cached top of the stack (see below) ...
+
+    #ifdef PROFILED
+        register word_type _profile_offset = vm_profile.offset, _profiled_instr_pointer;
+        register word_type _profiled_count = vm_profile.count;
+    #endif
+
     /* OS State ... */
     file_node_type *_opened_files = opened_files(os);
     
@@ -98,15 +184,62 @@ INLINE_FUNC_SIGNATURE(evaluate)
         set_instr_pointer(cpu,  (word_type)_instr_pointer);             \
         set_flags(cpu, _flags)
 
+    // Top of stack caching: instructions producing a word or half word value leave it in _top instead of memory,
+    // the stack pointer still reserves its slot, and dispatch the next instruction through the table of that state.
+    // Instructions that don't have a cached implementation first spill the value, then continue as usual,
+    // jumps, calls and system calls always leave the cached states, so every jump target starts with an empty cache.
+    #define get_cached_label(instr, _t_)    _ ## instr ## _CACHED ## _t_ ## _IMPLEMENTATION
+    #define get_spill_label(instr, _t_)     _ ## instr ## _SPILL ## _t_ ## _IMPLEMENTATION
+    #define CACHED_TYPES IMPL_FLOAT_TYPES  // word, half word
+
+    #define CACHED_INSTRUCTIONS(_t_)                                                                                    \
+        STORE_LOCAL ## _t_, DUP_SINGLE ## _t_, NOT ## _t_, JUMP_TRUE ## _t_, JUMP_FALSE ## _t_,                         \
+        ADD ## _t_, SUBTRACT ## _t_, MULTIPLY ## _t_, DIVIDE ## _t_,                                                    \
+        MOD ## _t_, SHIFT_LEFT ## _t_, SHIFT_RIGHT ## _t_, OR ## _t_, AND ## _t_, XOR ## _t_,                           \
+        JUMP_IF_EQUAL ## _t_, JUMP_IF_NOT_EQUAL ## _t_, JUMP_IF_LESS_SIGNED ## _t_, JUMP_IF_LESS_UNSIGNED ## _t_,        \
+        JUMP_IF_GREATER_SIGNED ## _t_, JUMP_IF_GREATER_UNSIGNED ## _t_,                                                 \
+        JUMP_IF_LESS_OR_EQUAL_SIGNED ## _t_, JUMP_IF_LESS_OR_EQUAL_UNSIGNED ## _t_,                                     \
+        JUMP_IF_GREATER_OR_EQUAL_SIGNED ## _t_, JUMP_IF_GREATER_OR_EQUAL_UNSIGNED ## _t_
+    #define SPILLING_INSTRUCTIONS                                                                                       \
+        PUSH, PUSH_HALF, PUSH_QUARTER, PUSH_ONE_EIGHTH, POP, POP_HALF, POP_QUARTER, POP_ONE_EIGHTH,                     \
+        LOAD_LOCAL, LOAD_LOCAL_HALF, LOAD_LOCAL_QUARTER, LOAD_LOCAL_ONE_EIGHTH, ADDRESS_OF_LOCAL, ALLOCATE
+    #define CACHED_WORD_INSTRUCTIONS                                                                                    \
+        SPILLING_INSTRUCTIONS, CACHED_INSTRUCTIONS(),                                                                   \
+        ADD_FLOAT, SUBTRACT_FLOAT, MULTIPLY_FLOAT, DIVIDE_FLOAT,                                                        \
+        JUMP_IF_EQUAL_FLOAT, JUMP_IF_NOT_EQUAL_FLOAT, JUMP_IF_LESS_FLOAT, JUMP_IF_GREATER_FLOAT,                        \
+        JUMP_IF_LESS_OR_EQUAL_FLOAT, JUMP_IF_GREATER_OR_EQUAL_FLOAT,                                                    \
+        LOAD_SINGLE, LOAD_SINGLE_HALF, LOAD_SINGLE_QUARTER, LOAD_SINGLE_ONE_EIGHTH,                                     \
+        SET_SINGLE, SET_SINGLE_HALF, SET_SINGLE_QUARTER, SET_SINGLE_ONE_EIGHTH,                                         \
+        POSTFIX_UPDATE, POSTFIX_UPDATE_HALF, POSTFIX_UPDATE_QUARTER, POSTFIX_UPDATE_ONE_EIGHTH,                         \
+        CONVERT_TO_HALF_FROM, CONVERT_TO_SIGNED_HALF_FROM_SIGNED, CONVERT_TO_HALF_FROM_SIGNED, CONVERT_TO_SIGNED_HALF_FROM
+    #define CACHED_HALF_WORD_INSTRUCTIONS                                                                               \
+        SPILLING_INSTRUCTIONS, CACHED_INSTRUCTIONS(_HALF),                                                              \
+        CONVERT_TO_FROM_HALF, CONVERT_TO_SIGNED_FROM_SIGNED_HALF, CONVERT_TO_FROM_SIGNED_HALF, CONVERT_TO_SIGNED_FROM_HALF
+
+    #define SPILL_ENTRY(instr)              [INSTR_ID(instr)] = &&get_spill_label(instr, ),
+    #define SPILL_HALF_ENTRY(instr)         [INSTR_ID(instr)] = &&get_spill_label(instr, _HALF),
+    #define CACHED_ENTRY(instr)             [INSTR_ID(instr)] = &&get_cached_label(instr, ),
+    #define CACHED_HALF_ENTRY(instr)        [INSTR_ID(instr)] = &&get_cached_label(instr, _HALF),
+
     #ifdef __clang__
         #pragma clang diagnostic push
         #pragma clang diagnostic ignored "-Winitializer-overrides"
     #endif
-        static const void* offsets[] = {INSTR_IMPLEMENTATION_ADDRESS(get_label(INVALID))};
+        static const void
+            *cached_offsets[] = {
+                [0 ... MAX_POSSIBLE_INSTRUCTION_ID] = &&get_spill_label(INVALID, ),
+                MAP(SPILL_ENTRY, INSTRUCTIONS)
+                MAP(CACHED_ENTRY, CACHED_WORD_INSTRUCTIONS)
+            },
+            *cached_HALF_offsets[] = {
+                [0 ... MAX_POSSIBLE_INSTRUCTION_ID] = &&get_spill_label(INVALID, _HALF),
+                MAP(SPILL_HALF_ENTRY, INSTRUCTIONS)
+                MAP(CACHED_HALF_ENTRY, CACHED_HALF_WORD_INSTRUCTIONS)
+            };
     #ifdef __clang__
         #pragma clang diagnostic pop
     #endif
-    
+
     // all instructions/operands MUST BE word aligned!!!
     #define _instr_operand_(_ip, _type_)    (*(_type_ *)(_ip += WORD_SIZE))
     #define instr_operand(ip)               _instr_operand_(ip, word_type)
@@ -115,14 +248,67 @@ INLINE_FUNC_SIGNATURE(evaluate)
     #define instr_operand_ONE_EIGHTH(ip)    _instr_operand_(ip, one_eighth_word_type)
     #define get_instr_operand(_t_) instr_operand ## _t_
 
-    #define start() evaluate_instr(offsets, *(instr_value_type *)_instr_pointer)
+    // Direct threading: instruction words hold the offset of their implementation (see thread_word), so dispatching
+    // doesn't need to look it up, words that have yet to be threaded (offset 0) go through THREAD which threads them.
+    // The instruction id remains in the lowest bits, which is all the top of stack cached states dispatch on ...
+    #ifdef THREADED
+        #define dispatch(ip) goto *((char *)&&get_label(THREAD) + threaded_offset(*(word_type *)(ip)))
+    #elif defined(PROFILED)
+        // count the instruction at ip as its dispatched, evaluating to its id ...
+        #define profiled(ip) (                                                      \
+            _profiled_instr_pointer = (word_type)(ip),                              \
+            ++*(word_type *)(_profiled_instr_pointer + _profile_offset),            \
+            ++_profiled_count,                                                      \
+            *(instr_value_type *)_profiled_instr_pointer                            \
+        )
+        #define dispatch(ip) evaluate_instr(offsets, profiled(ip))
+    #else
+        #define dispatch(ip) evaluate_instr(offsets, *(instr_value_type *)(ip))
+    #endif
+
+    #define start() dispatch(_instr_pointer)
     #ifdef PRINT_INSTRS
-        #define done() printf("%s\n", get_instr_name(*(instr_value_type *)INCREMENT_POINTER(_instr_pointer))); evaluate_instr(offsets, *(instr_value_type *)_instr_pointer)
+        #define done() printf("%s\n", get_instr_name(*(instr_value_type *)INCREMENT_POINTER(_instr_pointer))); dispatch(_instr_pointer)
     #else
-        #define done() evaluate_instr(offsets, *(instr_value_type *)INCREMENT_POINTER(_instr_pointer))
+        #define done() dispatch(INCREMENT_POINTER(_instr_pointer))
+    #endif
+    #ifdef PRINT_INSTRS
+        #define done_cached(_t_) printf("%s\n", get_instr_name(*(instr_value_type *)INCREMENT_POINTER(_instr_pointer))); evaluate_instr(cached ## _t_ ## _offsets, *(instr_value_type *)_instr_pointer)
+    #elif defined(PROFILED)
+        #define done_cached(_t_) evaluate_instr(cached ## _t_ ## _offsets, profiled(INCREMENT_POINTER(_instr_pointer)))
+    #else
+        #define done_cached(_t_) evaluate_instr(cached ## _t_ ## _offsets, *(instr_value_type *)INCREMENT_POINTER(_instr_pointer))
     #endif
     #define halt() goto end
 
+    #ifdef PROFILED
+        #define profile_call_at(call_site, callee) \
+            profile_call((word_type)(call_site), (word_type)(callee), _base_pointer, _stack_pointer, _profiled_count)
+        #define profile_return_at(bp) profile_return((word_type)(bp), _profiled_count)
+    #else
+        #define profile_call_at(call_site, callee)
+        #define profile_return_at(bp)
+    #endif
+
+    #define cached(_t_) ((get_c_type(_t_))_top)
+    #define cache(_t_, value) _top = (word_type)(get_c_type(_t_))(value); done_cached(_t_)
+
+    // set the value at the (already reserved) top of the stack, caching it when possible ...
+    #define set_top(value)              cache(, value)
+    #define set_top_HALF(value)         cache(_HALF, value)
+    #define set_top_QUARTER(value)      update_QUARTER(_stack_pointer, value); done()
+    #define set_top_ONE_EIGHTH(value)   update_ONE_EIGHTH(_stack_pointer, value); done()
+    #define get_set_top(_t_) set_top ## _t_
+    // value mustn't depend on the stack pointer ...
+    #define push_top(_t_, value) get_DECREMENT_POINTER(_t_)(_stack_pointer); get_set_top(_t_)(value)
+
+    #define spill(_t_) *(get_c_type(_t_) *)_stack_pointer = cached(_t_)
+    // frequent instructions that simply spill the cached value are implemented inline for each state ...
+    #define spilling_impl(instr, body)                  \
+        get_label(instr): body                          \
+        get_cached_label(instr, ): spill(); body        \
+        get_cached_label(instr, _HALF): spill(_HALF); body
+
     
                     start(); // Start executing instructions ...
     
@@ -130,20 +316,14 @@ INLINE_FUNC_SIGNATURE(evaluate)
     get_label(PASS):
         done();
     
-    #define push_impl(_t_) \
-        get_label(PUSH ## _t_): \
-            get_push(_t_)(_stack_pointer, get_instr_operand(_t_)(_instr_pointer)); \
-            done();
-
-    #define pop_impl(_t_) \
-        get_label(POP ## _t_): \
-            get_INCREMENT_POINTER(_t_)(_stack_pointer); \
-            done();
+    #define push_impl(_t_) spilling_impl(PUSH ## _t_, push_top(_t_, get_instr_operand(_t_)(_instr_pointer));)
+    #define pop_impl(_t_) spilling_impl(POP ## _t_, get_INCREMENT_POINTER(_t_)(_stack_pointer); done();)
 
     #define get_impl_name(name) name ## _impl
     #define get_multi_word_impl(instr) _MAP_(get_impl_name(instr), IMPL_WORD_TYPES);
+    #define get_cached_multi_word_impl(instr) _MAP_(get_impl_name(cached_ ## instr), CACHED_TYPES);
     MAP(get_multi_word_impl, push, pop);
-    
+
     #define LOAD_REGISTER(value) push(_stack_pointer, (word_type)value)
     #define SET_REGISTER(dest) dest = pop(_stack_pointer)
     
@@ -156,8 +336,18 @@ INLINE_FUNC_SIGNATURE(evaluate)
         _stack_pointer = *(word_type *)((word_type)_stack_pointer);
         done();
     
-    get_label(ALLOCATE):
-        _stack_pointer += instr_operand(_instr_pointer);
+    spilling_impl(ALLOCATE, _stack_pointer += instr_operand(_instr_pointer); done();)
+
+    // allocate space for the return value and save the base pointer, the callers frame ...
+    get_label(ENTER):
+        _stack_pointer -= instr_operand(_instr_pointer);
+        LOAD_REGISTER(_base_pointer);
+        done();
+
+    // remove the callers frame (return address, return value pointer and arguments) and restore its base pointer ...
+    get_label(LEAVE):
+        _stack_pointer = _base_pointer + instr_operand(_instr_pointer);
+        SET_REGISTER(_base_pointer);
         done();
 
     #define number_of_elements  operand_0
@@ -167,8 +357,7 @@ INLINE_FUNC_SIGNATURE(evaluate)
     #define dup_single_impl(_t_)                                            \
         get_label(DUP_SINGLE ## _t_):                                       \
             operand_0 = get_peek(_t_)(_stack_pointer);                      \
-            get_push(_t_)(_stack_pointer, operand_0);                       \
-        done();
+            push_top(_t_, operand_0);
     
     #define swap_single_impl(_t_)                                                    \
         get_label(SWAP_SINGLE ## _t_):                                               \
@@ -180,13 +369,21 @@ INLINE_FUNC_SIGNATURE(evaluate)
     #define load_single_impl(_t_)                                           \
         get_label(LOAD_SINGLE ## _t_):                                      \
             source_addr = pop(_stack_pointer);                              \
-            get_push(_t_)(_stack_pointer, *(get_c_type(_t_) *)source_addr); \
-            done();
+            push_top(_t_, *(get_c_type(_t_) *)source_addr);                 \
+        get_cached_label(LOAD_SINGLE ## _t_, ):                             \
+            source_addr = _top;                                             \
+            INCREMENT_POINTER(_stack_pointer);                              \
+            push_top(_t_, *(get_c_type(_t_) *)source_addr);
     
     #define set_single_impl(_t_)                                            \
         get_label(SET_SINGLE ## _t_):                                       \
             dest_addr = pop(_stack_pointer);                                \
             *(get_c_type(_t_) *)dest_addr = get_peek(_t_)(_stack_pointer);  \
+            done();                                                         \
+        get_cached_label(SET_SINGLE ## _t_, ):                              \
+            dest_addr = _top;                                               \
+            INCREMENT_POINTER(_stack_pointer);                              \
+            *(get_c_type(_t_) *)dest_addr = get_peek(_t_)(_stack_pointer);  \
             done();
     
     #define _calc_byte_offset(number_of_elements, _t_) ((number_of_elements) * get_c_size(_t_))
@@ -228,14 +425,47 @@ INLINE_FUNC_SIGNATURE(evaluate)
                 *(get_c_type(_t_) *)get_INCREMENT_POINTER(_t_)(dest_addr) = *(get_c_type(_t_) *)get_INCREMENT_POINTER(_t_)(source_addr);    \
         done();
     
+    #define _postfix_update_(_t_)                                                               \
+            operand_3 = *(get_c_type(_t_) *)source_addr;                                        \
+            *(get_c_type(_t_) *)source_addr += (get_c_type(_t_))instr_operand(_instr_pointer);  \
+            push_top(_t_, operand_3);
     #define postfix_update_impl(_t_)                                         \
         get_label(POSTFIX_UPDATE ## _t_):                                    \
-            source_addr = pop(_stack_pointer);                                  \
-            get_push(_t_)(_stack_pointer, *(get_c_type(_t_) *)source_addr);             \
-            *(get_c_type(_t_) *)source_addr += (get_c_type(_t_))instr_operand(_instr_pointer);    \
-            done();
+            source_addr = pop(_stack_pointer);                               \
+            _postfix_update_(_t_)                                            \
+        get_cached_label(POSTFIX_UPDATE ## _t_, ):                           \
+            source_addr = _top;                                              \
+            INCREMENT_POINTER(_stack_pointer);                               \
+            _postfix_update_(_t_)
 
     MAP(get_multi_word_impl, dup_single, swap_single, load_single, set_single, dup, swap, load, set, postfix_update);
+
+    // base pointer relative (local) variables, operand being the offset ...
+    spilling_impl(ADDRESS_OF_LOCAL, push_top(, _base_pointer + instr_operand(_instr_pointer));)
+
+    #define load_local_impl(_t_) \
+        spilling_impl(LOAD_LOCAL ## _t_, push_top(_t_, *(get_c_type(_t_) *)(_base_pointer + instr_operand(_instr_pointer)));)
+
+    #define store_local_impl(_t_)                                                                                   \
+        get_label(STORE_LOCAL ## _t_):                                                                              \
+            dest_addr = _base_pointer + instr_operand(_instr_pointer);                                              \
+            *(get_c_type(_t_) *)dest_addr = get_peek(_t_)(_stack_pointer);                                          \
+            done();
+
+    MAP(get_multi_word_impl, load_local, store_local);
+
+    #define cached_store_local_impl(_t_)                                                                            \
+        get_cached_label(STORE_LOCAL ## _t_, _t_):                                                                  \
+            dest_addr = _base_pointer + instr_operand(_instr_pointer);                                              \
+            *(get_c_type(_t_) *)dest_addr = cached(_t_);                                                            \
+            done_cached(_t_);
+
+    #define cached_dup_single_impl(_t_)                                                                             \
+        get_cached_label(DUP_SINGLE ## _t_, _t_):                                                                   \
+            *(get_c_type(_t_) *)_stack_pointer = cached(_t_);                                                       \
+            get_DECREMENT_POINTER(_t_)(_stack_pointer);                                                             \
+            done_cached(_t_);
+    MAP(get_cached_multi_word_impl, store_local, dup_single);
     #undef number_of_elements
     #undef source_addr
     #undef dest_addr
@@ -270,11 +500,6 @@ INLINE_FUNC_SIGNATURE(evaluate)
     
     MAP(load_flag_impl, FLAGS);
     
-    #define DEFAULT_CARRY_BORROW_FLAGS          (BIT(NON_CARRY_BORROW_FLAG_INDEX) | BIT(NON_ZERO_NON_CARRY_BORROW_FLAG_INDEX))
-    #define DEFAULT_MOST_SIGNIFICANT_BIT_FLAGS  (BIT(NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX) | BIT(NON_ZERO_NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX))
-    #define ZERO_RELATED_FLAGS                  (BIT(ZERO_CARRY_BORROW_FLAG_INDEX) | BIT(ZERO_MOST_SIGNIFICANT_BIT_FLAG_INDEX))
-    #define NON_ZERO_RELATED_FLAGS              (BIT(NON_ZERO_NON_CARRY_BORROW_FLAG_INDEX) | BIT(NON_ZERO_NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX))
-    
     #define compare_impl(_type_)                                                                                                    \
         get_label(COMPARE ## _type_):                       /* 0xFFFF... if a == b else 0x0000.. */                                 \
             operand_2 = ~(word_type)((operand_1 = *((get_c_type(_type_) *)_stack_pointer + 1) - *(get_c_type(_type_) *)_stack_pointer) == 0) + 1;           \
@@ -322,8 +547,18 @@ INLINE_FUNC_SIGNATURE(evaluate)
         get_label(instr ## _t_): \
             BINARY_INTEGRAL(get_oper(instr), _t_); \
             done();
-    #define binary_arithmetic_impl(instr)               _binary_arithmetic_impl_(instr,)
-    #define binary_arithmetic_HALF_impl(instr)          _binary_arithmetic_impl_(instr, _HALF)
+    // word and half word results are cached ...
+    #define _cached_binary_arithmetic_impl_(instr, _t_)                                                             \
+        get_label(instr ## _t_):                                                                                    \
+            operand_0 = *((get_c_type(_t_) *)_stack_pointer + 1) get_oper(instr) *(get_c_type(_t_) *)_stack_pointer;  \
+            get_INCREMENT_POINTER(_t_)(_stack_pointer);                                                             \
+            cache(_t_, operand_0);                                                                                  \
+        get_cached_label(instr ## _t_, _t_):                                                                        \
+            operand_0 = *((get_c_type(_t_) *)_stack_pointer + 1) get_oper(instr) cached(_t_);                       \
+            get_INCREMENT_POINTER(_t_)(_stack_pointer);                                                             \
+            cache(_t_, operand_0);
+    #define binary_arithmetic_impl(instr)               _cached_binary_arithmetic_impl_(instr,)
+    #define binary_arithmetic_HALF_impl(instr)          _cached_binary_arithmetic_impl_(instr, _HALF)
     #define binary_arithmetic_QUARTER_impl(instr)       _binary_arithmetic_impl_(instr, _QUARTER)
     #define binary_arithmetic_ONE_EIGHTH_impl(instr)    _binary_arithmetic_impl_(instr, _ONE_EIGHTH)
     
@@ -333,8 +568,13 @@ INLINE_FUNC_SIGNATURE(evaluate)
     #define BINARY_NUMERIC(_o_, _t_)    FLOATING_BINARY_OPERATION ## _t_(_o_)
     #define binary_numeric_impl(instr) \
         get_label(instr ## _FLOAT): \
-            BINARY_NUMERIC(get_oper(instr), ); \
-            done();
+            float_temp = *((float_type *)_stack_pointer + 1) get_oper(instr) *(float_type *)_stack_pointer; \
+            INCREMENT_POINTER(_stack_pointer); \
+            cache(, float_as_word(float_temp)); \
+        get_cached_label(instr ## _FLOAT, ): \
+            float_temp = *((float_type *)_stack_pointer + 1) get_oper(instr) word_as_float(_top); \
+            INCREMENT_POINTER(_stack_pointer); \
+            cache(, float_as_word(float_temp));
     #define binary_numeric_HALF_impl(instr) \
         get_label(instr ## _FLOAT_HALF): \
             BINARY_NUMERIC(get_oper(instr), _HALF); \
@@ -347,8 +587,7 @@ INLINE_FUNC_SIGNATURE(evaluate)
     #define _size_difference_(from_type, to_type) (sizeof(get_c_type(from_type)) - sizeof(get_c_type(to_type)))
     #define _convert_(from_type, to_type, update_value) \
         _stack_pointer = (word_type)_stack_pointer + _size_difference_(from_type, to_type); \
-        get_update(to_type)(_stack_pointer, update_value);\
-        done();
+        get_set_top(to_type)(update_value);
     
     // unsigned Integral types => float type (c char(1 byte), short(2 bytes), int(4 bytes), long(8 bytes) => (c double))
     #define convert_to_float_impl(_from_type_) \
@@ -442,14 +681,29 @@ INLINE_FUNC_SIGNATURE(evaluate)
     #define convert_to_ONE_EIGHTH_from_(_from_)    _convert_integrals_(_from_, _ONE_EIGHTH);
     #define convert_integrals_impl(_to_)           _MAP_(convert_to ## _to_ ## _from_, ALL_BUT_NON ## _to_ ## _WORD_TYPE)
     MAP(convert_integrals_impl, IMPL_WORD_TYPES)
+
+    // cached word <==> half word, same conversions as above ...
+    #define _cached_convert_(label, from_type, to_type, to_c_type, from_c_type) \
+        get_cached_label(label, from_type): \
+            _stack_pointer = (word_type)_stack_pointer + _size_difference_(from_type, to_type); \
+            cache(to_type, (to_c_type)(from_c_type)cached(from_type));
+    #define cached_convert_integrals_impl(_from_, _to_) \
+        _cached_convert_(CONVERT_TO ## _to_ ## _FROM ## _from_, _from_, _to_, get_unsigned_c_type(_to_), get_unsigned_c_type(_from_)) \
+        _cached_convert_(CONVERT_TO_SIGNED ## _to_ ## _FROM_SIGNED ## _from_, _from_, _to_, get_signed_c_type(_to_), get_signed_c_type(_from_)) \
+        _cached_convert_(CONVERT_TO ## _to_ ## _FROM_SIGNED ## _from_, _from_, _to_, get_unsigned_c_type(_to_), get_signed_c_type(_from_)) \
+        _cached_convert_(CONVERT_TO_SIGNED ## _to_ ## _FROM ## _from_, _from_, _to_, get_signed_c_type(_to_), get_signed_c_type(_from_))
+    cached_convert_integrals_impl(, _HALF)
+    cached_convert_integrals_impl(_HALF, )
     
 
     /***************************************************************************************************************************************/
     
     #define not_impl(_t_) get_label(NOT ## _t_): update ## _t_(_stack_pointer, ~peek ## _t_(_stack_pointer)); done();
     MAP(not_impl, IMPL_WORD_TYPES);
+    #define cached_not_impl(_t_) get_cached_label(NOT ## _t_, _t_): cache(_t_, ~cached(_t_));
+    MAP(cached_not_impl, CACHED_TYPES);
     
-    #define _jump(_ip, value, _o_) evaluate_instr(offsets, *(instr_value_type *)(_ip _o_ (value)))
+    #define _jump(_ip, value, _o_) dispatch(_ip _o_ (value))
     // increase magnitude by one word to account for operand, 0 magnitude simply jumps to the next instruction ...
     #define relative_jump(_ip, magnitude) _jump(_ip, ((magnitude) + WORD_SIZE), +=)
     #define absolute_jump(_ip, addr) _jump(_ip, addr, =)
@@ -463,6 +717,25 @@ INLINE_FUNC_SIGNATURE(evaluate)
     
     get_label(RELATIVE_JUMP): // All jumps assume that the pointers are numeric types ...
         relative_jump(_instr_pointer, instr_operand(_instr_pointer));
+
+    // Calls push the return address (next instruction) and set the base pointer to it, the callee returns through it
+    get_label(CALL):
+        operand_0 = instr_operand(_instr_pointer);
+        push(_stack_pointer, _instr_pointer + WORD_SIZE);
+        profile_call_at(_instr_pointer - WORD_SIZE, _instr_pointer + operand_0 + WORD_SIZE);
+        _base_pointer = _stack_pointer;
+        relative_jump(_instr_pointer, operand_0);
+
+    get_label(ABSOLUTE_CALL):
+        operand_0 = pop(_stack_pointer);
+        push(_stack_pointer, _instr_pointer + INSTRUCTION_SIZE * WORD_SIZE);
+        profile_call_at(_instr_pointer, operand_0);
+        _base_pointer = _stack_pointer;
+        absolute_jump(_instr_pointer, operand_0);
+
+    get_label(RETURN):
+        profile_return_at(_base_pointer);
+        absolute_jump(_instr_pointer, *(word_type *)_base_pointer);
     
     #define jump_true_impl(_t_) \
         get_label(JUMP_TRUE ## _t_): \
@@ -474,6 +747,61 @@ INLINE_FUNC_SIGNATURE(evaluate)
             relative_jump(_instr_pointer, ((pop ## _t_(_stack_pointer) == 0) * instr_operand(_instr_pointer)));
     
     MAP(jump_false_impl, IMPL_WORD_TYPES);
+
+    #define cached_jump_impl(_t_) \
+        get_cached_label(JUMP_TRUE ## _t_, _t_): \
+            get_INCREMENT_POINTER(_t_)(_stack_pointer); \
+            relative_jump(_instr_pointer, ((cached(_t_) != 0) * instr_operand(_instr_pointer))); \
+        get_cached_label(JUMP_FALSE ## _t_, _t_): \
+            get_INCREMENT_POINTER(_t_)(_stack_pointer); \
+            relative_jump(_instr_pointer, ((cached(_t_) == 0) * instr_operand(_instr_pointer)));
+    MAP(cached_jump_impl, CACHED_TYPES);
+
+    // Fused Compare*, Load*Flag, JumpTrue, left operand is the deepest (integral comparisons follow C semantics)...
+    #define _compare_and_jump_(_c_type_, _oper_, right_operand)                                                        \
+        operand_0 = (*((_c_type_ *)_stack_pointer + 1) _oper_ right_operand);                                         \
+        _stack_pointer += 2 * sizeof(_c_type_);                                                                       \
+        relative_jump(_instr_pointer, (operand_0 * instr_operand(_instr_pointer)));
+    #define compare_and_jump(_c_type_, _oper_)          _compare_and_jump_(_c_type_, _oper_, *(_c_type_ *)_stack_pointer)
+    #define cached_compare_and_jump(_c_type_, _oper_)   _compare_and_jump_(_c_type_, _oper_, (_c_type_)_top)
+    #define label(instr, _t_) get_label(instr)
+
+    #define _compare_and_jump_impl_(_label_, _impl_, _t_)                                                               \
+        _label_(JUMP_IF_EQUAL ## _t_, _t_): _impl_(get_c_type(_t_), ==)                                                \
+        _label_(JUMP_IF_NOT_EQUAL ## _t_, _t_): _impl_(get_c_type(_t_), !=)                                            \
+        _label_(JUMP_IF_LESS_SIGNED ## _t_, _t_): _impl_(get_signed_c_type(_t_), <)                                    \
+        _label_(JUMP_IF_LESS_UNSIGNED ## _t_, _t_): _impl_(get_c_type(_t_), <)                                         \
+        _label_(JUMP_IF_GREATER_SIGNED ## _t_, _t_): _impl_(get_signed_c_type(_t_), >)                                 \
+        _label_(JUMP_IF_GREATER_UNSIGNED ## _t_, _t_): _impl_(get_c_type(_t_), >)                                      \
+        _label_(JUMP_IF_LESS_OR_EQUAL_SIGNED ## _t_, _t_): _impl_(get_signed_c_type(_t_), <=)                          \
+        _label_(JUMP_IF_LESS_OR_EQUAL_UNSIGNED ## _t_, _t_): _impl_(get_c_type(_t_), <=)                               \
+        _label_(JUMP_IF_GREATER_OR_EQUAL_SIGNED ## _t_, _t_): _impl_(get_signed_c_type(_t_), >=)                       \
+        _label_(JUMP_IF_GREATER_OR_EQUAL_UNSIGNED ## _t_, _t_): _impl_(get_c_type(_t_), >=)
+    #define compare_and_jump_impl(_t_)                                                                                  \
+        _compare_and_jump_impl_(label, compare_and_jump, _t_)                                                          \
+        _compare_and_jump_impl_(get_cached_label, cached_compare_and_jump, _t_)
+    MAP(compare_and_jump_impl, CACHED_TYPES);
+
+    // same as CompareFloat, the difference is tested so each condition is the exact inverse of another (NaN) ...
+    #define compare_float_and_jump(_cond_)                                                                              \
+        operand_1 = pop(_stack_pointer);                                                                                \
+        float_temp = word_as_float(pop(_stack_pointer)) - word_as_float(operand_1);                                     \
+        relative_jump(_instr_pointer, ((_cond_) * instr_operand(_instr_pointer)));
+    #define cached_compare_float_and_jump(_cond_)                                                                       \
+        INCREMENT_POINTER(_stack_pointer);                                                                              \
+        float_temp = word_as_float(pop(_stack_pointer)) - word_as_float(_top);                                          \
+        relative_jump(_instr_pointer, ((_cond_) * instr_operand(_instr_pointer)));
+
+    #define _compare_float_and_jump_impl_(_label_, _impl_)                                                              \
+        _label_(JUMP_IF_EQUAL_FLOAT, ): _impl_(float_temp == 0.0)                                                       \
+        _label_(JUMP_IF_NOT_EQUAL_FLOAT, ): _impl_(!(float_temp == 0.0))                                                \
+        _label_(JUMP_IF_LESS_FLOAT, ): _impl_(float_temp < 0.0)                                                         \
+        _label_(JUMP_IF_GREATER_OR_EQUAL_FLOAT, ): _impl_(!(float_temp < 0.0))                                          \
+        _label_(JUMP_IF_LESS_OR_EQUAL_FLOAT, ): _impl_(float_temp <= 0.0)                                               \
+        _label_(JUMP_IF_GREATER_FLOAT, ): _impl_(!(float_temp <= 0.0))
+    _compare_float_and_jump_impl_(label, compare_float_and_jump)
+    _compare_float_and_jump_impl_(get_cached_label, cached_compare_float_and_jump)
+    #undef label
     #ifdef __clang__
         #pragma clang diagnostic pop
     #endif
@@ -524,6 +852,7 @@ INLINE_FUNC_SIGNATURE(evaluate)
     get_label(SYSTEM_CALL):
         #define  _return_inline(value, ip, bp)                            \
             **(word_type **)((word_type)bp + WORD_SIZE) = value;          \
+            profile_return_at(bp);                                        \
             absolute_jump(ip, *(word_type *)((word_type)bp))
     
         #define char_c_type                 get_c_type(_ONE_EIGHTH)
@@ -547,9 +876,10 @@ INLINE_FUNC_SIGNATURE(evaluate)
                     fflush((file = file_pointer((file_node_type *)_temp))); // flush the buffers but let os close the files.
                     _temp = next_file_node(_temp);
                 }
-                // return from entry point with the exit status code, reset stack and base_pointer to their initial values ...
-                _stack_pointer = _initial_stack_pointer;
-                _base_pointer = _initial_base_pointer;
+                // return from entry point with the exit status code, reset stack and base_pointer to their initial values,
+                // (cpu is only updated once the machine stops, keeping fewer registers live across all instructions) ...
+                _stack_pointer = stack_pointer(cpu);
+                _base_pointer = base_pointer(cpu);
                            
                 push(_stack_pointer, operand_1); // set return value ...
                 halt(); // stop the machine ...
@@ -675,9 +1005,55 @@ INLINE_FUNC_SIGNATURE(evaluate)
     get_label(INVALID):
         printf("Invalid instruction!\n");
         halt();
-    
+
+    #ifdef THREADED
+    get_label(THREAD):  // the instruction wasn't threaded ahead of time, thread it in place ...
+        _temp_id = *(instr_value_type *)_instr_pointer;
+        *(word_type *)_instr_pointer = thread_word((char *)offsets[_temp_id] - (char *)&&get_label(THREAD), _temp_id);
+        evaluate_instr(offsets, _temp_id);
+    #endif
+
+    // instructions without a cached implementation, spill the cached value then continue as usual ...
+    #define spill_impl(instr)                                                                   \
+        get_spill_label(instr, ):                                                               \
+            *(word_type *)_stack_pointer = _top;                                                \
+            goto get_label(instr);                                                              \
+        get_spill_label(instr, _HALF):                                                          \
+            *(half_word_type *)_stack_pointer = (half_word_type)_top;                           \
+            goto get_label(instr);
+    MAP(spill_impl, INSTRUCTIONS)
+    spill_impl(INVALID)
+
 end:
+    #ifdef PROFILED
+        profile_return(~(word_type)0, _profiled_count);  // the calls that never returned (exit, halt) end here ...
+        vm_profile.count = _profiled_count;
+    #endif
     update_cpu(cpu); // update cpu state.
+    set_opened_files(os, _opened_files); // keep the files opened by this run ...
+}
+
+#ifdef THREADED
+// thread/unthread the instructions at each (virtual byte) address, unthreading restores the original words ...
+void thread_instructions(word_type *physical_memory, word_type *addresses, word_type number_of_addresses) {
+    word_type index, *instr;
+    if (!threaded_offsets[INSTR_ID(HALT)])
+        evaluate_threaded(NULL, NULL, NULL);
+    for (index = 0; index < number_of_addresses; index++)
+    {
+        instr = (word_type *)((unsigned char *)physical_memory + addresses[index]);
+        *instr = thread_word(threaded_offsets[*(instr_value_type *)instr], *(instr_value_type *)instr);
+    }
 }
 
+void unthread_instructions(word_type *physical_memory, word_type *addresses, word_type number_of_addresses) {
+    word_type index, *instr;
+    for (index = 0; index < number_of_addresses; index++)
+    {
+        instr = (word_type *)((unsigned char *)physical_memory + addresses[index]);
+        *instr = unthread_word(*instr);
+    }
+}
+#endif
+
 
@@ -72,6 +72,10 @@
 #define CONVERT_TO_FLOAT_FROM_INSTR_ID                              23
 #define CONVERT_TO_FLOAT_FROM_SIGNED_INSTR_ID                       24
 #define RELATIVE_JUMP_INSTR_ID                                      25
+#define JUMP_IF_EQUAL_FLOAT_INSTR_ID                                26
+#define JUMP_IF_NOT_EQUAL_FLOAT_INSTR_ID                            27
+#define JUMP_IF_LESS_FLOAT_INSTR_ID                                 28
+#define JUMP_IF_GREATER_FLOAT_INSTR_ID                              29
 #define LOAD_ZERO_FLAG_INSTR_ID                                     30
 #define LOAD_CARRY_BORROW_FLAG_INSTR_ID                             31
 #define LOAD_MOST_SIGNIFICANT_BIT_FLAG_INSTR_ID                     32
@@ -276,6 +280,46 @@
 #define CONVERT_TO_SIGNED_HALF_FROM_ONE_EIGHTH_INSTR_ID             191 // one_eight     => signed half
 #define CONVERT_TO_SIGNED_QUARTER_FROM_ONE_EIGHTH_INSTR_ID          192 // one_eighth    => signed quarter
 
+// function calls ...
+#define CALL_INSTR_ID                                               193
+#define ABSOLUTE_CALL_INSTR_ID                                      194
+#define RETURN_INSTR_ID                                             195
+#define ENTER_INSTR_ID                                              196
+#define LEAVE_INSTR_ID                                              197
+
+// base pointer relative (local) variables ...
+#define ADDRESS_OF_LOCAL_INSTR_ID                                   198
+#define LOAD_LOCAL_INSTR_ID                                         199
+#define LOAD_LOCAL_HALF_INSTR_ID                                    200
+#define LOAD_LOCAL_QUARTER_INSTR_ID                                 201
+#define LOAD_LOCAL_ONE_EIGHTH_INSTR_ID                              202
+#define STORE_LOCAL_INSTR_ID                                        203
+#define STORE_LOCAL_HALF_INSTR_ID                                   204
+#define STORE_LOCAL_QUARTER_INSTR_ID                                205
+#define STORE_LOCAL_ONE_EIGHTH_INSTR_ID                             206
+
+// Fused Compare*, Load*Flag, JumpTrue instructions ...
+#define JUMP_IF_EQUAL_INSTR_ID                                      207
+#define JUMP_IF_NOT_EQUAL_INSTR_ID                                  208
+#define JUMP_IF_LESS_SIGNED_INSTR_ID                                209
+#define JUMP_IF_LESS_UNSIGNED_INSTR_ID                              210
+#define JUMP_IF_GREATER_SIGNED_INSTR_ID                             211
+#define JUMP_IF_GREATER_UNSIGNED_INSTR_ID                           212
+#define JUMP_IF_LESS_OR_EQUAL_SIGNED_INSTR_ID                       213
+#define JUMP_IF_LESS_OR_EQUAL_UNSIGNED_INSTR_ID                     214
+#define JUMP_IF_GREATER_OR_EQUAL_SIGNED_INSTR_ID                    215
+#define JUMP_IF_GREATER_OR_EQUAL_UNSIGNED_INSTR_ID                  216
+#define JUMP_IF_EQUAL_HALF_INSTR_ID                                 217
+#define JUMP_IF_NOT_EQUAL_HALF_INSTR_ID                             218
+#define JUMP_IF_LESS_SIGNED_HALF_INSTR_ID                           219
+#define JUMP_IF_LESS_UNSIGNED_HALF_INSTR_ID                         227
+#define JUMP_IF_GREATER_SIGNED_HALF_INSTR_ID                        228
+#define JUMP_IF_GREATER_UNSIGNED_HALF_INSTR_ID                      229
+#define JUMP_IF_LESS_OR_EQUAL_SIGNED_HALF_INSTR_ID                  230
+#define JUMP_IF_LESS_OR_EQUAL_UNSIGNED_HALF_INSTR_ID                231
+#define JUMP_IF_GREATER_OR_EQUAL_SIGNED_HALF_INSTR_ID               232
+#define JUMP_IF_GREATER_OR_EQUAL_UNSIGNED_HALF_INSTR_ID             234
+
 
 
 // ******************************************************************************************************
@@ -291,9 +335,11 @@
 #define CONVERT_TO_FROM_FLOAT_INSTR_ID                              233
 
 #define JUMP_TRUE_INSTR_ID                                          235
+#define JUMP_IF_LESS_OR_EQUAL_FLOAT_INSTR_ID                        236
 
 #define DIVIDE_FLOAT_INSTR_ID                                       237
 #define SUBTRACT_FLOAT_INSTR_ID                                     238
+#define JUMP_IF_GREATER_OR_EQUAL_FLOAT_INSTR_ID                     239
 #define AND_INSTR_ID                                                241
 #define SHIFT_RIGHT_INSTR_ID                                        242
 #define COMPARE_FLOAT_INSTR_ID                                      243
@@ -346,6 +392,16 @@
 
 
 
+#define COMPARE_AND_JUMP_INSTRUCTIONS \
+    JUMP_IF_EQUAL, JUMP_IF_NOT_EQUAL, JUMP_IF_LESS_SIGNED, JUMP_IF_LESS_UNSIGNED, JUMP_IF_GREATER_SIGNED,                 \
+    JUMP_IF_GREATER_UNSIGNED, JUMP_IF_LESS_OR_EQUAL_SIGNED, JUMP_IF_LESS_OR_EQUAL_UNSIGNED,                             \
+    JUMP_IF_GREATER_OR_EQUAL_SIGNED, JUMP_IF_GREATER_OR_EQUAL_UNSIGNED,                                                 \
+    JUMP_IF_EQUAL_HALF, JUMP_IF_NOT_EQUAL_HALF, JUMP_IF_LESS_SIGNED_HALF, JUMP_IF_LESS_UNSIGNED_HALF,                   \
+    JUMP_IF_GREATER_SIGNED_HALF, JUMP_IF_GREATER_UNSIGNED_HALF, JUMP_IF_LESS_OR_EQUAL_SIGNED_HALF,                      \
+    JUMP_IF_LESS_OR_EQUAL_UNSIGNED_HALF, JUMP_IF_GREATER_OR_EQUAL_SIGNED_HALF, JUMP_IF_GREATER_OR_EQUAL_UNSIGNED_HALF,  \
+    JUMP_IF_EQUAL_FLOAT, JUMP_IF_NOT_EQUAL_FLOAT, JUMP_IF_LESS_FLOAT, JUMP_IF_GREATER_FLOAT,                           \
+    JUMP_IF_LESS_OR_EQUAL_FLOAT, JUMP_IF_GREATER_OR_EQUAL_FLOAT
+
 #define INSTRUCTIONS    \
     HALT,               \
     PUSH, POP,          \
@@ -356,6 +412,10 @@
     ADD_FLOAT, SUBTRACT_FLOAT, MULTIPLY_FLOAT, DIVIDE_FLOAT,                                        \
     CONVERT_TO_FLOAT_FROM, CONVERT_TO_FLOAT_FROM_SIGNED, CONVERT_TO_FROM_FLOAT,                     \
     ABSOLUTE_JUMP, JUMP_FALSE, JUMP_TRUE, JUMP_TABLE, RELATIVE_JUMP,                                \
+    CALL, ABSOLUTE_CALL, RETURN, ENTER, LEAVE,                                                      \
+    ADDRESS_OF_LOCAL, LOAD_LOCAL, LOAD_LOCAL_HALF, LOAD_LOCAL_QUARTER, LOAD_LOCAL_ONE_EIGHTH,        \
+    STORE_LOCAL, STORE_LOCAL_HALF, STORE_LOCAL_QUARTER, STORE_LOCAL_ONE_EIGHTH,                     \
+    COMPARE_AND_JUMP_INSTRUCTIONS,                                                                  \
     LOAD_ZERO_FLAG, LOAD_CARRY_BORROW_FLAG, LOAD_MOST_SIGNIFICANT_BIT_FLAG,                         \
     PASS, SYSTEM_CALL, POSTFIX_UPDATE,                                                              \
     COMPARE, COMPARE_FLOAT, LOAD_NON_ZERO_FLAG, LOAD_NON_ZERO_NON_CARRY_BORROW_FLAG,                \
@@ -397,7 +457,9 @@ extern const char *_instr_names_[256];
 #define WIDE_INSTRUCTION_SIZE (2*INSTRUCTION_SIZE)
 
 // TODO: add new extended instruction set ...
-#define WIDE_INSTRUCTIONS PUSH, LOAD, SET, JUMP_FALSE, JUMP_TRUE, RELATIVE_JUMP, ALLOCATE, DUP, SWAP, JUMP_TABLE, POSTFIX_UPDATE
+#define WIDE_INSTRUCTIONS PUSH, LOAD, SET, JUMP_FALSE, JUMP_TRUE, RELATIVE_JUMP, ALLOCATE, DUP, SWAP, JUMP_TABLE, POSTFIX_UPDATE, \
+    CALL, ENTER, LEAVE, ADDRESS_OF_LOCAL, LOAD_LOCAL, LOAD_LOCAL_HALF, LOAD_LOCAL_QUARTER, LOAD_LOCAL_ONE_EIGHTH, \
+    STORE_LOCAL, STORE_LOCAL_HALF, STORE_LOCAL_QUARTER, STORE_LOCAL_ONE_EIGHTH, COMPARE_AND_JUMP_INSTRUCTIONS
 #define INSTRUCTION_SIZES \
     [0 ... MAX_POSSIBLE_INSTRUCTION_ID] = INSTRUCTION_SIZE, \
     [INSTR_ID(PUSH)] = WIDE_INSTRUCTION_SIZE, \
@@ -410,7 +472,45 @@ extern const char *_instr_names_[256];
     [INSTR_ID(DUP)] = WIDE_INSTRUCTION_SIZE, \
     [INSTR_ID(SWAP)] = WIDE_INSTRUCTION_SIZE,  \
     [INSTR_ID(JUMP_TABLE)] = WIDE_INSTRUCTION_SIZE, \
-    [INSTR_ID(POSTFIX_UPDATE)] = WIDE_INSTRUCTION_SIZE
+    [INSTR_ID(POSTFIX_UPDATE)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(CALL)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(ENTER)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(LEAVE)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(ADDRESS_OF_LOCAL)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(LOAD_LOCAL)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(LOAD_LOCAL_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(LOAD_LOCAL_QUARTER)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(LOAD_LOCAL_ONE_EIGHTH)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(STORE_LOCAL)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(STORE_LOCAL_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(STORE_LOCAL_QUARTER)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(STORE_LOCAL_ONE_EIGHTH)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_EQUAL)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_NOT_EQUAL)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_SIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_UNSIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_SIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_UNSIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_OR_EQUAL_SIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_OR_EQUAL_UNSIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_OR_EQUAL_SIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_OR_EQUAL_UNSIGNED)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_EQUAL_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_NOT_EQUAL_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_SIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_UNSIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_SIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_UNSIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_OR_EQUAL_SIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_OR_EQUAL_UNSIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_OR_EQUAL_SIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_OR_EQUAL_UNSIGNED_HALF)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_EQUAL_FLOAT)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_NOT_EQUAL_FLOAT)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_FLOAT)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_FLOAT)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_LESS_OR_EQUAL_FLOAT)] = WIDE_INSTRUCTION_SIZE, \
+    [INSTR_ID(JUMP_IF_GREATER_OR_EQUAL_FLOAT)] = WIDE_INSTRUCTION_SIZE
 
 extern const word_type _instr_sizes_[MAX_POSSIBLE_INSTRUCTION_ID + 1];
 #define INSTR_SIZE(instr_id) (_instr_sizes_[(instr_id)])
@@ -463,6 +563,12 @@ struct cpu_type {
 #define set_flags(cpu, value) (flags(cpu) = (value))
 
 #define flag_from_value(value, flag_index)  ((value & BIT(flag_index)) >> flag_index)
+
+// flags set by comparisons, (see Compare in cpu.c) ...
+#define DEFAULT_CARRY_BORROW_FLAGS          (BIT(NON_CARRY_BORROW_FLAG_INDEX) | BIT(NON_ZERO_NON_CARRY_BORROW_FLAG_INDEX))
+#define DEFAULT_MOST_SIGNIFICANT_BIT_FLAGS  (BIT(NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX) | BIT(NON_ZERO_NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX))
+#define ZERO_RELATED_FLAGS                  (BIT(ZERO_CARRY_BORROW_FLAG_INDEX) | BIT(ZERO_MOST_SIGNIFICANT_BIT_FLAG_INDEX))
+#define NON_ZERO_RELATED_FLAGS              (BIT(NON_ZERO_NON_CARRY_BORROW_FLAG_INDEX) | BIT(NON_ZERO_NON_MOST_SIGNIFICANT_BIT_FLAG_INDEX))
 #define get_flag(cpu, flag) flag_from_value(flags(cpu), flag)
 
 #define zero_flag(cpu) get_flag(cpu, ZERO_FLAG_INDEX)
@@ -699,6 +805,42 @@ struct kernel_type;
 
 INLINE_FUNC_SIGNATURE(evaluate);
 
+// Direct threading (see cpu_threaded.c), a threaded instruction word holds the offset of its implementation
+// (relative to the evaluators THREAD label) above its instruction id, the id itself is left untouched ...
+#define INSTR_ID_BIT_SIZE (BYTE_BIT_SIZE * sizeof(instr_value_type))
+#define threaded_offset(instr_word) ((signed_word_type)(instr_word) >> INSTR_ID_BIT_SIZE)
+#define thread_word(offset, instr_id) (((word_type)(offset) << INSTR_ID_BIT_SIZE) | (word_type)(instr_id))
+#define unthread_word(instr_word) ((word_type)(instr_value_type)(instr_word))
+
+extern signed_word_type threaded_offsets[MAX_POSSIBLE_INSTRUCTION_ID + 1];
+INLINE_FUNC_SIGNATURE(evaluate_threaded);
+void thread_instructions(word_type *physical_memory, word_type *addresses, word_type number_of_addresses);
+void unthread_instructions(word_type *physical_memory, word_type *addresses, word_type number_of_addresses);
+
+// Profiling (see cpu_profiled.c), the execution count of the instruction at (physical) address ip is the word at
+// ip + vm_profile.offset, so the counts must span as many words as the address space.
+// Calls are tracked on a shadow stack (of number_of_frames, deeper calls aren't tracked), once they return the number
+// of instructions executed since they were made is added to their (call site, callee) entry of the calls table,
+// calls_mask + 1 entries (a power of 2) addressed openly, once full new entries are dropped ...
+typedef struct profile_frame_type {
+    word_type call_site, callee, base_pointer, count;
+} profile_frame_type;
+
+typedef struct profile_call_type {
+    word_type call_site, callee, calls, instructions;
+} profile_call_type;
+
+typedef struct profile_type {
+    word_type offset, count;  // count of all the instructions executed (by every profiled evaluation) ...
+    profile_frame_type *frames;
+    word_type number_of_frames, depth;
+    profile_call_type *calls;
+    word_type calls_mask;
+} profile_type;
+
+extern profile_type vm_profile;
+INLINE_FUNC_SIGNATURE(evaluate_profiled);
+
 #define re_interpret(value, from_type, to_type)  (((union {to_type to_value; from_type from_value;})(value)).to_value)
 #define word_as_float(word) re_interpret(word, word_type, float_type)
 #define word_as_float_half(word) re_interpret(word, word_type, half_float_type)
@@ -3,20 +3,22 @@ __author__ = 'samyvilar'
 # raise ImportError
 import os
 import sys
-import inspect
 
-from itertools import imap, izip, chain, repeat, ifilter, izip_longest
+from itertools import imap, izip, chain
 
 from ctypes import c_ulonglong, c_uint, Structure, POINTER, CDLL, CFUNCTYPE, byref, c_int, c_char_p, c_void_p
 from ctypes import c_float, c_double, cast, sizeof, pointer, c_ushort, c_ubyte, c_longlong, c_short, c_byte
+from ctypes import memmove, addressof, c_long
 from ctypes import pythonapi, py_object
 
-import struct
-from struct import pack, unpack
+from collections import defaultdict
+from weakref import proxy
 
+from front_end.loader.locations import loc
 import back_end.virtual_machine.instructions.architecture as architecture
-from back_end.virtual_machine.instructions.architecture import Address, RealOperand
-from back_end.virtual_machine.instructions.architecture import Word, Half, Quarter, OneEighth, DoubleHalf, Double
+from back_end.virtual_machine.instructions.architecture import Address, RealOperand, Halt
+from back_end.virtual_machine.instructions.locations import LocationTable
+from back_end.virtual_machine.instructions.words import pack_binaries
 
 from loggers import logging
 
@@ -153,99 +155,188 @@ class Kernel(object):
                 )
             )
             self.c_kernel_p.contents.opened_files = pointer(self.file_node_objects[-1])
-libvm.evaluate.argtypes = [POINTER(CPU), POINTER(virtual_memory_type), POINTER(kernel_type)]
-libvm.allocate_entire_physical_address_space.argtypes = []
-libvm.allocate_entire_physical_address_space.restype = POINTER(word_type)
-
-
-# Allocate entire virtual memory space so it can be shared across multiple uses ...
-shared_c_physical_memory_pointer = libvm.allocate_entire_physical_address_space()
 
-architecture_types = set(
-    ifilter(
-        lambda cls: inspect.isclass(cls)
-        and issubclass(cls, architecture.Operand)
-        and cls not in {architecture.Operand, architecture.RealOperand},
-        imap(getattr, repeat(architecture), dir(architecture))
-    )
-)
+    def c_opened_files(self):  # (file_id, FILE *) of every file known to the machine including those it opened ...
+        node = self.c_kernel_p.contents.opened_files
+        while node:
+            yield node.contents.file_id, cast(node.contents.file_pointer, c_void_p).value
+            node = node.contents.next
+
+    def checkpoint(self):
+        # the table of opened files and their positions (-1 if they can't seek), their contents aren't recorded,
+        # files given for writing only (stdout, ...) are never rewound so runs after a restore append to them ...
+        outputs = set(
+            cast(PyFile_AsFile(file_obj), c_void_p).value for file_obj in self.opened_files.itervalues()
+            if not set(getattr(file_obj, 'mode', 'r')) & {'r', '+'}
+        )
+        return tuple(
+            (file_id, file_pointer, -1 if file_pointer in outputs else libvm.ftell(file_pointer))
+            for file_id, file_pointer in self.c_opened_files()
+        )
 
-architecture_float_types = set(ifilter(
-    lambda cls: issubclass(cls, RealOperand) and cls is not RealOperand, architecture_types
-))
-architecture_integral_types = architecture_types - architecture_float_types
-
-
-def architecture_word_name(cls):
-    signed = 'signed_'
-    if issubclass(cls, OneEighth):
-        return signed + 'one_eighth_word'
-    elif issubclass(cls, Half):
-        return signed + 'half_word'
-    elif issubclass(cls, Quarter):
-        return signed + 'quarter_word'
-    elif issubclass(cls, Word):
-        return signed + 'word'
-    elif issubclass(cls, DoubleHalf):
-        return 'half_float'
-    elif issubclass(cls, Double):
-        return 'float'
-    else:
-        raise ValueError('{c} could not be identified!'.format(c=cls))
+    def restore(self, files):
+        # close the files opened since the checkpoint (by the machine) and rewind those that were opened ...
+        recorded = set(file_pointer for _, file_pointer, _ in files)
+        owned = set(cast(PyFile_AsFile(file_obj), c_void_p).value for file_obj in self.opened_files.itervalues())
+        for _, file_pointer in tuple(self.c_opened_files()):
+            if file_pointer not in recorded and file_pointer not in owned:
+                libvm.fclose(file_pointer)
+        self.file_node_objects = []
+        self.c_kernel_p.contents.opened_files = POINTER(file_node_type)()
+        for file_id, file_pointer, position in reversed(files):
+            if position != -1:
+                libvm.fseek(file_pointer, position, os.SEEK_SET)
+            self.file_node_objects.append(file_node_type(
+                self.c_kernel_p.contents.opened_files, word_type(file_id), cast(file_pointer, FILE_ptr)
+            ))
+            self.c_kernel_p.contents.opened_files = pointer(self.file_node_objects[-1])
+libvm.ftell.argtypes = [c_void_p]
+libvm.ftell.restype = c_long
+libvm.fseek.argtypes = [c_void_p, c_long, c_int]
+libvm.fseek.restype = c_int
+libvm.fclose.argtypes = [c_void_p]
+libvm.fclose.restype = c_int
+libvm.evaluate.argtypes = [POINTER(CPU), POINTER(virtual_memory_type), POINTER(kernel_type)]
+libvm.allocate_physical_address_space.argtypes = [word_type]
+libvm.allocate_physical_address_space.restype = POINTER(word_type)
+libvm.free_physical_address_space.argtypes = [POINTER(word_type), word_type]
+libvm.free_physical_address_space.restype = None
+libvm.checkpoint_physical_address_space.argtypes = [POINTER(word_type), word_type, c_int]
+libvm.checkpoint_physical_address_space.restype = c_int
+libvm.restore_physical_address_space.argtypes = [POINTER(word_type), word_type, c_int]
+libvm.restore_physical_address_space.restype = POINTER(word_type)
+libvm.reset_physical_address_space.argtypes = libvm.restore_physical_address_space.argtypes
+libvm.reset_physical_address_space.restype = libvm.restore_physical_address_space.restype
+libvm.relocate.argtypes = [POINTER(word_type), c_void_p, word_type]
+libvm.relocate.restype = None
+libvm.evaluate_threaded.argtypes = libvm.evaluate.argtypes
+libvm.evaluate_profiled.argtypes = libvm.evaluate.argtypes
+libvm.thread_instructions.argtypes = libvm.unthread_instructions.argtypes = libvm.relocate.argtypes
+libvm.thread_instructions.restype = libvm.unthread_instructions.restype = None
+
+# same as cpu.h, instruction ids are loaded as unsigned chars when they all fit, within the lowest bits of the word ...
+instr_id_mask = 0xFF if max(architecture.ids.itervalues()) <= 255 else 0xFFFF
+instruction_types = dict((instr_id, instr_type) for instr_type, instr_id in architecture.ids.iteritems())
+
+
+class profile_frame_type(Structure):
+    _fields_ = [('call_site', word_type), ('callee', word_type), ('base_pointer', word_type), ('count', word_type)]
+
+
+class profile_call_type(Structure):
+    _fields_ = [('call_site', word_type), ('callee', word_type), ('calls', word_type), ('instructions', word_type)]
+
+
+class profile_type(Structure):
+    _fields_ = [
+        ('offset', word_type), ('count', word_type),
+        ('frames', POINTER(profile_frame_type)), ('number_of_frames', word_type), ('depth', word_type),
+        ('calls', POINTER(profile_call_type)), ('calls_mask', word_type)
+    ]
+vm_profile = profile_type.in_dll(libvm, 'vm_profile')
+
+
+class Profile(object):
+    # execution counts of every instruction (by virtual address) accumulated across every profiled evaluation,
+    # kept in an address space of their own, which is only allocated as its written, the word at the same offset
+    # as the instruction holding its count, along with the calls (see cpu_profiled.c) ...
+    def __init__(self, mem, number_of_addresses=None, number_of_frames=1 << 16, number_of_calls=1 << 16):
+        self.mem = proxy(mem)
+        self.number_of_words = mem.number_of_words
+        self.number_of_addresses = number_of_addresses  # reported words, default the loaded program ...
+        self.count = 0
+        self.frames = (profile_frame_type * number_of_frames)()
+        self.calls_table = (profile_call_type * (1 << (number_of_calls - 1).bit_length()))()
+        self.c_counts_p = libvm.allocate_physical_address_space(self.number_of_words)
+        if not self.c_counts_p:
+            raise ValueError('Failed to allocate profile of {n} words'.format(n=self.number_of_words))
+
+    def __del__(self):
+        if getattr(self, 'c_counts_p', None):
+            libvm.free_physical_address_space(self.c_counts_p, self.number_of_words)
+            self.c_counts_p = None
+
+    def evaluate(self, cpu, mem, os):  # libvm's vm_profile only refers to this profile while the machine runs ...
+        vm_profile.offset = \
+            (cast(self.c_counts_p, c_void_p).value - cast(mem, c_void_p).value) % (1 << (8 * word_size))
+        vm_profile.count = self.count
+        vm_profile.frames, vm_profile.number_of_frames, vm_profile.depth = self.frames, len(self.frames), 0
+        vm_profile.calls, vm_profile.calls_mask = self.calls_table, len(self.calls_table) - 1
+        try:
+            libvm.evaluate_profiled(cpu, mem, os)
+        finally:
+            self.count = vm_profile.count
+            vm_profile.frames, vm_profile.calls = POINTER(profile_frame_type)(), POINTER(profile_call_type)()
 
-architecture_type_to_word_type = dict(izip(architecture_types, imap(architecture_word_name, architecture_types)))
+    @property
+    def calls(self):  # {(virtual address of call site, of callee): (number of calls, instructions executed by them)}
+        start = self.mem.start_of_physical_addr
+        return dict(
+            ((call.call_site - start, call.callee - start), (call.calls, call.instructions))
+            for call in self.calls_table if call.calls
+        )
 
+    @property
+    def addresses(self):  # {virtual address: number of executions}
+        counts = cast(self.c_counts_p, POINTER(word_type * (
+            self.mem.size_of_program / word_size if self.number_of_addresses is None else self.number_of_addresses
+        ))).contents
+        return dict((index * word_size, count) for index, count in enumerate(counts) if count)
 
-def get_bytes(value):
-    try:
-        return pack(word_type_formats[architecture_type_to_word_type[type(value)]], value)
-    except struct.error as er:
-        return pack(word_type_formats[architecture_type_to_word_type[type(value)]].upper(), value)
-
-
-def pack_binaries(elements, to_type=Word):
-    assert sys.byteorder == 'little'  # TODO: deal with 'big' endianness where the zeros need to be pre-appended
-    assert not word_type_sizes[architecture_type_to_word_type[to_type]] % min(word_type_sizes.itervalues())
-    return imap(to_type, chain.from_iterable(imap(  # unpack returns a tuple ...
-        unpack,
-        repeat(word_type_formats[architecture_type_to_word_type[to_type]]),
-        imap(
-            ''.join,
-            izip_longest(
-                *repeat(
-                    chain.from_iterable(imap(get_bytes, iter(elements))),
-                    word_type_sizes[architecture_type_to_word_type[to_type]]/min(word_type_sizes.itervalues())
-                ),
-                fillvalue=pack(word_type_formats[min(word_type_sizes.iteritems(), key=lambda i: i[1])[0]], 0)
-            )
-        )
-    )))  # the fillvalue will be appended which is OK for little endian but NOT for BIG endian!!!
+    @property
+    def instructions(self):  # {instruction type: number of executions}
+        words, counts = cast(self.mem.c_vm_p, POINTER(word_type)), defaultdict(int)
+        for address, count in self.addresses.iteritems():
+            instr_id = words[address / word_size] & instr_id_mask  # threaded words keep their ids ...
+            counts[instruction_types.get(instr_id, instr_id)] += count
+        return dict(counts)
 
 
 class VirtualMemory(object):
-    def __init__(self, factory_type=None, c_physical_memory_pointer=None):
+    def __init__(self, factory_type=None, c_physical_memory_pointer=None, number_of_words=None, keep_code=True):
+        # each memory maps its own address space of number_of_words (the stack starts at its end), unless given one,
+        # the locations of the loaded words are kept in a run-length table, the stored values only if keep_code ...
         self.factory_type = factory_type or word_type
-        self.c_vm_p = c_physical_memory_pointer or shared_c_physical_memory_pointer
+        self.number_of_words = number_of_words or vm_number_of_addressable_words
+        self.owns_c_vm_p = c_physical_memory_pointer is None
+        self.c_vm_p = libvm.allocate_physical_address_space(self.number_of_words) if self.owns_c_vm_p \
+            else c_physical_memory_pointer
+        if not self.c_vm_p:
+            raise ValueError('Failed to allocate virtual address space of {n} words'.format(n=self.number_of_words))
         self.start_of_physical_addr = cast(self.c_vm_p, c_void_p).value
 
         self.end_of_physical_addr = \
-            self.start_of_physical_addr + (vm_number_of_addressable_words * sizeof(self.factory_type))
-
-        if self.start_of_physical_addr == -1 or self.start_of_physical_addr == 0:
-            raise ValueError('{l} Failed to pre-allocate entire virtual address space ...')
+            self.start_of_physical_addr + (self.number_of_words * sizeof(self.factory_type))
 
-        self.code = {}
+        self.code = {} if keep_code else None
+        self.locations = LocationTable()
         self.start_of_virtual_addr = 0
 
         self.addresses = {}
         self.instrs_word_operands = {}
+        self.threaded, self.threaded_addresses = False, ()
+        self.native = None  # native_evaluate of a translated program (see load_native) ...
+        self.size_of_program = 0  # number of bytes loaded from the start of the address space ...
+        self.profile = None  # execution counts when profiled (see profiled) ...
+        self.restored_from = -1  # (copy of the descriptor of) the checkpoint last restored, see restore ...
+
+    def __del__(self):
+        if getattr(self, 'restored_from', -1) != -1:
+            os.close(self.restored_from)
+        if getattr(self, 'owns_c_vm_p', False) and self.c_vm_p:
+            libvm.free_physical_address_space(self.c_vm_p, self.number_of_words)
+            self.c_vm_p = None
 
     def __setitem__(self, key, value):
-        assert key < vm_number_of_addressable_words
+        assert key < self.number_of_words * sizeof(self.factory_type)
         if key < self.start_of_virtual_addr:  # keep track of the smallest virtual address ... (need to make sure its 0)
             self.start_of_virtual_addr = key
 
-        self.code[key] = value  # record instructions in python for debugging purposes ...
+        if self.code is not None:
+            self.code[key] = value  # record instructions in python for debugging purposes ...
+        if loc(value, None) is not None:  # (resolved references and translated addresses are plain values) ...
+            self.locations.append(key, loc(value))
+        self.size_of_program = max(self.size_of_program, key + word_size)
 
         if isinstance(value, RealOperand):
             value = next(pack_binaries((value,)))
@@ -263,10 +354,95 @@ class VirtualMemory(object):
         for key, value in chain(getattr(values, 'iteritems', lambda v=values: v)(), kwargs.iteritems()):
             self[key] = value
 
+    def load_words(self, words, relocations=(), start_addr=0, locations=None):
+        # copy a contiguous buffer of machine words in one go, then have the machine translate every virtual address
+        # found at the (virtual) addresses in relocations, words and relocations must expose the buffer protocol,
+        # along with their LocationTable if any ...
+        number_of_bytes = len(words) * words.itemsize
+        assert start_addr + number_of_bytes <= self.number_of_words * sizeof(self.factory_type)
+        memmove(self.start_of_physical_addr + start_addr, words.buffer_info()[0], number_of_bytes)
+        self.size_of_program = max(self.size_of_program, start_addr + number_of_bytes)
+        self.locations = self.locations if locations is None else locations
+        if len(relocations):
+            libvm.relocate(self.c_vm_p, relocations.buffer_info()[0], len(relocations))
+
+    def location(self, address):  # source location of the word at (virtual) address ...
+        return self.locations.location(address)
+
+    def thread(self, addresses=()):
+        # have the machine use direct threaded code (see cpu_threaded.c), the instructions at addresses (virtual)
+        # are threaded ahead of time, any other instruction the first time its executed ...
+        if len(addresses):
+            libvm.thread_instructions(self.c_vm_p, addresses.buffer_info()[0], len(addresses))
+        self.threaded, self.threaded_addresses = True, addresses
+
+    def unthread(self, addresses=None):  # restore the original instruction words (for dumps) ...
+        addresses = self.threaded_addresses if addresses is None else addresses
+        if len(addresses):
+            libvm.unthread_instructions(self.c_vm_p, addresses.buffer_info()[0], len(addresses))
+
+    def profiled(self, number_of_addresses=None):
+        # count the executions of every instruction by running on the profiling machine (see cpu_profiled.c),
+        # reporting those of the loaded program unless given the number of addresses (words) ...
+        self.profile = Profile(self, number_of_addresses)
+        return self.profile
+
+    def checkpoint(self):
+        # copy the pages touched so far into an anonymous file, returning its descriptor (see vm.c) ...
+        checkpoint = libvm.checkpoint_physical_address_space(self.c_vm_p, self.number_of_words, self.restored_from)
+        if checkpoint == -1:
+            raise ValueError('Failed to checkpoint address space of {n} words'.format(n=self.number_of_words))
+        return checkpoint
+
+    def restore(self, checkpoint):
+        # map the checkpoint privately over the address space, pages are only copied once they are written,
+        # those yet to be read are still in the checkpoint, so keep it (its copy may outlive it) for checkpoint ...
+        if not libvm.restore_physical_address_space(self.c_vm_p, self.number_of_words, checkpoint):
+            raise ValueError('Failed to restore address space from checkpoint {c}'.format(c=checkpoint))
+        if self.restored_from != -1:
+            os.close(self.restored_from)
+        self.restored_from = os.dup(checkpoint)
+
+    def reset(self, checkpoint):
+        # restore the checkpoint in place, releasing the pages touched since it was last restored (see vm.c),
+        # the address space is only mapped from it, (see restore), the first time ...
+        if self.restored_from == -1 or not os.path.sameopenfile(self.restored_from, checkpoint):
+            return self.restore(checkpoint)
+        if not libvm.reset_physical_address_space(self.c_vm_p, self.number_of_words, checkpoint):
+            raise ValueError('Failed to reset address space from checkpoint {c}'.format(c=checkpoint))
+
+    def program(self):  # what's known of the loaded program besides its words, (see Checkpoint) ...
+        return (
+            dict(self.addresses), None if self.code is None else dict(self.code), self.locations.copy(),
+            self.size_of_program, self.threaded, self.threaded_addresses
+        )
+
+    def reload(self, program):
+        addresses, code, locations, self.size_of_program, self.threaded, self.threaded_addresses = program
+        self.addresses, self.code = dict(addresses), None if code is None else dict(code)
+        self.locations = locations.copy()
+
 
 # libvm.evaluate_without_vm.argtypes = libvm.evaluate.argtypes
 
 
+def machine(mem):  # the evaluator of mem's program ...
+    if mem.profile is not None:
+        if mem.native:
+            raise ValueError('Native programs can not be profiled')
+        return mem.profile.evaluate  # threaded instruction words keep their ids in their lowest bits ...
+    return mem.native or (libvm.evaluate_threaded if mem.threaded else libvm.evaluate)
+
+
+def check_stop(cpu, mem):  # the machine halts on invalid instructions (after printing so), see cpu.c ...
+    address = cpu.instr_pointer - mem.start_of_physical_addr
+    if not mem.native and 0 <= address < mem.size_of_program and \
+            cast(cpu.instr_pointer, POINTER(word_type))[0] & instr_id_mask not in instruction_types:
+        raise ValueError('{l} Invalid instruction {w:#x} at {a:#x}'.format(
+            l=mem.location(address), w=cast(cpu.instr_pointer, POINTER(word_type))[0], a=address
+        ))
+
+
 def c_evaluate(cpu, mem, os=None):
     cpu.instr_pointer = mem.start_of_physical_addr
     cpu.base_pointer = cpu.stack_pointer = mem.end_of_physical_addr
@@ -274,12 +450,123 @@ def c_evaluate(cpu, mem, os=None):
     # translate all virtual addresses ...
     mem.update((v_addr, mem.start_of_physical_addr + addr.obj) for v_addr, addr in mem.addresses.iteritems())
 
-    libvm.evaluate(byref(cpu), mem.c_vm_p, (Kernel() if os is None else os).c_kernel_p)
+    machine(mem)(byref(cpu), mem.c_vm_p, (Kernel() if os is None else os).c_kernel_p)
+    check_stop(cpu, mem)
 
     cpu.instr_pointer = cpu.instr_pointer
     cpu.base_pointer = cpu.base_pointer
     cpu.stack_pointer = cpu.stack_pointer
 
 
+def c_resume(cpu, mem, os=None):  # continue from the cpus current state (restored checkpoint or Halt) ...
+    machine(mem)(byref(cpu), mem.c_vm_p, (Kernel() if os is None else os).c_kernel_p)
+    check_stop(cpu, mem)
+
+
+class Checkpoint(object):
+    # the registers, touched pages, loaded program and opened files of a machine, restore(...) or reset(...) returns
+    # it to this state as many times as needed, without reloading nor re-running anything up to it ...
+    def __init__(self, cpu, mem, os=None):
+        self.registers = cpu.stack_pointer, cpu.base_pointer, cpu.instr_pointer, cpu.flags
+        self.number_of_words = mem.number_of_words
+        self.program = mem.program()
+        self.memory = mem.checkpoint()
+        self.files = None if os is None else os.checkpoint()
+
+    def close(self):
+        if self.memory is not None:
+            os.close(self.memory)
+            self.memory = None
+
+    def __del__(self):
+        if getattr(self, 'memory', None) is not None:
+            self.close()
+
+
+def checkpoint(cpu, mem, os=None):
+    return Checkpoint(cpu, mem, os)
+
+
+def restore(state, cpu, mem, os=None, reset=False):
+    if state.number_of_words != mem.number_of_words:
+        raise ValueError('Checkpoint of {g} words does not match address space of {e} words'.format(
+            g=state.number_of_words, e=mem.number_of_words
+        ))
+    if reset:
+        mem.reset(state.memory)
+    else:
+        mem.restore(state.memory)
+    mem.reload(state.program)
+    cpu.stack_pointer, cpu.base_pointer, cpu.instr_pointer, cpu.flags = state.registers
+    if os is not None and state.files is not None:
+        os.restore(state.files)
+
+
+def reset(state, cpu, mem, os=None):
+    # restore the checkpoint of a machine by releasing the pages it touched since, (instead of re-mapping them),
+    # mem may have being re-loaded with another program since, large address spaces that run many (small) programs
+    # are best reset ...
+    restore(state, cpu, mem, os, reset=True)
+
+
+def run_until(cpu, mem, address, os=None):
+    # evaluate the program from its start up to the instruction at (virtual) address, leaving the cpu on it,
+    # by temporarily replacing it with Halt (threaded machines thread it when its reached) ...
+    if mem.native:
+        raise ValueError('Native programs can not be stopped at an address')
+    instr_pointer = cast(mem.start_of_physical_addr + address, POINTER(word_type))
+    instr = instr_pointer[0]
+    instr_pointer[0] = architecture.ids[Halt]
+    try:
+        c_evaluate(cpu, mem, os)
+    finally:
+        instr_pointer[0] = instr
+    if cpu.instr_pointer != mem.start_of_physical_addr + address:
+        raise ValueError('{l} Program exited before reaching address {a}'.format(l=mem.location(address), a=address))
+
+
+def load_image(image, mem):
+    # copy the pre-addressed words straight from the mapped image and translate its virtual addresses ...
+    if image.word_size != word_size:
+        raise ValueError('Image word size {g} does not match machine word size {e}'.format(
+            g=image.word_size, e=word_size
+        ))
+    if image.size > mem.number_of_words * word_size:
+        raise ValueError('Image of {s} bytes exceeds address space of {n} words'.format(
+            s=image.size, n=mem.number_of_words
+        ))
+    mem.size_of_program = max(mem.size_of_program, image.size)
+    mem.locations = image.locations  # (remain available once the image is closed) ...
+    if sys.byteorder == 'little':
+        source = c_ubyte.from_buffer(image.mapping, image.words_offset)
+        memmove(mem.start_of_physical_addr, addressof(source), image.size)
+        del source  # release the exported buffer so the image can be closed ...
+        if len(image.relocations):
+            libvm.relocate(mem.c_vm_p, image.relocations.buffer_info()[0], len(image.relocations))
+    else:
+        mem.load_words(image.words(), image.relocations, locations=image.locations)
+
+
+def load_native(file_name, mem):
+    # load a program translated into a shared object (see back_end/native), its words are copied and relocated
+    # as images are, then it runs natively instead of being interpreted ...
+    native = CDLL(os.path.abspath(file_name))
+    number_of_words = word_type.in_dll(native, 'native_number_of_words').value
+    number_of_relocations = word_type.in_dll(native, 'native_number_of_relocations').value
+    words = (word_type * number_of_words).in_dll(native, 'native_words')
+    assert sizeof(words) <= mem.number_of_words * sizeof(mem.factory_type)
+    memmove(mem.start_of_physical_addr, addressof(words), sizeof(words))
+    mem.size_of_program = max(mem.size_of_program, sizeof(words))
+    if number_of_relocations:
+        libvm.relocate(
+            mem.c_vm_p, addressof((word_type * number_of_relocations).in_dll(native, 'native_relocations')),
+            number_of_relocations
+        )
+    native.native_evaluate.argtypes = libvm.evaluate.argtypes
+    native.native_evaluate.restype = None
+    mem.native = native.native_evaluate
+    return native
+
+
 def base_element(cpu, mem, element_type):
     return mem.__getitem__(cpu.base_pointer - sizeof(element_type), element_type)
\ No newline at end of file
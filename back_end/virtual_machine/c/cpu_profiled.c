@@ -0,0 +1,10 @@
+//
+//  cpu_profiled.c
+//  virtual_machine
+//
+//  Profiling build of the evaluator (evaluate_profiled), counting the executions of every instruction (by address)
+//  as they are dispatched and tracking calls (see vm_profile).
+//
+
+#define PROFILED
+#include "cpu.c"
@@ -0,0 +1,10 @@
+//
+//  cpu_threaded.c
+//  virtual_machine
+//
+//  Direct threaded build of the evaluator (evaluate_threaded), instructions are either threaded ahead of time
+//  (thread_instructions) or in place the first time they are executed.
+//
+
+#define THREADED
+#include "cpu.c"
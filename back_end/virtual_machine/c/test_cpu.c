@@ -1,6 +1,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <time.h>
 
 #include "vm.h"
 #include "cpu.h"
@@ -740,6 +741,83 @@ TEST_FUNC_SIGNATURE(test_dup) {
     assert_equal((word_type)10, pop_word(cpu, mem, os), "test_dup");
     assert_equal((word_type)5, pop_word(cpu, mem, os), "test_dup");
 }
+// microbenchmark: for (i = 0; i < N; i++) total += ((i * 3 + 1) * i + 4) * i ^ i; with i and total as locals ...
+#define NUMBER_OF_ITERATIONS 20000000
+#define local_instr(instr, _type_, offset) SINGLE_OPERAND_INSTR(instr ## _type_, (word_type)(offset))
+#define ARITHMETIC_LOOP_INSTRS(_type_)                                                                      \
+    ALLOCATE_INSTR(2 * WORD_SIZE),                                                                          \
+    get_instr(PUSH, _type_)(0), local_instr(STORE_LOCAL, _type_, -WORD_SIZE), get_instr(POP, _type_)(),     \
+    get_instr(PUSH, _type_)(0), local_instr(STORE_LOCAL, _type_, -2 * WORD_SIZE), get_instr(POP, _type_)(), \
+    /* loop: (12) */                                                                                        \
+    local_instr(LOAD_LOCAL, _type_, -WORD_SIZE), get_instr(PUSH, _type_)(NUMBER_OF_ITERATIONS),            \
+    SINGLE_OPERAND_INSTR(JUMP_IF_GREATER_OR_EQUAL_SIGNED ## _type_, ADDRESS_OFFSET(, (54 - 18))),           \
+    local_instr(LOAD_LOCAL, _type_, -2 * WORD_SIZE),                                                       \
+    local_instr(LOAD_LOCAL, _type_, -WORD_SIZE), get_instr(PUSH, _type_)(3),                               \
+    NO_OPERAND_INSTR(MULTIPLY ## _type_), get_instr(PUSH, _type_)(1), NO_OPERAND_INSTR(ADD ## _type_),      \
+    local_instr(LOAD_LOCAL, _type_, -WORD_SIZE), NO_OPERAND_INSTR(MULTIPLY ## _type_),                     \
+    get_instr(PUSH, _type_)(4), NO_OPERAND_INSTR(ADD ## _type_),                                           \
+    local_instr(LOAD_LOCAL, _type_, -WORD_SIZE), NO_OPERAND_INSTR(MULTIPLY ## _type_),                     \
+    local_instr(LOAD_LOCAL, _type_, -WORD_SIZE), NO_OPERAND_INSTR(XOR ## _type_),                          \
+    NO_OPERAND_INSTR(ADD ## _type_),                                                                       \
+    local_instr(STORE_LOCAL, _type_, -2 * WORD_SIZE), get_instr(POP, _type_)(),                            \
+    local_instr(LOAD_LOCAL, _type_, -WORD_SIZE), get_instr(PUSH, _type_)(1),                               \
+    NO_OPERAND_INSTR(ADD ## _type_),                                                                       \
+    local_instr(STORE_LOCAL, _type_, -WORD_SIZE), get_instr(POP, _type_)(),                                \
+    RELATIVE_JUMP_INSTR((12 - 54)),                                                                         \
+    /* end: (54) */                                                                                         \
+    local_instr(LOAD_LOCAL, _type_, -2 * WORD_SIZE),                                                       \
+    HALT_INSTR()
+#define arithmetic_loop_total(_type_, total) do {                                                           \
+    get_c_type(_type_) index;                                                                               \
+    for (index = 0; index < NUMBER_OF_ITERATIONS; index++)                                                  \
+        total += ((index * 3 + 1) * index + 4) * index ^ index;                                             \
+    } while (0)
+#define test_arithmetic_loop_impl(_type_)                                                                   \
+    TEST_FUNC_SIGNATURE(_test_arithmetic_loop ## _type_) {                                                  \
+        get_c_type(_type_) total = 0;                                                                       \
+        clock_t start;                                                                                      \
+        word_type instrs[] = {ARITHMETIC_LOOP_INSTRS(_type_)};                                              \
+        arithmetic_loop_total(_type_, total);                                                               \
+        start = clock();                                                                                    \
+        EXECUTE(instrs);                                                                                    \
+        printf("arithmetic loop" #_type_ " (%u iterations): %.3fs\n",                                      \
+            NUMBER_OF_ITERATIONS, (double)(clock() - start) / CLOCKS_PER_SEC);                              \
+        assert_equal(total, *(get_c_type(_type_) *)stack_pointer(cpu), "test_arithmetic_loop" #_type_);    \
+    }
+MAP(test_arithmetic_loop_impl, , _HALF)
+#define test_arithmetic_loop _test_arithmetic_loop, _test_arithmetic_loop_HALF
+
+// run the arithmetic loop threaded ahead of time, then threaded in place (as it executes),
+// unthreading every instruction must restore the original words ...
+TEST_FUNC_SIGNATURE(test_threaded) {
+    static const word_type instr_sizes[] = {INSTRUCTION_SIZES};
+    word_type total = 0, index, number_of_instrs = 0, instrs[] = {ARITHMETIC_LOOP_INSTRS()};
+    word_type addresses[sizeof(instrs)/sizeof(instrs[0])], *code = (word_type *)instr_pointer(cpu);
+    clock_t start;
+
+    for (index = 0; index < sizeof(instrs)/sizeof(instrs[0]); index += instr_sizes[(instr_value_type)instrs[index]])
+        addresses[number_of_instrs++] = index * WORD_SIZE;
+    arithmetic_loop_total(, total);
+
+    load_instrs(instrs, sizeof(instrs)/sizeof(instrs[0]), mem, cpu);
+    thread_instructions(code, addresses, number_of_instrs);
+    for (index = 0; index < number_of_instrs; index++)
+        assert_equal(unthread_word(code[addresses[index]/WORD_SIZE]), instrs[addresses[index]/WORD_SIZE], "test_threaded");
+    start = clock();
+    evaluate_threaded(cpu, mem, os);
+    printf("arithmetic loop threaded (%u iterations): %.3fs\n",
+        NUMBER_OF_ITERATIONS, (double)(clock() - start) / CLOCKS_PER_SEC);
+    assert_equal(total, peek(stack_pointer(cpu)), "test_threaded");
+    unthread_instructions(code, addresses, number_of_instrs);
+    assert_equal(memcmp(code, instrs, sizeof(instrs)), 0, "test_threaded");
+
+    set_instr_pointer(cpu, (word_type)code);
+    set_stack_pointer(cpu, base_pointer(cpu));
+    evaluate_threaded(cpu, mem, os);
+    assert_equal(total, peek(stack_pointer(cpu)), "test_threaded in place");
+    unthread_instructions(code, addresses, number_of_instrs);
+    assert_equal(memcmp(code, instrs, sizeof(instrs)), 0, "test_threaded in place");
+}
 #undef EXECUTE
 
 void test_cpu()
@@ -760,7 +838,9 @@ void test_cpu()
             test_jump_table,
             test_swap,
             test_dup,
-            test_postfix_update
+            test_postfix_update,
+            test_arithmetic_loop,
+            test_threaded
     };
 
     unsigned int number_of_remaining_tests = sizeof(tests)/sizeof(tests[0]);
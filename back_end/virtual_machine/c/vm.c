@@ -6,19 +6,188 @@
 //
 //
 
+#ifdef __linux__
+    #define _GNU_SOURCE  // memfd_create ...
+#endif
+#include <stdio.h>
 #include <stdlib.h>
+#include <errno.h>
+#include <unistd.h>
+#include <fcntl.h>
 #include <sys/mman.h>
 #include "vm.h"
 #include "word_type.h"
 
+#ifndef MAP_NORESERVE
+    #define MAP_NORESERVE 0
+#endif
+
 const word_type vm_number_of_addressable_words = VM_NUMBER_OF_ADDRESSABLE_WORDS;
 
-word_type *allocate_entire_physical_address_space(){
-    return mmap(
+// each machine gets its own (private) address space, pages are only backed once they are touched and nothing is
+// reserved up front, so large or many address spaces don't fail on systems that don't overcommit ...
+word_type *allocate_physical_address_space(word_type number_of_words){
+    void *physical_memory = mmap(
         NULL,
-        VM_NUMBER_OF_ADDRESSABLE_WORDS * sizeof(word_type),
-        PROT_READ | PROT_WRITE, MAP_ANON | MAP_SHARED,
-        0,
+        number_of_words * sizeof(word_type),
+        PROT_READ | PROT_WRITE, MAP_ANON | MAP_PRIVATE | MAP_NORESERVE,
+        -1,
+        0
+    );
+    return (physical_memory == MAP_FAILED) ? NULL : physical_memory;
+}
+
+void free_physical_address_space(word_type *physical_memory, word_type number_of_words){
+    munmap(physical_memory, number_of_words * sizeof(word_type));
+}
+
+// Checkpoints are (sparse) files holding the pages of an address space which have being touched, restoring one maps
+// it privately over the address space, which is immediate, pages are only copied if and once they are written ...
+static int new_checkpoint_file(){
+    #if defined(__linux__) && defined(MFD_CLOEXEC)
+        return memfd_create("vm_checkpoint", MFD_CLOEXEC);
+    #else
+        char file_name[] = "/tmp/vm_checkpoint_XXXXXX";
+        int checkpoint = mkstemp(file_name);
+        if (checkpoint != -1)
+            unlink(file_name);
+        return checkpoint;
+    #endif
+}
+
+// mark (lowest bit) every page that has being touched, either present or swapped out (linux pagemap), mincore
+// elsewhere, which only reports the pages present, returns 0 on success ...
+#define PAGEMAP_ENTRIES 65536
+static int touched_pages(word_type *physical_memory, word_type number_of_pages, unsigned char *pages){
+    word_type page_size = (word_type)sysconf(_SC_PAGESIZE), index, count, entry;
+    unsigned long long *entries;
+    int pagemap = open("/proc/self/pagemap", O_RDONLY);
+
+    if (pagemap == -1)
+        return mincore(physical_memory, number_of_pages * page_size, (void *)pages);
+
+    if (!(entries = malloc(PAGEMAP_ENTRIES * sizeof(unsigned long long))))
+        goto failure;
+    for (index = 0; index < number_of_pages; index += count)
+    {
+        count = (number_of_pages - index < PAGEMAP_ENTRIES) ? number_of_pages - index : PAGEMAP_ENTRIES;
+        if (pread(
+                pagemap,
+                entries,
+                count * sizeof(unsigned long long),
+                (off_t)(((word_type)physical_memory / page_size + index) * sizeof(unsigned long long))
+            ) != (ssize_t)(count * sizeof(unsigned long long)))
+            goto failure;
+        for (entry = 0; entry < count; entry++)  // bit 63: present, bit 62: swapped ...
+            pages[index + entry] = (entries[entry] >> 62) != 0;
+    }
+    free(entries);
+    close(pagemap);
+    return 0;
+
+    failure:
+        free(entries);
+        close(pagemap);
+        return -1;
+}
+
+// mark the pages holding data in the checkpoint an address space was restored from, those it has yet to touch are
+// neither present nor swapped out (they are still in the checkpoint) so aren't found by touched_pages ...
+static int restored_pages(int restored_from, word_type number_of_pages, unsigned char *pages){
+#ifndef SEEK_DATA  // every page then ...
+    word_type index;
+    (void)restored_from;
+    for (index = 0; index < number_of_pages; index++)
+        pages[index] |= 1;
+#else
+    word_type page_size = (word_type)sysconf(_SC_PAGESIZE), number_of_bytes = number_of_pages * page_size, index;
+    off_t data = 0, hole;
+
+    while ((word_type)data < number_of_bytes)
+    {
+        if ((data = lseek(restored_from, data, SEEK_DATA)) == -1)
+            return (errno == ENXIO) ? 0 : -1;  // ENXIO: nothing but holes up to the end of the checkpoint ...
+        if ((hole = lseek(restored_from, data, SEEK_HOLE)) == -1)
+            return -1;
+        for (index = (word_type)data / page_size; index * page_size < (word_type)hole && index < number_of_pages; )
+            pages[index++] |= 1;
+        data = hole;
+    }
+#endif
+    return 0;
+}
+
+// returns the checkpoints file descriptor or -1 on failure, restored_from is the checkpoint the address space was
+// last restored from (see restore_physical_address_space) or -1 ...
+int checkpoint_physical_address_space(word_type *physical_memory, word_type number_of_words, int restored_from){
+    word_type
+        page_size = (word_type)sysconf(_SC_PAGESIZE),
+        number_of_bytes = number_of_words * sizeof(word_type),
+        number_of_pages = (number_of_bytes + page_size - 1) / page_size,
+        index = 0, start;
+    unsigned char *touched = malloc(number_of_pages);
+    int checkpoint = new_checkpoint_file();
+
+    if (!touched || checkpoint == -1 || ftruncate(checkpoint, (off_t)number_of_bytes)
+        || touched_pages(physical_memory, number_of_pages, touched)
+        || (restored_from != -1 && restored_pages(restored_from, number_of_pages, touched)))
+        goto failure;
+
+    while (index < number_of_pages)  // write each run of touched pages ...
+    {
+        for (; index < number_of_pages && !(touched[index] & 1); index++) ;
+        for (start = index; index < number_of_pages && (touched[index] & 1); index++) ;
+        if (index > start && pwrite(
+                checkpoint,
+                (unsigned char *)physical_memory + start * page_size,
+                (index - start) * page_size,
+                (off_t)(start * page_size)
+            ) != (ssize_t)((index - start) * page_size))
+            goto failure;
+    }
+    free(touched);
+    return checkpoint;
+
+    failure:
+        free(touched);
+        if (checkpoint != -1)
+            close(checkpoint);
+        return -1;
+}
+
+// returns physical_memory or NULL on failure ...
+word_type *restore_physical_address_space(word_type *physical_memory, word_type number_of_words, int checkpoint){
+    void *restored = mmap(
+        physical_memory,
+        number_of_words * sizeof(word_type),
+        PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_FIXED | MAP_NORESERVE,
+        checkpoint,
         0
     );
+    return (restored == MAP_FAILED) ? NULL : restored;
+}
+
+// Resetting an address space restored from checkpoint (see restore_physical_address_space) in place, without
+// re-mapping it: every page it touched since is released, read pages are dropped and written ones lose their private
+// copies, touching them again reads them back from the checkpoint, so it only costs as much as the pages touched
+// since (along with their page tables), whatever the size of the checkpoint or of the address space,
+// returns physical_memory or NULL on failure ...
+word_type *reset_physical_address_space(word_type *physical_memory, word_type number_of_words, int checkpoint){
+#ifdef __linux__
+    (void)checkpoint;
+    return madvise(physical_memory, number_of_words * sizeof(word_type), MADV_DONTNEED) ? NULL : physical_memory;
+#else  // MADV_DONTNEED doesn't necessarily drop private copies (BSD, OS X), so map the checkpoint again ...
+    return restore_physical_address_space(physical_memory, number_of_words, checkpoint);
+#endif
+}
+
+word_type *allocate_entire_physical_address_space(){
+    return allocate_physical_address_space(VM_NUMBER_OF_ADDRESSABLE_WORDS);
+}
+
+// translate the virtual addresses stored at each relocation (a virtual byte address) to physical addresses ...
+void relocate(word_type *physical_memory, word_type *relocations, word_type number_of_relocations) {
+    word_type index;
+    for (index = 0; index < number_of_relocations; index++)
+        *(word_type *)((unsigned char *)physical_memory + relocations[index]) += (word_type)physical_memory;
 }
@@ -10,9 +10,15 @@
 #define virtual_machine_vm_h
 
 #include "word_type.h"
-// 32 bit address space.
+// 32 bit address space (default).
 #define VM_NUMBER_OF_ADDRESSABLE_WORDS ((word_type)1 << 32)
 
 word_type *allocate_entire_physical_address_space();
+word_type *allocate_physical_address_space(word_type number_of_words);
+void free_physical_address_space(word_type *physical_memory, word_type number_of_words);
+int checkpoint_physical_address_space(word_type *physical_memory, word_type number_of_words, int restored_from);
+word_type *restore_physical_address_space(word_type *physical_memory, word_type number_of_words, int checkpoint);
+word_type *reset_physical_address_space(word_type *physical_memory, word_type number_of_words, int checkpoint);
+void relocate(word_type *physical_memory, word_type *relocations, word_type number_of_relocations);
 
 #endif
@@ -0,0 +1,138 @@
+__author__ = 'samyvilar'
+
+import linecache
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import imap
+
+from front_end.loader.locations import Location, LocationNOTSET
+
+
+def source_line(location):  # (file name, line number), symbolic locations ('__SOP__', ...) being at line 0 ...
+    if isinstance(location, str):
+        return location, 0
+    if not isinstance(location, Location) or isinstance(location, LocationNOTSET):
+        return '', 0
+    line_number = tuple.__getitem__(location, 1)
+    return location.file_name, line_number if isinstance(line_number, (int, long)) else 0
+
+
+def source_text(file_name, line_number):
+    return linecache.getline(file_name, line_number).strip() if line_number > 0 else ''
+
+
+def function_name(entry, locations):
+    # the name of the symbol linked at entry, else (unnamed code, such as the entry point) its file and line ...
+    if entry in locations.symbols:
+        return locations.symbols[entry]
+    file_name, line_number = source_line(locations.location(entry))
+    if line_number <= 0:  # symbolic or missing locations ...
+        return file_name or '??'
+    return '{f}:{l}'.format(f=file_name, l=line_number)
+
+
+class HotSpots(object):
+    # execution counts of a Profile mapped back to source lines and functions, functions being delimited by the
+    # symbols recorded by the linker (see LocationTable), the entry point and every address that was called,
+    # each address belonging to the nearest preceding one, only those executed are reported,
+    # inclusive counts include every executed call (recursive calls included once, as does callgrind) ...
+    def __init__(self, profile, locations=None):  # default the locations (and symbols) of the memory loaded
+        locations = profile.mem.locations if locations is None else locations
+        self.addresses, self.count = profile.addresses, profile.count
+        self.calls = profile.calls
+
+        self.bounds = sorted({0} | set(locations.symbols) | set(callee for _, callee in self.calls))
+        self.entries = sorted(set(imap(self.function, self.addresses)) | set(callee for _, callee in self.calls))
+        self.names, self.files, self.first_lines = {}, {}, {}
+        for entry in self.entries:
+            self.files[entry], self.first_lines[entry] = source_line(locations.location(entry))
+            self.names[entry] = function_name(entry, locations)
+
+        self.lines = defaultdict(lambda: defaultdict(int))  # {function entry: {(file, line): exclusive count}}
+        for address, count in self.addresses.iteritems():
+            self.lines[self.function(address)][source_line(locations.location(address))] += count
+
+        self.line_calls = defaultdict(list)  # {function entry: [((file, line), callee, calls, instructions)]}
+        for (call_site, callee), (calls, instructions) in self.calls.iteritems():
+            self.line_calls[self.function(call_site)].append(
+                (source_line(locations.location(call_site)), callee, calls, instructions)
+            )
+
+    def function(self, address):  # entry point of the function holding address ...
+        return self.bounds[max(bisect_right(self.bounds, address) - 1, 0)]
+
+    def exclusive(self, entry):
+        return sum(self.lines[entry].itervalues())
+
+    def inclusive(self, entry):
+        return self.exclusive(entry) + sum(
+            instructions for _, callee, _, instructions in self.line_calls[entry] if callee != entry
+        )
+
+    def number_of_calls(self, entry):
+        return sum(calls for (_, callee), (calls, _) in self.calls.iteritems() if callee == entry)
+
+    @property
+    def functions(self):  # {name: (inclusive, exclusive, number of calls)}
+        return dict(
+            (self.names[entry], (self.inclusive(entry), self.exclusive(entry), self.number_of_calls(entry)))
+            for entry in self.entries
+        )
+
+    @property
+    def source_lines(self):  # {(file, line): (inclusive, exclusive)}
+        counts = defaultdict(lambda: [0, 0])
+        for entry, lines in self.lines.iteritems():
+            for line, count in lines.iteritems():
+                counts[line][0] += count
+                counts[line][1] += count
+        for entry, line_calls in self.line_calls.iteritems():
+            for line, callee, _, instructions in line_calls:
+                if callee != entry:
+                    counts[line][0] += instructions
+        return dict((line, tuple(values)) for line, values in counts.iteritems())
+
+    def report(self, file_obj, top=20):  # the hottest functions and source lines ...
+        total = float(self.count or 1)
+        print >> file_obj, '{0} instructions executed'.format(self.count)
+        print >> file_obj, '{0:>16} {1:>7} {2:>16} {3:>7} {4:>12}  {5}'.format(
+            'inclusive', '%', 'exclusive', '%', 'calls', 'function'
+        )
+        for name, (inclusive, exclusive, calls) in sorted(
+                self.functions.iteritems(), key=lambda item: (-item[1][1], item[0]))[:top]:
+            print >> file_obj, '{0:>16} {1:>7.2f} {2:>16} {3:>7.2f} {4:>12}  {5}'.format(
+                inclusive, 100 * inclusive / total, exclusive, 100 * exclusive / total, calls, name
+            )
+        print >> file_obj, '{0:>16} {1:>7} {2:>16} {3:>7}  {4}'.format('inclusive', '%', 'exclusive', '%', 'line')
+        for (file_name, line_number), (inclusive, exclusive) in sorted(
+                self.source_lines.iteritems(), key=lambda item: (-item[1][1], item[0]))[:top]:
+            print >> file_obj, '{0:>16} {1:>7.2f} {2:>16} {3:>7.2f}  {4}:{5}  {6}'.format(
+                inclusive, 100 * inclusive / total, exclusive, 100 * exclusive / total,
+                file_name or '??', line_number, source_text(file_name, line_number)
+            )
+
+    def callgrind(self, file_obj, creator='vm.py'):  # callgrind format (kcachegrind, callgrind_annotate, ...)
+        print >> file_obj, '# callgrind format'
+        print >> file_obj, 'version: 1'
+        print >> file_obj, 'creator: {0}'.format(creator)
+        print >> file_obj, 'positions: line'
+        print >> file_obj, 'events: Instructions'
+        print >> file_obj, 'summary: {0}'.format(self.count)
+        for entry in self.entries:
+            print >> file_obj
+            print >> file_obj, 'fl={0}'.format(self.files[entry] or '??')
+            print >> file_obj, 'fn={0}'.format(self.names[entry])
+            current_file = self.files[entry]
+            for (file_name, line_number), count in sorted(self.lines[entry].iteritems()):
+                if file_name != current_file:
+                    print >> file_obj, 'fi={0}'.format(file_name or '??')
+                    current_file = file_name
+                print >> file_obj, '{0} {1}'.format(line_number, count)
+            for (file_name, line_number), callee, calls, instructions in sorted(self.line_calls[entry]):
+                if file_name != current_file:
+                    print >> file_obj, 'fi={0}'.format(file_name or '??')
+                    current_file = file_name
+                print >> file_obj, 'cfl={0}'.format(self.files[callee] or '??')
+                print >> file_obj, 'cfn={0}'.format(self.names[callee])
+                print >> file_obj, 'calls={0} {1}'.format(calls, self.first_lines[callee])
+                print >> file_obj, '{0} {1}'.format(line_number, instructions)
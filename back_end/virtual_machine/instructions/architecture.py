@@ -463,6 +463,129 @@ class JumpTrueOneEighth(RelativeJump):
     pass
 
 
+class Call(RelativeJump):
+    # Pushes the return address (next instruction), sets the base stack pointer to it and jumps to the callee.
+    pass
+
+
+class AbsoluteCall(AbsoluteJump):  # Same as Call but pops the callees address from the stack.
+    pass
+
+
+class Return(AbsoluteJump):  # Jumps to the return address referenced by the base stack pointer.
+    pass
+
+
+class CompareAndJump(RelativeJump):
+    # Pops the two top most values (left operand deepest) and jumps if the condition holds,
+    # fusing Compare*, Load*Flag, JumpTrue into a single instruction, the flags aren't updated.
+    pass
+
+
+class JumpIfEqual(CompareAndJump):
+    pass
+
+
+class JumpIfNotEqual(CompareAndJump):
+    pass
+
+
+class JumpIfLessSigned(CompareAndJump):
+    pass
+
+
+class JumpIfLessUnsigned(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterSigned(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterUnsigned(CompareAndJump):
+    pass
+
+
+class JumpIfLessOrEqualSigned(CompareAndJump):
+    pass
+
+
+class JumpIfLessOrEqualUnsigned(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterOrEqualSigned(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterOrEqualUnsigned(CompareAndJump):
+    pass
+
+
+class JumpIfEqualHalf(CompareAndJump):
+    pass
+
+
+class JumpIfNotEqualHalf(CompareAndJump):
+    pass
+
+
+class JumpIfLessSignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfLessUnsignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterSignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterUnsignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfLessOrEqualSignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfLessOrEqualUnsignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterOrEqualSignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterOrEqualUnsignedHalf(CompareAndJump):
+    pass
+
+
+class JumpIfEqualFloat(CompareAndJump):
+    pass
+
+
+class JumpIfNotEqualFloat(CompareAndJump):
+    pass
+
+
+class JumpIfLessFloat(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterFloat(CompareAndJump):
+    pass
+
+
+class JumpIfLessOrEqualFloat(CompareAndJump):
+    pass
+
+
+class JumpIfGreaterOrEqualFloat(CompareAndJump):
+    pass
+
+
 class VariableLengthInstruction(WideInstruction):  # Instructions with more than one operand, mainly used for JumpTable
     def __len__(self):
         return 1 + len(self.operands)
@@ -548,6 +671,55 @@ class Allocate(WideInstruction):
     pass
 
 
+class Enter(WideInstruction):  # Allocates space for the return value (operand) and saves the base stack pointer.
+    pass
+
+
+class Leave(WideInstruction):
+    # Removes the frame (operand being its size, relative to the base stack pointer) and restores the base stack pointer
+    pass
+
+
+class LocalInstruction(WideInstruction):  # base stack pointer relative instructions, operand being the offset.
+    pass
+
+
+class AddressOfLocal(LocalInstruction):
+    pass
+
+
+class LoadLocal(LocalInstruction):
+    pass
+
+
+class LoadLocalHalf(LocalInstruction):
+    pass
+
+
+class LoadLocalQuarter(LocalInstruction):
+    pass
+
+
+class LoadLocalOneEighth(LocalInstruction):
+    pass
+
+
+class StoreLocal(LocalInstruction):  # similar to Set, it leaves the value on the stack.
+    pass
+
+
+class StoreLocalHalf(LocalInstruction):
+    pass
+
+
+class StoreLocalQuarter(LocalInstruction):
+    pass
+
+
+class StoreLocalOneEighth(LocalInstruction):
+    pass
+
+
 class Dup(WideInstruction):
     pass
 
@@ -1122,6 +1294,10 @@ ids.update({
     ConvertToFloatFrom:                         23,
     ConvertToFloatFromSigned:                   24,
     RelativeJump:                               25,
+    JumpIfEqualFloat:                           26,
+    JumpIfNotEqualFloat:                        27,
+    JumpIfLessFloat:                            28,
+    JumpIfGreaterFloat:                         29,
     LoadZeroFlag:                               30,   # ==
     LoadCarryBorrowFlag:                        31,  # <, unsigned
     LoadMostSignificantBitFlag:                 32,  # < signed
@@ -1319,6 +1495,42 @@ ids.update({
     ConvertToSignedHalfFromOneEighth:           191,
     ConvertToSignedQuarterFromOneEighth:        192,
 
+    Call:                                       193,
+    AbsoluteCall:                               194,
+    Return:                                     195,
+    Enter:                                      196,
+    Leave:                                      197,
+
+    AddressOfLocal:                             198,
+    LoadLocal:                                  199,
+    LoadLocalHalf:                              200,
+    LoadLocalQuarter:                           201,
+    LoadLocalOneEighth:                         202,
+    StoreLocal:                                 203,
+    StoreLocalHalf:                             204,
+    StoreLocalQuarter:                          205,
+    StoreLocalOneEighth:                        206,
+
+    JumpIfEqual:                                207,
+    JumpIfNotEqual:                             208,
+    JumpIfLessSigned:                           209,
+    JumpIfLessUnsigned:                         210,
+    JumpIfGreaterSigned:                        211,
+    JumpIfGreaterUnsigned:                      212,
+    JumpIfLessOrEqualSigned:                    213,
+    JumpIfLessOrEqualUnsigned:                  214,
+    JumpIfGreaterOrEqualSigned:                 215,
+    JumpIfGreaterOrEqualUnsigned:               216,
+    JumpIfEqualHalf:                            217,
+    JumpIfNotEqualHalf:                         218,
+    JumpIfLessSignedHalf:                       219,
+    JumpIfLessUnsignedHalf:                     227,
+    JumpIfGreaterSignedHalf:                    228,
+    JumpIfGreaterUnsignedHalf:                  229,
+    JumpIfLessOrEqualSignedHalf:                230,
+    JumpIfLessOrEqualUnsignedHalf:              231,
+    JumpIfGreaterOrEqualSignedHalf:             232,
+    JumpIfGreaterOrEqualUnsignedHalf:           234,
 
     Pass:                                       220,
     SystemCall:                                 221,
@@ -1331,9 +1543,11 @@ ids.update({
     ConvertToFromFloat:                         233,
 
     JumpTrue:                                   235,
+    JumpIfLessOrEqualFloat:                     236,
 
     DivideFloat:                                237,
     SubtractFloat:                              238,
+    JumpIfGreaterOrEqualFloat:                  239,
     And:                                        241,
     ShiftRight:                                 242,
     CompareFloat:                               243,
@@ -1348,6 +1562,62 @@ ids.update({
 })
 
 
+# Single Load/Set instructions and their base stack pointer relative alternatives ...
+load_local_instrs = {
+    LoadSingle: LoadLocal, LoadSingleHalf: LoadLocalHalf,
+    LoadSingleQuarter: LoadLocalQuarter, LoadSingleOneEighth: LoadLocalOneEighth
+}
+store_local_instrs = {
+    SetSingle: StoreLocal, SetSingleHalf: StoreLocalHalf,
+    SetSingleQuarter: StoreLocalQuarter, SetSingleOneEighth: StoreLocalOneEighth
+}
+
+# Compare*, Load*Flag pairs and the CompareAndJump instruction jumping whenever the loaded flag would be set ...
+compare_and_jump_instrs = {
+    (Compare, LoadZeroFlag): JumpIfEqual,
+    (Compare, LoadNonZeroFlag): JumpIfNotEqual,
+    (Compare, LoadMostSignificantBitFlag): JumpIfLessSigned,
+    (Compare, LoadCarryBorrowFlag): JumpIfLessUnsigned,
+    (Compare, LoadNonZeroNonMostSignificantBitFlag): JumpIfGreaterSigned,
+    (Compare, LoadNonZeroNonCarryBorrowFlag): JumpIfGreaterUnsigned,
+    (Compare, LoadZeroMostSignificantBitFlag): JumpIfLessOrEqualSigned,
+    (Compare, LoadZeroCarryBorrowFlag): JumpIfLessOrEqualUnsigned,
+    (Compare, LoadNonMostSignificantBitFlag): JumpIfGreaterOrEqualSigned,
+    (Compare, LoadNonCarryBorrowFlag): JumpIfGreaterOrEqualUnsigned,
+
+    (CompareHalf, LoadZeroFlag): JumpIfEqualHalf,
+    (CompareHalf, LoadNonZeroFlag): JumpIfNotEqualHalf,
+    (CompareHalf, LoadMostSignificantBitFlag): JumpIfLessSignedHalf,
+    (CompareHalf, LoadCarryBorrowFlag): JumpIfLessUnsignedHalf,
+    (CompareHalf, LoadNonZeroNonMostSignificantBitFlag): JumpIfGreaterSignedHalf,
+    (CompareHalf, LoadNonZeroNonCarryBorrowFlag): JumpIfGreaterUnsignedHalf,
+    (CompareHalf, LoadZeroMostSignificantBitFlag): JumpIfLessOrEqualSignedHalf,
+    (CompareHalf, LoadZeroCarryBorrowFlag): JumpIfLessOrEqualUnsignedHalf,
+    (CompareHalf, LoadNonMostSignificantBitFlag): JumpIfGreaterOrEqualSignedHalf,
+    (CompareHalf, LoadNonCarryBorrowFlag): JumpIfGreaterOrEqualUnsignedHalf,
+
+    (CompareFloat, LoadZeroFlag): JumpIfEqualFloat,
+    (CompareFloat, LoadNonZeroFlag): JumpIfNotEqualFloat,
+    (CompareFloat, LoadMostSignificantBitFlag): JumpIfLessFloat,
+    (CompareFloat, LoadNonZeroNonMostSignificantBitFlag): JumpIfGreaterFloat,
+    (CompareFloat, LoadZeroMostSignificantBitFlag): JumpIfLessOrEqualFloat,
+    (CompareFloat, LoadNonMostSignificantBitFlag): JumpIfGreaterOrEqualFloat,
+}
+compare_and_jump_flags = dict(izip(compare_and_jump_instrs.itervalues(), compare_and_jump_instrs.iterkeys()))
+inverted_flags = {
+    LoadZeroFlag: LoadNonZeroFlag,
+    LoadCarryBorrowFlag: LoadNonCarryBorrowFlag,
+    LoadMostSignificantBitFlag: LoadNonMostSignificantBitFlag,
+    LoadNonZeroNonCarryBorrowFlag: LoadZeroCarryBorrowFlag,
+    LoadNonZeroNonMostSignificantBitFlag: LoadZeroMostSignificantBitFlag,
+}
+inverted_flags.update(izip(inverted_flags.values(), inverted_flags.keys()))
+inverted_compare_and_jump_instrs = {
+    jump_type: compare_and_jump_instrs[compare_type, inverted_flags[flag_type]]
+    for jump_type, (compare_type, flag_type) in compare_and_jump_flags.iteritems()
+}
+
+
 def load_instruction_pointer(location):
     yield LoadInstructionPointer(location)
 
@@ -1821,28 +2091,44 @@ add_types_to_current_module(
 )
 
 
+class comparison(object):  # Compare* followed by its Load*Flag(s), which a conditional jump may fuse ...
+    def __init__(self, l_instr, r_instr, compare_instr, flags=()):
+        self.l_instr, self.r_instr, self.compare_instr = l_instr, r_instr, compare_instr
+        self.flags = tuple(chain.from_iterable(flags))
+
+    def __iter__(self):
+        return chain(self.l_instr, self.r_instr, (self.compare_instr,), self.flags)
+
+    def jump(self, address, location, when=True):  # CompareAndJump instrs if when matches the flag, None otherwise
+        if len(self.flags) == 1:
+            flag_type = type(self.flags[0]) if when else inverted_flags.get(type(self.flags[0]))
+            jump_type = compare_and_jump_instrs.get((type(self.compare_instr), flag_type))
+            if jump_type is not None:
+                return chain(self.l_instr, self.r_instr, (jump_type(location, address),))
+
+
 def compare(l_instr, r_instr, location, flags=()):
-    return chain(l_instr, r_instr, (Compare(location),), chain.from_iterable(flags))
+    return comparison(l_instr, r_instr, Compare(location), flags)
 
 
 def compare_half(l_instr, r_instr, location, flags=()):
-    return chain(l_instr, r_instr, (CompareHalf(location),), chain.from_iterable(flags))
+    return comparison(l_instr, r_instr, CompareHalf(location), flags)
 
 
 def compare_quarter(l_instr, r_instr, location, flags=()):
-    return chain(l_instr, r_instr, (CompareQuarter(location),), chain.from_iterable(flags))
+    return comparison(l_instr, r_instr, CompareQuarter(location), flags)
 
 
 def compare_one_eighth(l_instr, r_instr, location, flags=()):
-    return chain(l_instr, r_instr, (CompareOneEighth(location),), chain.from_iterable(flags))
+    return comparison(l_instr, r_instr, CompareOneEighth(location), flags)
 
 
 def compare_float(l_instr, r_instr, location, flags=()):
-    return chain(l_instr, r_instr, (CompareFloat(location),), chain.from_iterable(flags))
+    return comparison(l_instr, r_instr, CompareFloat(location), flags)
 
 
 def compare_float_half(l_instr, r_instr, location, flags=()):
-    return chain(l_instr, r_instr, (CompareFloatHalf(location),), chain.from_iterable(flags))
+    return comparison(l_instr, r_instr, CompareFloatHalf(location), flags)
 
 
 float_conversion_postfixes = {8: '_float', 4: '_half_float'}
@@ -1943,6 +2229,10 @@ def set_base_stack_pointer(instrs, location):
     return chain(instrs, (SetBaseStackPointer(location),))
 
 
+def address_of_local(offset, location):
+    yield AddressOfLocal(location, offset)
+
+
 def load_zero_flag(location):
     yield LoadZeroFlag(location)
 
@@ -1987,10 +2277,18 @@ def absolute_jump(instr, location):
     return chain(instr, (AbsoluteJump(location),))
 
 
+def conditional_jump(jump_type, when=None):  # comparisons (word flags) directly feeding jumps are fused if possible
+    def jump(instrs, address, location):
+        fused = when is not None and isinstance(instrs, comparison) and instrs.jump(address, location, when)
+        return fused or chain(instrs, (jump_type(location, address),))
+    return jump
+
+
 for _name, _pf in product(('jump_false', 'jump_true'), _sizes.itervalues()):
     _func_name = _name + _pf
-    _class_obj = getattr(current_module, convert_to_camel_case_from_space(_func_name))
-    _func = lambda instrs, address, location, _class_obj=_class_obj: chain(instrs, (_class_obj(location, address),))
+    _func = conditional_jump(
+        getattr(current_module, convert_to_camel_case_from_space(_func_name)), None if _pf else _name == 'jump_true'
+    )
     _func.__name__ = _func_name
     setattr(current_module, _func_name, _func)
 
@@ -1999,6 +2297,26 @@ def relative_jump(address, location):
     yield RelativeJump(location, address)
 
 
+def call(address, location):
+    yield Call(location, address)
+
+
+def absolute_call(instrs, location):
+    return chain(instrs, (AbsoluteCall(location),))
+
+
+def return_instr(location):
+    yield Return(location)
+
+
+def enter(amount, location):
+    yield Enter(location, amount)
+
+
+def leave(amount, location):
+    yield Leave(location, amount)
+
+
 from copy import deepcopy
 
 
@@ -0,0 +1,288 @@
+__author__ = 'samyvilar'
+
+import struct
+from array import array
+from itertools import izip, imap, chain, count, repeat
+from operator import add
+
+from front_end.loader.locations import loc, LocationNotSet
+from back_end.emitter.object_file import Reference, is_reference
+from back_end.virtual_machine.instructions.architecture import Instruction, Operand, Address, Offset, RealOperand
+from back_end.virtual_machine.instructions.architecture import Word, Double, DoubleHalf, RelativeJump, JumpTable
+from back_end.virtual_machine.instructions.architecture import WideInstruction, VariableLengthInstruction
+from back_end.virtual_machine.instructions.architecture import instr_objs, operns, opern
+from back_end.virtual_machine.instructions.locations import location_key, LocationTable
+from back_end.virtual_machine.instructions.words import word_size, word_mask, word_format
+
+
+def real_word(value):  # use the hosts byte order so the word's memory layout matches pack_binaries ...
+    if isinstance(value, DoubleHalf):
+        return struct.unpack('=Q', struct.pack('=f', float(value)) + '\x00' * 4)[0]
+    return struct.unpack('=Q', struct.pack('=d', float(value)))[0]
+
+
+def word_real(word, operand_type):
+    if issubclass(operand_type, DoubleHalf):
+        return struct.unpack('=f', struct.pack('=Q', word)[:4])[0]
+    return struct.unpack('=d', struct.pack('=Q', word))[0]
+
+
+def signed_word(word):
+    return word - (word_mask + 1) if word > (word_mask >> 1) else word
+
+
+def machine_word(element):
+    if isinstance(element, Instruction):
+        return int(element)  # instruction id occupies the lowest byte ...
+    if isinstance(element, RealOperand) or type(element) is float:
+        return real_word(element)
+    if isinstance(element, (Address, Offset)):
+        return long(element.obj) & word_mask
+    return long(element) & word_mask
+
+
+def operand_classes():
+    def subclasses(cls):
+        for sub_cls in cls.__subclasses__():
+            yield sub_cls
+            for sub_sub_cls in subclasses(sub_cls):
+                yield sub_sub_cls
+    return sorted(set(subclasses(Operand)), key=lambda cls: cls.__name__)
+operand_types = tuple(operand_classes())
+operand_code_base = 256  # instruction ids are below 256 ...
+operand_codes = dict(izip(operand_types, xrange(operand_code_base, operand_code_base + len(operand_types))))
+
+
+def element_code(element):  # the opcode of the word of element ...
+    return int(element) if isinstance(element, Instruction) else operand_codes.get(type(element))
+
+
+class InstructionBuffer(object):
+    # Array backed instruction stream, each entry is a single word: an opcode (instruction id or operand type code),
+    # the word value and the index of its location.
+    # The emitter fills one buffer per symbol, the linker appends them (see link) into the buffer of the program,
+    # recording the index of the first word of each symbol, references are kept by the index of the referenced word
+    # (or the name of the referenced symbol) and are only written to their words once the buffer is sealed.
+    def __init__(self, instrs=(), word_size=word_size):
+        self.word_size = word_size
+        self.opcodes = array('H')
+        self.words = array(word_format)
+        self.location_indices = array('I')
+        self.locations, self._location_indices = [], {}
+        self.relocations = array(word_format)  # virtual address of every word holding a virtual address ...
+        self.references = []  # (word index, base address, index of the referenced word or name of the symbol) ...
+        self.pending = []  # (word index, base address, operand) referencing an object, see bind ...
+        self.symbols = {}  # symbol name -> index of its first word ...
+        self.sealed = False
+        self.extend(instrs)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def location_index(self, location):
+        if location not in self._location_indices:
+            self._location_indices[location] = len(self.locations)
+            self.locations.append(location)
+        return self._location_indices[location]
+
+    def append_word(self, element, opcode, word):
+        if self.sealed:
+            raise ValueError('{l} Cannot append to a sealed buffer'.format(l=loc(element)))
+        element.address = len(self.opcodes) * self.word_size  # as set_addresses would, referencing is by index ...
+        self.opcodes.append(opcode)
+        self.words.append(word)
+        self.location_indices.append(self.location_index(loc(element)))
+
+    def append_operand(self, operand, instr_index=None, location=LocationNotSet):
+        index = len(self.opcodes)
+        if type(operand) in {int, long}:
+            operand = Word(operand, location)
+        elif type(operand) is float:
+            operand = Double(operand, location)
+
+        if isinstance(operand, (Address, Offset)) and type(operand.obj) not in {int, long}:
+            base = (index if instr_index is None else instr_index) * self.word_size
+            if isinstance(operand, Offset) and instr_index is not None \
+                    and issubclass(instr_objs[self.opcodes[instr_index]], RelativeJump):
+                base += 2 * self.word_size
+            self.pending.append((index, base, operand))  # the referenced object may have yet to be appended ...
+            word = 0
+        else:
+            word = machine_word(operand)
+        if isinstance(operand, Address):
+            self.relocations.append(index * self.word_size)
+        self.append_word(operand, operand_codes[type(operand)], word)
+
+    def append(self, instr):
+        if isinstance(instr, Instruction):
+            instr_index = len(self.opcodes)
+            self.append_word(instr, int(instr), int(instr))
+            for operand in operns(instr, ()):
+                self.append_operand(operand, instr_index, loc(instr))
+        else:
+            self.append_operand(instr, location=loc(instr))
+
+    def extend(self, instrs):
+        if isinstance(instrs, InstructionBuffer):
+            return self.link(instrs)
+        for instr in instrs:
+            self.append(instr)
+        self.bind()
+
+    def bind(self):
+        # replace the referenced objects by the index of their word, given by their address once appended,
+        # referenced objects that have yet to be appended are left pending ...
+        pending = []
+        for index, base, operand in self.pending:
+            target = operand.obj
+            if is_reference(target):
+                self.references.append((index, base, target.name))
+                continue
+            target_index = getattr(target, 'address', -1) / self.word_size
+            if 0 <= target_index < len(self.opcodes) and self.opcodes[target_index] == element_code(target):
+                self.references.append((index, base, target_index))
+            else:
+                pending.append((index, base, operand))
+        self.pending = pending
+        return self
+
+    def link(self, other, name=None):
+        # append the words of another buffer (a symbol, named or not), its indices shifted by its new position ...
+        if self.sealed:
+            raise ValueError('{l} Cannot append to a sealed buffer'.format(l=other.location(0)))
+        other.bind()
+        start, offset = len(self.opcodes), len(self.opcodes) * self.word_size
+        if name is not None:
+            self.symbols[name] = start
+        location_indices = array('I', imap(self.location_index, other.locations))
+        self.opcodes.extend(other.opcodes)
+        self.words.extend(other.words)
+        self.location_indices.extend(imap(location_indices.__getitem__, other.location_indices))
+        self.relocations.extend(imap(add, repeat(offset), other.relocations))
+        self.references.extend(
+            (index + start, base + offset, target if isinstance(target, str) else target + start)
+            for index, base, target in other.references
+        )
+        self.pending.extend(other.pending)  # (unresolvable, see seal) ...
+        self.symbols.update((symbol, index + start) for symbol, index in other.symbols.iteritems())
+        return start
+
+    def referenced_symbols(self):  # names of the symbols referenced, along with the index of their first reference
+        symbols = {}
+        for index, _, target in self.bind().references:
+            if isinstance(target, str) and target not in symbols:
+                symbols[target] = index
+        return symbols
+
+    def seal(self):
+        if not self.sealed:
+            for _, _, operand in self.bind().pending:  # the referenced object was never appended ...
+                raise ValueError('{l} Unable to resolve reference to {o}'.format(l=loc(operand), o=operand.obj))
+            for index, base, target in self.references:
+                if isinstance(target, str):
+                    if target not in self.symbols:
+                        raise ValueError('{l} Unable to resolve symbol {s}'.format(
+                            l=self.location(index * self.word_size), s=target
+                        ))
+                    target = self.symbols[target]
+                address = target * self.word_size
+                if issubclass(operand_types[self.opcodes[index] - operand_code_base], Offset):
+                    address -= base
+                self.words[index] = address & word_mask
+            self.sealed = True
+        return self
+
+    def encode(self, locations=True):  # (words, relocations, location runs, file names) as used by images ...
+        self.seal()
+        location_runs, file_ids, previous_index = array(word_format), {}, None
+        for address, index in izip(xrange(0, len(self) * self.word_size, self.word_size), self.location_indices):
+            if locations and index != previous_index:
+                location_runs.extend((address,) + location_key(self.locations[index], file_ids))
+                previous_index = index
+        return self.words, self.relocations, location_runs, sorted(file_ids.iterkeys(), key=file_ids.__getitem__)
+
+    def symbol_addresses(self):  # (virtual address, name) of every linked symbol in ascending order of address ...
+        return sorted((index * self.word_size, str(name)) for name, index in self.symbols.iteritems())
+
+    def location_table(self):
+        _, _, location_runs, file_names = self.encode()
+        return LocationTable(location_runs, file_names, self.symbol_addresses())
+
+    def instruction_addresses(self):  # the virtual address of every instruction (see VirtualMemory.thread) ...
+        return array(word_format, (
+            index * self.word_size for index, opcode in enumerate(self.opcodes) if opcode < operand_code_base
+        ))
+
+    def location(self, address):  # location of the element at virtual address (same as Image.location) ...
+        index = address / self.word_size
+        if not 0 <= index < len(self.location_indices):
+            return LocationNotSet
+        return self.locations[self.location_indices[index]]
+
+    def operand(self, index):
+        operand_type = operand_types[self.opcodes[index] - operand_code_base]
+        if issubclass(operand_type, RealOperand):
+            value = word_real(self.words[index], operand_type)
+        else:
+            value = signed_word(self.words[index])
+        operand = operand_type(value, self.locations[self.location_indices[index]])
+        operand.address = index * self.word_size
+        return operand
+
+    def instruction(self, index, operands):
+        instr_type, location = instr_objs[self.opcodes[index]], self.locations[self.location_indices[index]]
+        if issubclass(instr_type, JumpTable):
+            number_of_cases = int(operands[1])
+            cases = dict(izip(imap(int, operands[2:2 + number_of_cases]), operands[2 + number_of_cases:]))
+            cases['default'] = operands[0]
+            instr = instr_type(location, cases)
+            instr.operands = operands  # keep the addressed operands (JumpTable re-creates the count and keys) ...
+        elif issubclass(instr_type, WideInstruction):
+            instr = instr_type(location, *operands)
+        else:
+            instr = instr_type(location)
+        instr.address = index * self.word_size
+        return instr
+
+    def number_of_operands(self, index):
+        instr_type = instr_objs[self.opcodes[index]]
+        if issubclass(instr_type, VariableLengthInstruction):
+            return 2 + 2 * signed_word(self.words[index + 2])
+        return int(issubclass(instr_type, WideInstruction))
+
+    def objects(self):  # (index, re-created Instruction or Operand) ...
+        index = 0
+        while index < len(self):
+            if self.opcodes[index] >= operand_code_base:
+                yield index, self.operand(index)
+                index += 1
+            else:
+                operands = map(self.operand, xrange(index + 1, index + 1 + self.number_of_operands(index)))
+                yield index, self.instruction(index, operands)
+                index += 1 + len(operands)
+
+    def __iter__(self):  # adapter: re-create the (addressed) Instruction/Operand objects ...
+        self.seal()
+        return (element for _, element in self.objects())
+
+    def elements(self):  # adapter: same sequence as linker.set_addresses, each instruction followed by its operands
+        return chain.from_iterable(self)
+
+    def instructions(self):
+        # adapter: re-create the Instruction/Operand objects, their references bound to the re-created objects,
+        # (or to a Reference of the referenced symbol) as emitted, so they can be optimized and appended again ...
+        elements, words = [], {}
+        targets = set(target for _, _, target in self.bind().references if not isinstance(target, str))
+        for index, element in self.objects():
+            elements.append(element)
+            words[index] = element
+            if isinstance(element, WideInstruction) and not isinstance(element, VariableLengthInstruction) \
+                    and type(opern(element)) in {Word, Double} and index + 1 not in targets:
+                element.operands = (opern(element).value,)  # plain values, as emitted (see the optimizer rules) ...
+            elif isinstance(element, Instruction):
+                words.update(izip(count(index + 1), operns(element, ())))
+        for index, _, target in self.references:
+            words[index].obj = Reference(target) if isinstance(target, str) else words[target]
+        for index, _, operand in self.pending:
+            words[index].obj = operand.obj
+        return iter(elements)
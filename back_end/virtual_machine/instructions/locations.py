@@ -0,0 +1,63 @@
+__author__ = 'samyvilar'
+
+from array import array
+from bisect import bisect_right
+
+from front_end.loader.locations import Location, LocationNotSet
+from back_end.virtual_machine.instructions.words import word_format
+
+
+def location_key(location, file_ids):
+    if isinstance(location, Location) and location:
+        file_name, line, column = location.file_name, location.line_number, location.column_number
+    else:  # symbolic locations ('__SOP__', ...) or no location at all ...
+        file_name, line, column = (location or '') if isinstance(location, str) else '', 0, 0
+    if file_name not in file_ids:
+        file_ids[file_name] = len(file_ids)
+    return (
+        file_ids[file_name],
+        line if isinstance(line, (int, long)) else 0,
+        column if isinstance(column, (int, long)) else 0
+    )
+
+
+class LocationTable(object):
+    # run-length table of the locations of consecutive words, the (virtual) address each run starts at in ascending
+    # order along with its (file id, line, column), (as stored in images), instead of keeping every element alive,
+    # along with the name of every symbol by the address of its first word, as recorded by the linker ...
+    def __init__(self, location_runs=(), file_names=(), symbols=()):
+        self.addresses, self.file_ids = array(word_format, location_runs[0::4]), array(word_format, location_runs[1::4])
+        self.lines, self.columns = array(word_format, location_runs[2::4]), array(word_format, location_runs[3::4])
+        self.file_names = list(file_names)
+        self._file_ids = dict((file_name, file_id) for file_id, file_name in enumerate(self.file_names))
+        self.symbols = dict(symbols)  # {address: symbol name} ...
+        self.end = None  # address of the last appended word ...
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def copy(self):
+        table = LocationTable((), self.file_names, self.symbols.iteritems())
+        table.addresses, table.file_ids = array(word_format, self.addresses), array(word_format, self.file_ids)
+        table.lines, table.columns = array(word_format, self.lines), array(word_format, self.columns)
+        table.end = self.end
+        return table
+
+    def append(self, address, location):
+        # start a new run unless location continues the last one, words are expected in ascending order of address,
+        # re-writing a word (resolved references, ...) keeps its initial location ...
+        if self.end is not None and address <= self.end:
+            return
+        self.end = address
+        key = location_key(location, self._file_ids)
+        if key[0] == len(self.file_names):
+            self.file_names.append(next(name for name, file_id in self._file_ids.iteritems() if file_id == key[0]))
+        if not len(self.addresses) or key != (self.file_ids[-1], self.lines[-1], self.columns[-1]):
+            self.addresses.append(address)
+            self.file_ids.append(key[0]), self.lines.append(key[1]), self.columns.append(key[2])
+
+    def location(self, address):
+        index = bisect_right(self.addresses, address) - 1
+        if index < 0:
+            return LocationNotSet
+        return Location(self.file_names[self.file_ids[index]], self.lines[index], self.columns[index])
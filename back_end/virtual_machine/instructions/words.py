@@ -0,0 +1,96 @@
+__author__ = 'samyvilar'
+
+import inspect
+from array import array
+from struct import calcsize, pack, unpack
+from itertools import izip, imap, chain, repeat, ifilter, starmap, groupby
+from operator import and_
+
+import back_end.virtual_machine.instructions.architecture as architecture
+from back_end.virtual_machine.instructions.architecture import RealOperand
+from back_end.virtual_machine.instructions.architecture import Word, Half, Quarter, OneEighth, DoubleHalf, Double
+
+# Machine words laid out exactly as they are in memory (the hosts byte order), in pure python so programs can be
+# compiled (and their images written) whether or not the C virtual machine is available ...
+
+word_names = tuple((p + 'word') for p in ('', 'half_', 'quarter_', 'one_eighth_'))
+signed_word_names = tuple(imap('signed_'.__add__, word_names))
+float_names = 'float', 'half_float'
+
+word_type_formats = dict(chain(
+    izip(word_names, ('Q', 'I', 'H', 'B')), izip(signed_word_names, ('q', 'i', 'h', 'b')), izip(float_names, 'df')
+))
+word_type_sizes = dict((name, calcsize('=' + value_format)) for name, value_format in word_type_formats.iteritems())
+
+word_size = word_type_sizes['word']  # every instruction and operand occupies a single word ...
+word_mask = (1 << (8 * word_size)) - 1
+
+try:  # array has no 'Q' typecode in python 2, so pick the unsigned type matching a 64 bit word ...
+    word_format = next(ifilter(lambda t: array(t).itemsize == word_size, ('L', 'I')))
+except StopIteration as _:
+    raise ImportError('No array type code for a {s} byte word'.format(s=word_size))
+
+
+architecture_types = set(
+    ifilter(
+        lambda cls: inspect.isclass(cls)
+        and issubclass(cls, architecture.Operand)
+        and cls not in {architecture.Operand, architecture.RealOperand},
+        imap(getattr, repeat(architecture), dir(architecture))
+    )
+)
+
+architecture_float_types = set(ifilter(
+    lambda cls: issubclass(cls, RealOperand) and cls is not RealOperand, architecture_types
+))
+architecture_integral_types = architecture_types - architecture_float_types
+
+
+def architecture_word_name(cls):
+    signed = 'signed_'
+    if issubclass(cls, OneEighth):
+        return signed + 'one_eighth_word'
+    elif issubclass(cls, Half):
+        return signed + 'half_word'
+    elif issubclass(cls, Quarter):
+        return signed + 'quarter_word'
+    elif issubclass(cls, Word):
+        return signed + 'word'
+    elif issubclass(cls, DoubleHalf):
+        return 'half_float'
+    elif issubclass(cls, Double):
+        return 'float'
+    else:
+        raise ValueError('{c} could not be identified!'.format(c=cls))
+
+architecture_type_to_word_type = dict(izip(architecture_types, imap(architecture_word_name, architecture_types)))
+
+
+architecture_type_masks = dict(
+    (cls, (1 << (8 * word_type_sizes[name])) - 1) for cls, name in architecture_type_to_word_type.iteritems()
+)
+
+
+def pack_run(element_type, elements):
+    # pack a run of same typed values using a single struct call, using the hosts byte order so that the resulting
+    # bytes are laid out exactly as they would be in memory ...
+    elements = tuple(elements)
+    word_type_name = architecture_type_to_word_type[element_type]
+    if element_type in architecture_float_types:
+        return pack('={0}{1}'.format(len(elements), word_type_formats[word_type_name]), *imap(float, elements))
+    return pack(  # mask signed values so both signed/unsigned values use the unsigned format ...
+        '={0}{1}'.format(len(elements), word_type_formats[word_type_name].upper()),
+        *imap(and_, imap(long, elements), repeat(architecture_type_masks[element_type]))
+    )
+
+
+def pack_binaries(elements, to_type=Word):
+    to_word_type_name = architecture_type_to_word_type[to_type]
+    assert not word_type_sizes[to_word_type_name] % min(word_type_sizes.itervalues())
+    binaries = ''.join(starmap(pack_run, groupby(elements, type)))
+    # zeros are appended to the end (highest address) which is correct for both little and big endian hosts ...
+    binaries += '\0' * (-len(binaries) % word_type_sizes[to_word_type_name])
+    return imap(to_type, unpack(
+        '={0}{1}'.format(len(binaries) / word_type_sizes[to_word_type_name], word_type_formats[to_word_type_name]),
+        binaries
+    ))
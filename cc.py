@@ -29,12 +29,17 @@ from utils.symbol_table import SymbolTable
 import back_end.emitter.emit as emitter
 import back_end.linker.link as linker
 from back_end.loader.load import load as load_binaries
+import back_end.loader.image as image
+import back_end.native.translate as native
+from back_end.emitter.cpu import word_size
 
 import back_end.emitter.system_calls as system_calls
 
 from back_end.virtual_machine.instructions.architecture import Instruction
 
-from back_end.emitter.optimizer.optimize import optimize, zero_level_optimization, first_level_optimization
+from back_end.emitter.optimizer.optimize import optimize, first_level_optimization
+from back_end.emitter.optimizer.peephole import peephole_optimization
+from back_end.emitter.optimizer.jumps import thread_jumps
 
 from utils.errors import error_if_not_value
 from utils.rules import identity
@@ -96,26 +101,27 @@ std_libraries = ['libc.p']
 std_symbols = system_calls.SYMBOLS
 
 
-def instrs(files, include_dirs=(), libraries=(), optimizer=identity):
+def instrs(files, include_dirs=(), libraries=(), optimizer=identity, gc=False):
+    # the linked (InstructionBuffer) executable, the code of each symbol is optimized as its being linked ...
     symbol_table = SymbolTable()
-    return optimizer(
-        linker.resolve(
-            linker.executable(
-                chain(
-                    std_symbols.itervalues(), chain.from_iterable(starmap(symbols, izip(files, repeat(include_dirs))))
-                ),
-                symbol_table=symbol_table,
-                libraries=libraries,
-                linker=linker.static,
+    return linker.resolve(
+        linker.executable(
+            chain(
+                std_symbols.itervalues(), chain.from_iterable(starmap(symbols, izip(files, repeat(include_dirs))))
             ),
-            symbol_table
-        )
+            symbol_table=symbol_table,
+            libraries=libraries,
+            linker=linker.static,
+            gc=gc,
+            optimizer=optimizer,
+        ),
+        symbol_table
     )
 
 
-def assembly(files, includes=(), libraries=(), optimizer=identity):
+def assembly(files, includes=(), libraries=(), optimizer=identity, gc=False):
     mem = OrderedDict()
-    load_binaries(linker.set_addresses(instrs(files, includes, libraries, optimizer)), mem)
+    load_binaries(instrs(files, includes, libraries, optimizer, gc), mem)
     for addr, instr in ifilter(lambda i: isinstance(i[1], Instruction), mem.iteritems()):
         yield '{l}:{addr}: {elem}\n'.format(l=loc(instr), addr=addr, elem=instr)
 
@@ -132,6 +138,13 @@ def main():
     cli.add_argument('-shared', '--shared', action='store_true', default=False, help='Shared Linking.')
     cli.add_argument('--vm', action='store_true', default=False, help='Execute code on Virtual Machine.')
     cli.add_argument('-a', '--archive', action='store_true', default=False, help='Archive files into a single output')
+    cli.add_argument('--pickle', action='store_true', default=False,
+                     help='Emit executable as a pickled list of instructions instead of a flat image.')
+    cli.add_argument('--native', action='store_true', default=False,
+                     help='Translate the executable into C and compile it (gcc) into a shared object run by vm.py.')
+    cli.add_argument('--strip', action='store_true', default=False, help='Omit the locations table from images.')
+    cli.add_argument('--gc-sections', action='store_true', default=False,
+                     help='Omit symbols and instructions unreachable from the entry point when linking.')
 
     cli.add_argument('-o', '--output', default=[], nargs='?', action='append',
                      help='Name of output, file(s) default is the original')
@@ -152,14 +165,16 @@ def main():
 
     libraries = ifilter(os.path.isfile, starmap(os.path.join, product(args.Libraries, args.libraries)))
 
-    optimizer = lambda instrs: optimize(instrs, zero_level_optimization)
+    optimizer = identity  # the symbols are linked as they were emitted ...
     if args.optimize and args.optimize[0] == '1':
         optimizer = lambda instrs: optimize(instrs, first_level_optimization)
+    if args.optimize and args.optimize[0] == '2':  # peephole the linked instructions ...
+        optimizer = lambda instrs: peephole_optimization(thread_jumps(optimize(instrs, first_level_optimization)))
 
     if args.preprocess:
         exhaust(imap(sys.stdout.write, preprocess(args.files, args.Include)))
     elif args.assembly:
-        exhaust(imap(sys.stdout.write, assembly(args.files, args.Include, libraries, optimizer)))
+        exhaust(imap(sys.stdout.write, assembly(args.files, args.Include, libraries, optimizer, args.gc_sections)))
     elif args.compile:
         if args.output:  # if output(s) giving then check it matches the number of inputs ...
             output_files = error_if_not_value(repeat(len(args.output), 1), len(args.files)) and args.output
@@ -180,15 +195,24 @@ def main():
     elif args.shared:
         raise NotImplementedError
     else:  # default compile, and and statically link ...
-        instructions = instrs(args.files, args.Include, libraries, optimizer)
+        instructions = instrs(args.files, args.Include, libraries, optimizer, args.gc_sections)
 
-        if args.vm:  # if we requested a vm then execute instructions ...
+        if args.vm and vm.c_virtual_machine:  # if we requested a vm then execute instructions ...
             vm.start(instructions)
+        elif args.vm:  # without the C virtual machine, on the python one ...
+            vm.start_python(instrs=instructions)
         else:  # other wise emit single executable file ...
             _ = args.output and error_if_not_value(repeat(len(args.output), 1), 1, Location('cc.py', '', ''))
-            file_output = args.output and args.output[0] or 'a.out.p'  # if not giving an output use default a.out.p
-            with open(file_output, 'wb') as file_obj:
-                pickle.dump(tuple(instructions), file_obj)
+            if args.pickle:
+                file_output = args.output and args.output[0] or 'a.out.p'  # if not giving an output use a.out.p
+                with open(file_output, 'wb') as file_obj:
+                    pickle.dump(tuple(instructions), file_obj)
+            elif args.native:
+                native.build(instructions, args.output and args.output[0] or 'a.out')
+            else:  # pre-address and relocate instructions into a flat image that vm.py can map directly ...
+                file_output = args.output and args.output[0] or 'a.out'
+                with open(file_output, 'wb') as file_obj:
+                    image.dump(instructions, file_obj, word_size, not args.strip)
 
 
 if __name__ == '__main__':
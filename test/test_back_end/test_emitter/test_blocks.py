@@ -0,0 +1,135 @@
+__author__ = 'samyvilar'
+
+import os
+from unittest import TestCase
+from tempfile import NamedTemporaryFile
+
+from back_end.emitter.blocks import CPU, VirtualMemory, PagedMemory, evaluate, base_element, load_image, word_size
+from back_end.emitter.blocks import page_size, kinds, float_kinds, masks, sign_bits, suffixes, as_float
+from back_end.emitter.blocks import flag_indices, flag_expression, from_double, from_single
+from back_end.loader.load import load
+import back_end.loader.image as image
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import instrs
+
+
+class TestBlocks(TestCase):
+    code = """
+    struct triple {int first; int second; int third;};
+
+    int twice(int value) { return 2 * value; }
+
+    int classify(int value)
+    {
+        switch (value)
+        {
+            case 10: return 1;
+            case 20: return 2;
+            case -1: return 3;
+        }
+        return 0;
+    }
+
+    int main()
+    {
+        int index = 0, total = 0;
+        unsigned long long big = -1;
+        int (*func)(int) = twice;
+        struct triple triples[2], copy;
+        char letters[4] = {'a', 'b', 'c', 0};
+        double ratio = 1.5;
+        for (; index < 10; index++)
+            total += func(index);  /* 90 */
+        triples[1].first = 3, triples[1].second = 4, triples[1].third = 5;
+        copy = triples[1];
+        total += copy.first * copy.second - copy.third;  /* 97 */
+        total += classify(20) + classify(-1) + classify(30);  /* 102 */
+        total += letters[2] - letters[0];  /* 104 */
+        total += (int)(ratio * 4) / 3;  /* 106 */
+        int flag = 1;
+        flag += 2;
+        if (big > 1)
+            total += 1000 * flag;
+        return total;
+    }
+    """
+
+    def test_blocks(self):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(instrs(self.code), self.mem)
+        evaluate(self.cpu, self.mem)
+        self.assertEqual(base_element(self.cpu, self.mem, 'Half'), 3106)
+        self.assertIn(0, self.mem.blocks)  # blocks are only compiled once reached ...
+        self.assertLess(len(self.mem.blocks), len(self.mem))
+
+    def test_blocks_image(self):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        with NamedTemporaryFile(delete=False) as file_obj:
+            image.dump(instrs(self.code), file_obj, word_size)
+        try:
+            with image.read(file_obj.name) as executable_image:
+                load_image(executable_image, self.mem)
+        finally:
+            os.remove(file_obj.name)
+        evaluate(self.cpu, self.mem)
+        self.assertEqual(base_element(self.cpu, self.mem, 'Half'), 3106)
+
+    def test_paged_memory(self):
+        self.cpu, self.mem = CPU(), PagedMemory()
+        load(instrs(self.code), self.mem)
+        evaluate(self.cpu, self.mem)
+        self.assertEqual(base_element(self.cpu, self.mem, 'Half'), 3106)
+        self.assertLess(len(self.mem.pages), 4)  # code, data, heap and stack, only as they are accessed ...
+
+    def test_paged_memory_accessors(self):  # same as words, across pages ...
+        words, pages = VirtualMemory().accessors, PagedMemory().accessors
+        address = page_size - 6
+        for accessors in words, pages:
+            accessors['store'](address, 0x0102030405060708)
+            accessors['store_half'](address - 2, 0xAABBCCDD)
+            accessors['copy'](address + 4, address - 2, 12)
+            accessors['write'](page_size - 1, 'xy')
+        for name in 'load', 'load_half', 'load_quarter', 'load_one_eighth':
+            self.assertEqual(
+                [words[name](address) for address in xrange(page_size - 12, page_size + 12)],
+                [pages[name](address) for address in xrange(page_size - 12, page_size + 12)],
+            )
+        self.assertEqual(words['read'](page_size - 12, 24), pages['read'](page_size - 12, 24))
+
+    def test_comparisons(self):  # flags are only computed by the Load*Flag instructions ...
+        code = """
+        int main()
+        {
+            unsigned int index, count = 0;
+            char letter = 'a';
+            double value = 0.5;
+            for (index = 0; index < 100; index++)
+                count += (index < 10) + (index > 90) + (index == 7) + (letter >= 'b') + (value < 1.0);
+            return count;
+        }
+        """
+        self.cpu, self.mem = CPU(), PagedMemory()
+        load(instrs(code), self.mem)
+        evaluate(self.cpu, self.mem)
+        self.assertEqual(base_element(self.cpu, self.mem, 'Half'), 120)
+
+    def test_flag_expressions(self):  # same flags as the comparisons computing all of them ...
+        namespace = PagedMemory().blocks.namespace
+        for kind, is_float in [(kind, False) for kind in kinds] + [(kind, True) for kind in float_kinds]:
+            compare = namespace[('compare_float' if is_float else 'compare') + suffixes[kind]]
+            values = [0, 1, 2, masks[kind], sign_bits[kind], sign_bits[kind] - 1, sign_bits[kind] + 1]
+            if is_float:
+                to_float = from_single if kind else from_double
+                values = map(to_float, (0.0, -0.0, 1.5, -1.5, float('inf'), float('nan')))
+            for flag_name, flag_index in flag_indices.iteritems():
+                if is_float:
+                    expression = '(lambda cd: {e})({l} - {r})'.format(
+                        e=flag_expression(flag_name, kind, is_float, 'cl', 'cd'),
+                        l=as_float[kind].format('cl'), r=as_float[kind].format('cr')
+                    )
+                else:
+                    expression = flag_expression(flag_name, kind, is_float, 'cl', 'cr')
+                flag = eval('lambda cl, cr: 1 if {e} else 0'.format(e=expression), namespace)
+                for left in values:
+                    for right in values:
+                        self.assertEqual(flag(left, right), (compare(left, right) >> flag_index) & 1)
@@ -9,7 +9,7 @@ from front_end.loader.load import source
 from front_end.tokenizer.tokenize import tokenize
 from front_end.preprocessor.preprocess import preprocess
 
-from front_end.parser import parse
+from front_end.parser.parse import parse
 from utils.symbol_table import SymbolTable
 
 from back_end.emitter.emit import emit
@@ -20,20 +20,23 @@ from back_end.emitter.c_types import get_word_type_name
 
 from front_end.parser.ast.expressions import ConstantExpression, IntegerType
 
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
 from back_end.loader.load import load
 
 
-class TestDeclarations(TestCase):
-    def evaluate(self, code):
-        symbol_table, self.cpu, self.mem = SymbolTable(), CPU(), VirtualMemory()
+def linked(code, file_name='__SOURCE__', symbol_table=None):  # the linked instructions of code ...
+    symbol_table = SymbolTable() if symbol_table is None else symbol_table
+    return resolve(executable(emit(parse(preprocess(tokenize(source(code, file_name))))), symbol_table), symbol_table)
+
 
-        load(
-            set_addresses(
-                resolve(executable(emit(parse(preprocess(tokenize(source(code))))), symbol_table), symbol_table)
-            ),
-            self.mem,
-        )
+def instrs(code, file_name='__SOURCE__', symbol_table=None):
+    return InstructionBuffer(linked(code, file_name, symbol_table))
 
+
+class TestDeclarations(TestCase):
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(set_addresses(linked(code)), self.mem)
         evaluate(self.cpu, self.mem)
 
     def assert_base_element(self, element):
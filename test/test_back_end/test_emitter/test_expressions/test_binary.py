@@ -63,4 +63,31 @@ class TestPointerArithmetic(TestStatements):
         }
         """
         self.evaluate(code)
-        self.assert_base_element(ConstantExpression(0, IntegerType()))
\ No newline at end of file
+        self.assert_base_element(ConstantExpression(0, IntegerType()))
+
+
+class TestComparisons(TestStatements):
+    def test_fused_compare_and_jump(self):
+        code = """
+        {
+            int total = 0, a = -2147483647 - 1, b = 1;
+            unsigned int c = -1, d = 1;
+            long e = -5;
+            double f = 1.5, g = 2.5;
+            if (a < b)
+                total += 1;
+            if (c > d)
+                total += 2;
+            if (e <= -5)
+                total += 4;
+            if (f < g)
+                total += 8;
+            if (f >= g)
+                total = 0;
+            while (e != 0)
+                e++;
+            total += (e == 0) ? 16 : 0;
+        }
+        """
+        self.evaluate(code)
+        self.assert_base_element(ConstantExpression(31, IntegerType()))
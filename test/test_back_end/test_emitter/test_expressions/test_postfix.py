@@ -1,5 +1,14 @@
 __author__ = 'samyvilar'
 
+from StringIO import StringIO
+from itertools import imap
+
+from cc import instrs
+from back_end.emitter.cpu import evaluate, CPU, VirtualMemory
+from back_end.loader.load import load
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
+from back_end.virtual_machine.instructions.architecture import Call, AbsoluteCall, Return, Enter, Leave
+
 from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations
 from test.test_back_end.test_emitter.test_statements.test_compound import TestStatements
 
@@ -217,4 +226,29 @@ class TestPostFixFunction(TestDeclarations):
         }
         """
         self.evaluate(source)
-        self.assert_base_element(ConstantExpression(11, IntegerType()))
\ No newline at end of file
+        self.assert_base_element(ConstantExpression(11, IntegerType()))
+
+
+class TestFunctionCallInstructions(TestPostFixFunction):  # runs the function call tests through the compiler driver
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        self.instrs = tuple(instrs((StringIO(code),)))
+        load(InstructionBuffer(iter(self.instrs)), self.mem)
+        evaluate(self.cpu, self.mem)
+
+    def test_recursive_function_call(self):
+        source = """
+        int fib(int n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }
+        int apply(int (*func)(int), int value) { return value ? func(value) + apply(func, value - 1) : 0; }
+        int main()
+        {
+            return apply(fib, 10) - fib(12);
+        }
+        """
+        self.evaluate(source)
+        self.assert_base_element(ConstantExpression(143 - 144, IntegerType()))
+
+    def test_call_instructions(self):
+        self.test_recursive_function_call()
+        instr_types = set(imap(type, self.instrs))
+        self.assertTrue({Call, AbsoluteCall, Return, Enter, Leave} <= instr_types)
@@ -0,0 +1,46 @@
+__author__ = 'samyvilar'
+
+from itertools import imap
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from back_end.linker.link import set_addresses
+from back_end.emitter.cpu import evaluate, CPU, VirtualMemory, word_size
+from back_end.loader.load import load
+from back_end.loader.image import encode
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations, instrs, linked
+
+
+class TestInstructionBuffer(TestDeclarations):
+    code = """
+        double values[2] = {1.5, 2.5};
+        int main()
+        {
+            int index, total = 0;
+            for (index = 0; index < 10; index++)
+                switch (index)
+                {
+                    case 1: total += 1; break;
+                    case 5: total += 5; break;
+                    default: total += 2;
+                }
+            return total + (int)(values[0] + values[1]);
+        }
+    """
+
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(instrs(code), self.mem)
+        evaluate(self.cpu, self.mem)
+
+    def test_buffer(self):
+        self.evaluate(self.code)
+        self.assert_base_element(ConstantExpression(26, IntegerType()))
+
+    def test_buffer_encoding(self):
+        expected = encode(set_addresses(linked(self.code)), word_size)
+        buf = instrs(self.code)
+        self.assertEqual(tuple(imap(list, buf.encode())), tuple(imap(list, expected)))
+        # adapter, re-created instructions/operands must encode to the exact same image ...
+        self.assertEqual(tuple(imap(list, encode(buf.elements(), word_size))), tuple(imap(list, expected)))
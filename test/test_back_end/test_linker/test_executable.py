@@ -14,6 +14,9 @@ from back_end.emitter.emit import emit
 from back_end.linker.link import executable, set_addresses, resolve
 from back_end.emitter.cpu import evaluate, CPU, VirtualMemory
 from back_end.loader.load import load
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations
 
 
 class TestExecutable(TestCase):
@@ -42,4 +45,41 @@ class TestExecutable(TestCase):
             ),
             mem
         )
-        evaluate(cpu, mem)
\ No newline at end of file
+        evaluate(cpu, mem)
+
+
+class TestGarbageCollectedExecutable(TestDeclarations):
+    source_codes = """
+        extern int b;
+        int unused_value = 3;
+        static int unused() { return unused_value; }
+        int used() { return b + 1; b = 4; return b; }
+        int main()
+        {
+            b = 10;
+            return used();
+            b = unused();
+        }
+    """, 'int b; int c; int also_unused(int a) { return a * c; }'
+
+    def link(self, gc):
+        symbol_table = SymbolTable()
+        instructions = tuple(resolve(
+            executable(
+                chain.from_iterable(emit(parse(preprocess(tokenize(source(code))))) for code in self.source_codes),
+                symbol_table,
+                gc=gc
+            ),
+            symbol_table
+        ))
+        return instructions, symbol_table
+
+    def test_gc_sections(self):
+        instructions, symbol_table = self.link(True)
+        self.assertEqual(set(symbol_table.stack[-1].iterkeys()), {'main', 'used', 'b', '__end__'})
+        self.assertLess(len(instructions), len(self.link(False)[0]))
+
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(set_addresses(instructions), self.mem)
+        evaluate(self.cpu, self.mem)
+        self.assert_base_element(ConstantExpression(11, IntegerType()))
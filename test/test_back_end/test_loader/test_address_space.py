@@ -0,0 +1,53 @@
+__author__ = 'samyvilar'
+
+import os
+from unittest import TestCase
+from tempfile import NamedTemporaryFile
+
+from back_end.emitter.cpu import CPU, VirtualMemory, evaluate, base_element, load_image, word_size
+from back_end.emitter.cpu import word_type_factories
+from back_end.loader.load import load
+import back_end.loader.image as image
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import instrs
+
+
+class TestAddressSpace(TestCase):
+    code = """
+    int values[1000];
+
+    int main()
+    {
+        int index, total = 0;
+        for (index = 0; index < 1000; index++)
+            values[index] = index * %d;
+        for (index = 0; index < 1000; index++)
+            total += values[index] %% 7;
+        return total;
+    }
+    """
+
+    def test_independent_address_spaces(self):  # each memory has its own (private) address space ...
+        number_of_words = 1 << 20
+        memories = [VirtualMemory(number_of_words=number_of_words) for _ in xrange(2)]
+        self.assertNotEqual(memories[0].start_of_physical_addr, memories[1].start_of_physical_addr)
+        self.assertEqual(
+            memories[0].end_of_physical_addr - memories[0].start_of_physical_addr, number_of_words * word_size
+        )
+        for factor, mem in enumerate(memories, 1):
+            load(instrs(self.code % factor), mem)
+        results = []
+        for mem in reversed(memories):  # the second program mustn't overwrite the first ...
+            cpu = CPU()
+            evaluate(cpu, mem)
+            results.append(base_element(cpu, mem, word_type_factories['half_word']))
+        self.assertEqual(results, [sum((index * factor) % 7 for index in xrange(1000)) for factor in (2, 1)])
+
+    def test_image_exceeding_address_space(self):
+        with NamedTemporaryFile(delete=False) as file_obj:
+            image.dump(instrs(self.code % 1), file_obj, word_size)
+        try:
+            with image.read(file_obj.name) as executable_image:
+                self.assertRaises(ValueError, load_image, executable_image, VirtualMemory(number_of_words=16))
+        finally:
+            os.remove(file_obj.name)
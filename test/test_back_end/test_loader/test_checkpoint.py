@@ -0,0 +1,143 @@
+__author__ = 'samyvilar'
+
+from time import time
+from mmap import PAGESIZE
+from ctypes import cast, POINTER, memset
+from unittest import TestCase
+from tempfile import TemporaryFile
+
+
+from back_end.emitter.cpu import CPU, VirtualMemory, Kernel, evaluate, base_element, word_size, word_type
+from back_end.emitter.cpu import checkpoint, restore, reset, resume, run_until, word_type_factories
+from back_end.emitter.system_calls import CALLS
+from back_end.loader.load import load
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import instrs
+
+
+class TestCheckpoint(TestCase):
+    code = """
+    int counter = 0;
+    int values[10000];
+
+    int work(int offset)
+    {
+        int index;
+        for (index = 0; index < 10000; index++)
+            values[index] += index + offset;
+        return values[9999] + counter;
+    }
+
+    int main()
+    {
+        counter += 5;
+        return work(counter);
+    }
+    """
+
+    def setUp(self):
+        self.instrs = instrs(self.code)
+        self.work = self.instrs.symbols['work'] * word_size
+        self.cpu, self.mem = CPU(), VirtualMemory(number_of_words=1 << 20)
+        load(self.instrs, self.mem)
+
+    def result(self):
+        return base_element(self.cpu, self.mem, word_type_factories['half_word'])
+
+    def test_restore(self):  # globals are back to their initial values on every run ...
+        state = checkpoint(self.cpu, self.mem)
+        for _ in xrange(3):
+            restore(state, self.cpu, self.mem)
+            evaluate(self.cpu, self.mem)
+            self.assertEqual(self.result(), 9999 + 5 + 5)
+        evaluate(self.cpu, self.mem)  # without restoring ...
+        self.assertEqual(self.result(), (9999 + 5) + (9999 + 10) + 10)
+        state.close()
+
+    def test_checkpoint_restored(self):  # pages of a restored checkpoint that were never touched are checkpointed ...
+        state = checkpoint(self.cpu, self.mem)
+        restore(state, self.cpu, self.mem)
+        restored_state = checkpoint(self.cpu, self.mem)
+        state.close()
+        cpu, mem = CPU(), VirtualMemory(number_of_words=1 << 20)
+        restore(restored_state, cpu, mem)
+        evaluate(cpu, mem)
+        self.assertEqual(base_element(cpu, mem, word_type_factories['half_word']), 9999 + 5 + 5)
+        restored_state.close()
+
+    def test_reset(self):  # in place, the address space isn't re-mapped ...
+        state = checkpoint(self.cpu, self.mem)
+        start_of_physical_addr = self.mem.start_of_physical_addr
+        for _ in xrange(3):
+            reset(state, self.cpu, self.mem)
+            evaluate(self.cpu, self.mem)
+            self.assertEqual(self.result(), 9999 + 5 + 5)
+        self.assertEqual(self.mem.start_of_physical_addr, start_of_physical_addr)
+
+    def test_reset_writes(self):  # words written after the checkpoint, within the program or not, are undone ...
+        state = checkpoint(self.cpu, self.mem)
+        words = cast(self.mem.c_vm_p, POINTER(word_type * self.mem.number_of_words)).contents
+        addresses = 0, len(self.instrs) - 1, len(self.instrs) + 4096, self.mem.number_of_words - 1
+        initial = [words[address] for address in addresses]
+        for address in addresses:
+            words[address] = 0xDEADBEEF
+        reset(state, self.cpu, self.mem)
+        self.assertEqual([words[address] for address in addresses], initial)
+        self.assertEqual(initial[2:], [0, 0])
+
+    def test_reset_cost(self):  # proportional to the pages touched since, not to the size of the checkpoint ...
+        mem = VirtualMemory(number_of_words=1 << 24)
+        memset(mem.start_of_physical_addr, 1, 1 << 26)  # 64MB in the checkpoint ...
+        state = checkpoint(self.cpu, mem)
+
+        def elapsed(number_of_pages):  # (best of 5) to reset after writing number_of_pages ...
+            times = []
+            for _ in xrange(5):
+                reset(state, self.cpu, mem)
+                memset(mem.start_of_physical_addr, 2, number_of_pages * PAGESIZE)
+                start = time()
+                reset(state, self.cpu, mem)
+                times.append(time() - start)
+            return min(times)
+        self.assertLess(4 * elapsed(16), elapsed((1 << 26) / PAGESIZE))
+        self.assertEqual(cast(mem.c_vm_p, POINTER(word_type))[0], 0x0101010101010101)
+        state.close()
+
+    def test_reset_empty(self):  # a checkpoint taken before loading anything, clears the memory for another program
+        mem = VirtualMemory(number_of_words=1 << 20)
+        state = checkpoint(self.cpu, mem)
+        for _ in xrange(2):
+            reset(state, self.cpu, mem)
+            self.assertEqual(mem.size_of_program, 0)
+            self.assertEqual(sum(cast(mem.c_vm_p, POINTER(word_type * (1 << 20))).contents), 0)
+            load(self.instrs, mem)
+            evaluate(self.cpu, mem)
+            self.assertEqual(base_element(self.cpu, mem, word_type_factories['half_word']), 9999 + 5 + 5)
+
+    def test_restore_threaded(self):
+        self.mem.thread(self.instrs.instruction_addresses())
+        state = checkpoint(self.cpu, self.mem)
+        for _ in xrange(2):
+            restore(state, self.cpu, self.mem)
+            evaluate(self.cpu, self.mem)
+            self.assertEqual(self.result(), 9999 + 5 + 5)
+
+    def test_run_until(self):  # each run resumes within work, main having already run up to it ...
+        run_until(self.cpu, self.mem, self.work)
+        self.assertEqual(self.cpu.instr_pointer, self.mem.start_of_physical_addr + self.work)
+        state = checkpoint(self.cpu, self.mem)
+        for _ in xrange(2):
+            restore(state, self.cpu, self.mem)
+            resume(self.cpu, self.mem)
+            self.assertEqual(self.result(), 9999 + 5 + 5)
+
+    def test_kernel(self):  # opened files are rewound to their checkpointed positions ...
+        with TemporaryFile() as file_obj:
+            file_obj.write('0123456789')
+            file_obj.seek(2)
+            os = Kernel(CALLS, open_files=((3, file_obj),))
+            state = checkpoint(self.cpu, self.mem, os)
+            file_obj.read(4)
+            restore(state, self.cpu, self.mem, os)
+            self.assertEqual(file_obj.read(3), '234')
+            self.assertEqual([file_id for file_id, _ in os.c_opened_files()], [3])
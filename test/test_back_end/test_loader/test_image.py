@@ -0,0 +1,74 @@
+__author__ = 'samyvilar'
+
+import os
+from tempfile import NamedTemporaryFile
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from back_end.linker.link import set_addresses
+from back_end.emitter.cpu import CPU, VirtualMemory, evaluate, load_image, word_size
+import back_end.loader.image as image
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations, linked
+
+
+class TestImage(TestDeclarations):
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        with NamedTemporaryFile(delete=False) as file_obj:
+            image.dump(set_addresses(linked(code)), file_obj, word_size)
+        try:
+            self.image = image.read(file_obj.name)
+            load_image(self.image, self.mem)
+            evaluate(self.cpu, self.mem)
+        finally:
+            os.remove(file_obj.name)
+
+    def test_image(self):
+        code = """
+        double values[3] = {1.5, 2.5, 3.0};
+        int *ptr;
+        int b = 10;
+
+        int main()
+        {
+            ptr = &b;
+            return (int)(values[0] + values[1] + values[2]) + *ptr;
+        }
+        """
+        self.evaluate(code)
+        self.assert_base_element(ConstantExpression(17, IntegerType()))
+        self.image.close()
+
+    def test_image_locations(self):
+        code = """
+        int main()
+        {
+            return 0;
+        }
+        """
+        self.evaluate(code)
+        self.assertTrue(len(self.image.relocations))
+        self.assertEqual(self.image.location(self.image.size - word_size).file_name, '__SOP__')
+        self.assertIn(4, set(location[1] for location in self.image.location_values))
+        self.image.close()
+
+    def test_image_symbols(self):  # the name and address of every linked symbol ...
+        code = """
+        int b = 10;
+
+        int main()
+        {
+            return b;
+        }
+        """
+        program = linked(code)
+        with NamedTemporaryFile(delete=False) as file_obj:
+            image.dump(program, file_obj, word_size)
+        try:
+            with image.read(file_obj.name) as executable_image:
+                self.assertEqual(executable_image.symbols, program.location_table().symbols)
+                self.assertEqual(executable_image.symbols[program.symbols['main'] * word_size], 'main')
+                self.assertIn('b', executable_image.symbols.values())
+        finally:
+            os.remove(file_obj.name)
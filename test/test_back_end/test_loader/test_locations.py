@@ -0,0 +1,76 @@
+__author__ = 'samyvilar'
+
+from ctypes import cast, POINTER
+from itertools import imap
+
+from unittest import TestCase
+
+from front_end.loader.locations import loc, Location, LocationNotSet
+
+from back_end.linker.link import set_addresses
+from back_end.emitter.cpu import CPU, VirtualMemory, evaluate, word_size, word_type
+from back_end.virtual_machine.instructions.locations import LocationTable, location_key
+from back_end.loader.load import load
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import instrs, linked
+
+
+def keys(locations):  # symbolic locations ('__SOP__', ...) are read back as locations at line 0 ...
+    file_ids = {}
+    return [location_key(location, file_ids) for location in locations]
+
+
+class TestLocations(TestCase):
+    code = """
+    int values[100];
+
+    int main()
+    {
+        int index;
+        for (index = 0; index < 100; index++)
+            values[index] = index;
+        return values[99];
+    }
+    """
+
+    def test_location_table(self):  # one run per location, as the buffer ...
+        program = instrs(self.code)
+        mem = VirtualMemory(number_of_words=1 << 20)
+        load(program, mem)
+        self.assertLess(len(mem.locations), len(program))
+        addresses = xrange(0, len(program) * word_size, word_size)
+        self.assertEqual(keys(imap(mem.location, addresses)), keys(imap(program.location, addresses)))
+
+    def test_elements(self):  # stored elements aren't kept, only their locations ...
+        mem = VirtualMemory(number_of_words=1 << 20, keep_code=False)
+        addresses, locations = [], []
+        for element in set_addresses(linked(self.code)):
+            mem[element.address] = element
+            addresses.append(element.address), locations.append(loc(element))
+        self.assertIsNone(mem.code)
+        self.assertEqual(keys(imap(mem.location, addresses)), keys(locations))
+
+    def test_invalid_instruction(self):  # reported at the location of the invalid instruction ...
+        program = instrs(self.code)
+        address = program.instruction_addresses()[0]  # the entry point ...
+        mem = VirtualMemory(number_of_words=1 << 20)
+        load(program, mem)
+        cast(mem.start_of_physical_addr + address, POINTER(word_type))[0] = 1  # no instruction has id 1 ...
+        with self.assertRaises(ValueError) as error:
+            evaluate(CPU(), mem)
+        self.assertIn(str(program.location(address)), str(error.exception))
+
+    def test_location_runs(self):
+        table = LocationTable()
+        location = Location('file.c', 4, 2)
+        for address, value in enumerate(['__SOP__', '__SOP__', location, location, '__SOP__']):
+            table.append(address * word_size, value)
+        table.append(0, location)  # already located ...
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.file_names, ['__SOP__', 'file.c'])
+        self.assertEqual(table.location(3 * word_size), location)
+        self.assertEqual(table.location(-1), LocationNotSet)
+        self.assertEqual(LocationTable(
+            [value for run in zip(table.addresses, table.file_ids, table.lines, table.columns) for value in run],
+            table.file_names
+        ).location(word_size), table.location(word_size))
@@ -0,0 +1,132 @@
+__author__ = 'samyvilar'
+
+import os
+import linecache
+from unittest import TestCase
+from tempfile import NamedTemporaryFile
+from StringIO import StringIO
+
+from back_end.emitter.cpu import CPU, VirtualMemory, evaluate, base_element, word_type_factories
+from back_end.virtual_machine.instructions.architecture import Halt, Enter
+from back_end.loader.load import load
+from back_end.virtual_machine.hot_spots import HotSpots
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import instrs
+
+
+class TestProfile(TestCase):
+    code = """
+    int square(int value) { return value * value; }
+
+    int main()
+    {
+        int index, total = 0;
+        for (index = 0; index < 100; index++)
+            total += square(index);
+        return total;
+    }
+    """
+
+    def setUp(self):
+        self.instrs = instrs(self.code)
+        self.cpu, self.mem = CPU(), VirtualMemory(number_of_words=1 << 20)
+        load(self.instrs, self.mem)
+
+    def evaluate(self):
+        evaluate(self.cpu, self.mem)
+        self.assertEqual(base_element(self.cpu, self.mem, word_type_factories['half_word']), 328350)
+
+    def test_profile(self):
+        profile = self.mem.profiled()
+        self.evaluate()
+        instructions, addresses = profile.instructions, profile.addresses
+        self.assertEqual(sum(instructions.itervalues()), sum(addresses.itervalues()))
+        self.assertEqual(addresses[0], 1)  # the entry point ...
+        self.assertEqual(instructions[Halt], 1)
+        self.assertEqual(instructions[Enter], 101)  # main and square ...
+        self.assertTrue(set(addresses) <= set(self.instrs.instruction_addresses()))
+        self.evaluate()  # counts accumulate ...
+        self.assertEqual(profile.addresses, dict((address, 2 * count) for address, count in addresses.iteritems()))
+
+    def test_calls(self):
+        profile = self.mem.profiled()
+        self.evaluate()
+        self.assertEqual(profile.count, sum(profile.addresses.itervalues()))
+        calls = sorted(profile.calls.itervalues())
+        self.assertEqual([number_of_calls for number_of_calls, _ in calls], [1, 100])  # main and square ...
+        main = min(callee for _, callee in profile.calls)  # every instruction but the entry point's is within main
+        entry_point = sum(count for address, count in profile.addresses.iteritems() if address < main)
+        self.assertEqual(calls[0][1], profile.count - entry_point)
+
+    def test_profile_threaded(self):
+        profile = self.mem.profiled()
+        self.evaluate()
+        self.mem.thread(self.instrs.instruction_addresses())
+        counts = profile.instructions
+        self.evaluate()
+        self.assertEqual(profile.instructions, dict((instr, 2 * count) for instr, count in counts.iteritems()))
+
+
+class TestHotSpots(TestCase):
+    code = """int square(int value)
+{
+    return value * value;
+}
+
+int total(int count)
+{
+    int index, sum = 0;
+    for (index = 0; index < count; index++)
+        sum += square(index);
+    return sum;
+}
+
+int main()
+{
+    return total(100) + total(10);
+}
+"""
+
+    def setUp(self):  # function names are those of the linked symbols, source lines read from the file ...
+        with NamedTemporaryFile(suffix='.c', delete=False) as file_obj:
+            file_obj.write(self.code)
+        self.file_name = file_obj.name
+        program = instrs(self.code, self.file_name)
+        cpu, self.mem = CPU(), VirtualMemory(number_of_words=1 << 20)
+        load(program, self.mem)
+        self.profile, self.locations = self.mem.profiled(), program.location_table()
+        evaluate(cpu, self.mem)
+        self.hot_spots = HotSpots(self.profile, self.locations)
+        self.count = self.profile.count
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def test_functions(self):
+        functions = self.hot_spots.functions
+        self.assertEqual(sum(exclusive for _, exclusive, _ in functions.itervalues()), self.count)
+        self.assertEqual(functions['__SOP__'][0], self.count)
+        self.assertEqual([functions[name][2] for name in ('main', 'total', 'square')], [1, 2, 110])
+        self.assertEqual(functions['square'][0], functions['square'][1])
+        self.assertEqual(functions['total'][0], functions['total'][1] + functions['square'][0])
+        self.assertEqual(functions['main'][0], functions['main'][1] + functions['total'][0])
+
+    def test_lines(self):
+        lines = self.hot_spots.source_lines
+        self.assertEqual(sum(exclusive for _, exclusive in lines.itervalues()), self.count)
+        inclusive, exclusive = lines[self.file_name, 10]  # sum += square(index); ...
+        self.assertEqual(inclusive - exclusive, self.hot_spots.functions['square'][0])
+
+    def test_callgrind(self):
+        file_obj = StringIO()
+        self.hot_spots.callgrind(file_obj)
+        lines = file_obj.getvalue().splitlines()
+        self.assertIn('summary: {0}'.format(self.count), lines)
+        for name in 'main', 'total', 'square':
+            self.assertIn('fn={0}'.format(name), lines)
+        self.assertEqual(lines[lines.index('cfn=square') + 1], 'calls=110 3')
+
+    def test_symbols(self):  # names don't depend on the source, (macros, missing or modified files, ...)
+        open(self.file_name, 'w').close()
+        linecache.clearcache()
+        self.assertEqual(HotSpots(self.profile, self.locations).functions, self.hot_spots.functions)
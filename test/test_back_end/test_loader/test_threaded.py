@@ -0,0 +1,61 @@
+__author__ = 'samyvilar'
+
+import os
+from tempfile import NamedTemporaryFile
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from back_end.emitter.cpu import CPU, VirtualMemory, evaluate, load_image, word_size, word_type
+from back_end.loader.load import load
+import back_end.loader.image as image
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations, instrs
+
+
+class TestThreaded(TestDeclarations):
+    code = """
+    int values[10] = {1, 2, 3, 4, 5, 6, 7, 8, 9, 10};
+
+    int main()
+    {
+        int index, total = 0;
+        for (index = 0; index < 10; index++)
+            total += values[index] * (index & 1 ? -1 : 2);
+        return total;
+    }
+    """
+
+    def word(self, address):
+        return self.mem.__getitem__(self.mem.start_of_physical_addr + address, word_type)
+
+    def test_threaded(self):
+        program, self.cpu, self.mem = instrs(self.code), CPU(), VirtualMemory()
+        load(program, self.mem)
+        addresses = program.instruction_addresses()
+        self.mem.thread(addresses)
+        self.assertTrue(all(  # the instruction id remains in the lowest byte ...
+            self.word(address) != program.words[address / word_size] == self.word(address) & 0xFF
+            for address in addresses
+        ))
+        evaluate(self.cpu, self.mem)
+        self.assert_base_element(ConstantExpression(20, IntegerType()))
+
+        self.mem.unthread()
+        self.assertEqual(map(self.word, addresses), [program.words[address / word_size] for address in addresses])
+
+    def test_threaded_image(self):  # images are threaded as they are executed ...
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        with NamedTemporaryFile(delete=False) as file_obj:
+            image.dump(instrs(self.code), file_obj, word_size)
+        try:
+            with image.read(file_obj.name) as executable_image:
+                load_image(executable_image, self.mem)
+                self.mem.thread()
+                evaluate(self.cpu, self.mem)
+                entry = executable_image.words()[0]
+        finally:
+            os.remove(file_obj.name)
+        self.assert_base_element(ConstantExpression(20, IntegerType()))
+        self.assertNotEqual(self.word(0), entry)
+        self.mem.unthread(instrs(self.code).instruction_addresses())
+        self.assertEqual(self.word(0), entry)
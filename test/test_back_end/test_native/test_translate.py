@@ -0,0 +1,62 @@
+__author__ = 'samyvilar'
+
+import os
+from tempfile import NamedTemporaryFile
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from back_end.emitter.cpu import CPU, VirtualMemory, evaluate, load_native
+from back_end.native.translate import build, is_shared_object
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations, instrs
+
+
+class TestTranslate(TestDeclarations):
+    code = """
+    struct triple {int first; int second; int third;};
+
+    int twice(int value) { return 2 * value; }
+
+    int classify(int value)
+    {
+        switch (value)
+        {
+            case 10: return 1;
+            case 20: return 2;
+            case -1: return 3;
+        }
+        return 0;
+    }
+
+    int main()
+    {
+        int index = 0, total = 0;
+        unsigned long long big = -1;
+        int (*func)(int) = twice;
+        struct triple triples[2], copy;
+        for (; index < 10; index++)
+            total += func(index);  /* 90 */
+        triples[1].first = 3, triples[1].second = 4, triples[1].third = 5;
+        copy = triples[1];  /* copied through the interpreter ... */
+        total += copy.first * copy.second - copy.third;  /* 97 */
+        total += classify(20) + classify(-1) + classify(30);  /* 102 */
+        int flag = 1;
+        flag += 2;  /* the local is still being pushed ... */
+        if (big > 1)  /* unsigned ... */
+            total += 1000 * flag;
+        return total;
+    }
+    """
+
+    def test_native(self):
+        with NamedTemporaryFile(suffix='.so', delete=False) as file_obj:
+            pass
+        try:
+            build(instrs(self.code), file_obj.name)
+            self.assertTrue(is_shared_object(file_obj.name))
+            self.cpu, self.mem = CPU(), VirtualMemory()
+            _ = load_native(file_obj.name, self.mem)
+            evaluate(self.cpu, self.mem)
+        finally:
+            os.remove(file_obj.name)
+        self.assert_base_element(ConstantExpression(3102, IntegerType()))
@@ -0,0 +1,114 @@
+__author__ = 'samyvilar'
+
+from StringIO import StringIO
+from unittest import TestCase
+
+from cc import instrs
+from back_end.linker.link import set_addresses
+from back_end.emitter.optimizer.cfg import control_flow_graph
+from back_end.virtual_machine.instructions.architecture import Pass, Push, Pop, Halt, RelativeJump, JumpFalse, Offset
+from back_end.virtual_machine.instructions.architecture import Address, AbsoluteJump, JumpTable, Call, AbsoluteCall
+from back_end.virtual_machine.instructions.architecture import Return, Enter, Leave, JumpIfEqualHalf
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
+
+
+class TestControlFlowGraph(TestCase):
+    location = '__test__'
+
+    def test_branch(self):
+        else_instr, end_instr = Pass(self.location), Pass(self.location)
+        branch = JumpFalse(self.location, Offset(else_instr, self.location))
+        skip = RelativeJump(self.location, Offset(end_instr, self.location))
+        instructions = (
+            Push(self.location, 1), branch, Push(self.location, 2), skip, else_instr, Push(self.location, 3), end_instr,
+            Halt(self.location)
+        )
+        graph = control_flow_graph(instructions)
+        self.assertEqual(len(graph), 4)
+        entry, then_block, else_block, end_block = graph.blocks
+        self.assertEqual(entry.successors, [then_block, else_block])
+        self.assertEqual(end_block.predecessors, [then_block, else_block])
+        self.assertIs(end_block.immediate_dominator, entry)
+        self.assertTrue(graph.dominates(entry, end_block))
+        self.assertFalse(graph.dominates(then_block, end_block))
+        self.assertEqual(graph.exits, [end_block])
+        self.assertEqual(graph.loops, [])
+
+    def test_compare_and_jump(self):
+        end_instr = Pass(self.location)
+        instructions = (
+            Push(self.location, 1), Push(self.location, 2),
+            JumpIfEqualHalf(self.location, Offset(end_instr, self.location)), Push(self.location, 3), end_instr,
+            Halt(self.location)
+        )
+        entry, fall_through, end_block = control_flow_graph(instructions).blocks
+        self.assertEqual(entry.successors, [fall_through, end_block])
+
+    def test_jump_table_and_call(self):
+        case_0, case_1, default, return_instr = Pass(self.location), Pass(self.location), Pass(self.location), \
+            Pass(self.location)
+        function = Pass(self.location)  # not part of the graph ...
+        instructions = (
+            JumpTable(self.location, {
+                0: Offset(case_0, self.location),
+                1: Offset(case_1, self.location),
+                'default': Offset(default, self.location)
+            }),
+            case_0, Push(self.location, Address(return_instr, self.location)),
+            RelativeJump(self.location, Offset(function, self.location)), return_instr, Pop(self.location),
+            case_1, AbsoluteJump(self.location),
+            default, Halt(self.location)
+        )
+        graph = control_flow_graph(instructions)
+        table, call, returned, case_1_block, default_block = graph.blocks
+        self.assertEqual(set(table.successors), {call, case_1_block, default_block})
+        self.assertEqual(call.successors, [returned])  # control returns from the call ...
+        self.assertEqual(returned.successors, [case_1_block])
+        self.assertEqual(case_1_block.successors, [])
+        self.assertEqual(set(graph.exits), {case_1_block, default_block})
+
+    def test_call_instructions(self):
+        function = Pass(self.location)  # not part of the graph ...
+        returned = Leave(self.location, 8)
+        instructions = (
+            Enter(self.location, 0), Call(self.location, Offset(function, self.location)), returned,
+            Enter(self.location, 0), Push(self.location, 0), AbsoluteCall(self.location), Leave(self.location, 8),
+            Return(self.location)
+        )
+        graph = control_flow_graph(instructions)
+        call, indirect_call, end = graph.blocks
+        self.assertEqual(call.successors, [indirect_call])  # control returns from both calls ...
+        self.assertIs(indirect_call.first, returned)
+        self.assertEqual(indirect_call.successors, [end])
+        self.assertEqual(graph.exits, [end])
+
+    def test_loop_nesting(self):
+        code = """
+        int main()
+        {
+            int i, j, total = 0;
+            for (i = 0; i < 3; i++)
+                for (j = 0; j < 3; j++)
+                    if (i == j)
+                        continue;
+                    else
+                        total += j;
+            while (total)
+                if (--total == 2)
+                    break;
+            return total;
+        }
+        """
+        for instructions in (
+            instrs((StringIO(code),)),
+            set_addresses(instrs((StringIO(code),))),
+            InstructionBuffer(instrs((StringIO(code),))),
+        ):
+            graph = control_flow_graph(instructions)
+            outer, inner, while_loop = graph.loops
+            self.assertIs(inner.parent, outer)
+            self.assertEqual(outer.children, [inner])
+            self.assertIsNone(while_loop.parent)
+            self.assertTrue(inner.blocks < outer.blocks)
+            self.assertEqual(max(block.loop_depth for block in graph), 2)
+            self.assertTrue(all(graph.dominates(loop.header, block) for loop in graph.loops for block in loop.blocks))
@@ -0,0 +1,28 @@
+__author__ = 'samyvilar'
+
+from unittest import TestCase
+
+from back_end.emitter.optimizer.dead_code import remove_unreachable
+from back_end.virtual_machine.instructions.architecture import Pass, Push, Pop, Halt, RelativeJump, JumpFalse, Offset
+from back_end.virtual_machine.instructions.architecture import Address, AbsoluteJump, Word
+
+
+class TestRemoveUnreachable(TestCase):
+    location = '__test__'
+
+    def test_remove_unreachable(self):
+        return_instr, end, data, function = Pass(self.location), Pass(self.location), Word(1, self.location), \
+            Pass(self.location)
+        skipped = JumpFalse(self.location, Offset(end, self.location))
+        instructions = (
+            Push(self.location, Address(return_instr, self.location)),
+            RelativeJump(self.location, Offset(function, self.location)),  # call, returns to return_instr ...
+            return_instr, Push(self.location, Address(data, self.location)), AbsoluteJump(self.location),
+            data,
+            Push(self.location, 1), skipped, Pop(self.location),  # unreachable ...
+            end, Halt(self.location),
+        )
+        self.assertEqual(
+            tuple(remove_unreachable(instructions)),
+            instructions[:6]
+        )
@@ -0,0 +1,110 @@
+__author__ = 'samyvilar'
+
+from StringIO import StringIO
+from unittest import TestCase
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from cc import instrs
+from back_end.emitter.cpu import evaluate, CPU, VirtualMemory
+from back_end.loader.load import load
+from back_end.emitter.optimizer.optimize import optimize, first_level_optimization
+from back_end.emitter.optimizer.peephole import peephole_optimization
+from back_end.emitter.optimizer.jumps import thread_jumps
+from back_end.virtual_machine.instructions.architecture import Push, Halt, RelativeJump, JumpFalse, JumpTrue, Offset
+from back_end.virtual_machine.instructions.architecture import JumpTable, Pop
+from back_end.virtual_machine.instructions.architecture import JumpIfLessSigned, JumpIfGreaterOrEqualSigned
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations
+
+
+class TestThreadJumps(TestCase):
+    location = '__test__'
+
+    def test_chain(self):
+        halt = Halt(self.location)
+        jump_1 = RelativeJump(self.location, Offset(halt, self.location))
+        jump_0 = RelativeJump(self.location, Offset(jump_1, self.location))
+        branch = JumpFalse(self.location, Offset(jump_0, self.location))
+        table = JumpTable(self.location, {0: Offset(jump_1, self.location), 'default': Offset(halt, self.location)})
+        instructions = (Push(self.location, 0), branch, table, jump_0, jump_1, halt)
+        self.assertEqual(thread_jumps(instructions), list(instructions))
+        self.assertIs(branch[0].obj, halt)
+        self.assertIs(jump_0[0].obj, halt)
+        self.assertIs(table.operands[-1].obj, halt)
+
+    def test_loop_of_jumps(self):
+        jump_0 = RelativeJump(self.location, None)
+        jump_1 = RelativeJump(self.location, Offset(jump_0, self.location))
+        jump_0[0] = Offset(jump_1, self.location)
+        branch = JumpFalse(self.location, Offset(jump_0, self.location))
+        _ = thread_jumps((Push(self.location, 0), branch, jump_0, jump_1, Halt(self.location)))
+        self.assertIn(branch[0].obj, (jump_0, jump_1))
+
+    def test_jump_over_jump(self):
+        halt, pop = Halt(self.location), Pop(self.location)
+        instructions = (
+            Push(self.location, 1),
+            JumpFalse(self.location, Offset(pop, self.location)),
+            RelativeJump(self.location, Offset(halt, self.location)),
+            pop,
+            halt
+        )
+        optimized = tuple(peephole_optimization(thread_jumps(instructions)))
+        self.assertEqual(len(optimized), 4)
+        self.assertIsInstance(optimized[1], JumpTrue)
+        self.assertIs(optimized[1][0].obj, halt)
+
+    def test_compare_and_jump_over_jump(self):
+        halt, pop = Halt(self.location), Pop(self.location)
+        instructions = (
+            Push(self.location, 1),
+            Push(self.location, 2),
+            JumpIfLessSigned(self.location, Offset(pop, self.location)),
+            RelativeJump(self.location, Offset(halt, self.location)),
+            pop,
+            halt
+        )
+        optimized = tuple(peephole_optimization(thread_jumps(instructions)))
+        self.assertEqual(len(optimized), 5)
+        self.assertIsInstance(optimized[2], JumpIfGreaterOrEqualSigned)
+        self.assertIs(optimized[2][0].obj, halt)
+
+
+class TestThreadedPrograms(TestDeclarations):
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(
+            InstructionBuffer(instrs(
+                (StringIO(code),),
+                optimizer=lambda i: peephole_optimization(thread_jumps(optimize(i, first_level_optimization)))
+            )),
+            self.mem
+        )
+        evaluate(self.cpu, self.mem)
+
+    def test_break_continue(self):
+        code = """
+        int main()
+        {
+            int index = 0, total = 0;
+            while (1)
+            {
+                if (index == 10)
+                    break;
+                if (index++ & 1)
+                    continue;
+                else if (index > 4)
+                {
+                    if (index > 6)
+                        total += 2;
+                }
+                else
+                    total += 1;
+            }
+            return total;
+        }
+        """
+        self.evaluate(code)
+        self.assert_base_element(ConstantExpression(6, IntegerType()))
@@ -0,0 +1,113 @@
+__author__ = 'samyvilar'
+
+import weakref
+from StringIO import StringIO
+from unittest import TestCase
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from cc import instrs
+from back_end.emitter.cpu import evaluate, CPU, VirtualMemory
+from back_end.loader.load import load
+from back_end.emitter.optimizer.optimize import optimize, first_level_optimization
+from back_end.virtual_machine.instructions.architecture import Pass, Push, Allocate, RelativeJump, Offset, Halt
+from back_end.virtual_machine.instructions.architecture import AddressOfLocal, LoadSingleHalf, SetSingleOneEighth
+from back_end.virtual_machine.instructions.architecture import LoadLocalHalf, StoreLocalOneEighth, PostfixUpdate
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations
+
+
+class TestOptimize(TestCase):
+    def test_references_rebound(self):
+        location = '__test__'
+        target, push = Pass(location), Push(location, 1)
+        jump = RelativeJump(location, Offset(target, location))
+        dropped_refs = []
+
+        def instructions():
+            yield jump
+            dropped = Pass(location)
+            dropped_refs.append(weakref.ref(dropped))
+            yield dropped
+            del dropped
+            for instr in (target, Allocate(location, 0), Allocate(location, 0), push, Halt(location)):
+                yield instr
+
+        optimized = optimize(instructions(), first_level_optimization)
+        self.assertEqual(next(optimized), jump)
+        self.assertEqual(next(optimized), push)
+        self.assertIsNone(dropped_refs[0]())  # unreferenced instructions are freed as soon as they're dropped ...
+        self.assertEqual(tuple(optimized), (Halt(location),))
+        self.assertIs(jump[0].obj, push)  # Pass, Allocates removed, so jump now references the Push
+
+    def test_fuse_local_access(self):
+        location = '__test__'
+        load_addr, update_addr = AddressOfLocal(location, -4), AddressOfLocal(location, -16)
+        jump = RelativeJump(location, Offset(load_addr, location))
+        optimized = tuple(optimize(
+            iter((
+                jump, load_addr, LoadSingleHalf(location),
+                AddressOfLocal(location, -5), SetSingleOneEighth(location),
+                update_addr, PostfixUpdate(location, 1), Halt(location)
+            )),
+            first_level_optimization
+        ))
+        self.assertEqual(optimized, (
+            jump, LoadLocalHalf(location, -4), StoreLocalOneEighth(location, -5),
+            update_addr, PostfixUpdate(location, 1), Halt(location)
+        ))
+        self.assertIs(jump[0].obj, optimized[1])
+
+
+class TestOptimizedPrograms(TestDeclarations):
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(
+            InstructionBuffer(instrs((StringIO(code),), optimizer=lambda i: optimize(i, first_level_optimization))),
+            self.mem
+        )
+        evaluate(self.cpu, self.mem)
+
+    def test_first_level_optimization(self):
+        code = """
+        int main()
+        {
+            int index = 0, total = 0;
+            start:
+            {
+                int a, b, c;
+                for (a = 0; a < 3; a++)
+                    if (a == 1)
+                        continue;
+                    else
+                        total += a;
+            }
+            if (++index < 5)
+                goto start;
+            return total;
+        }
+        """
+        self.evaluate(code)
+        self.assert_base_element(ConstantExpression(10, IntegerType()))
+
+    def test_local_variables(self):
+        code = """
+        struct pair {char a; short b;};
+        int main()
+        {
+            char c = -3;
+            short s = 300;
+            float f = 1.5;
+            double d = 2.25;
+            long l = 1L << 40;
+            struct pair p;
+            p.a = c;
+            p.b = s;
+            f *= 2;
+            d += f;
+            return (int)(d * 4) + p.a + p.b + (l >> 40) + (int)&p.b - (int)&p;  /* 21 - 3 + 300 + 1 + 1 (packed) */
+        }
+        """
+        self.evaluate(code)
+        self.assert_base_element(ConstantExpression(320, IntegerType()))
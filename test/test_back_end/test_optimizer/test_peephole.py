@@ -0,0 +1,116 @@
+__author__ = 'samyvilar'
+
+from StringIO import StringIO
+from unittest import TestCase
+
+from front_end.parser.ast.expressions import ConstantExpression, IntegerType
+
+from cc import instrs
+from back_end.emitter.cpu import evaluate, CPU, VirtualMemory
+from back_end.loader.load import load
+from back_end.emitter.optimizer.optimize import optimize, first_level_optimization
+from back_end.emitter.optimizer.peephole import peephole_optimization, peephole_rules, hit_counts, reset_hit_counts
+from back_end.virtual_machine.instructions.architecture import Push, Pop, Add, Subtract, Multiply, DupSingle, Halt
+from back_end.virtual_machine.instructions.architecture import SwapSingle, RelativeJump, JumpFalse, Offset, Pass
+from back_end.virtual_machine.instructions.architecture import AddressOfLocal, LoadSingleQuarter, LoadLocalQuarter
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
+
+from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations
+
+
+class TestPeephole(TestCase):
+    location = '__test__'
+
+    def setUp(self):
+        reset_hit_counts()
+
+    def test_fold_constants(self):
+        instructions = (
+            Push(self.location, 2), Push(self.location, 3), Add(self.location),
+            Push(self.location, 4), Multiply(self.location),
+            Push(self.location, 1), Push(self.location, 21), Subtract(self.location),
+            Add(self.location),
+            Halt(self.location)
+        )
+        self.assertEqual(tuple(peephole_optimization(instructions)), (Push(self.location, 0), Halt(self.location)))
+        self.assertEqual(hit_counts()['fold_add'], 2)
+        self.assertEqual(hit_counts()['fold_multiply'], 1)
+        self.assertEqual(hit_counts()['fold_subtract'], 1)
+
+    def test_local_member_access(self):  # folding the members offset exposes the fused load ...
+        instructions = (
+            AddressOfLocal(self.location, -16), Push(self.location, 2), Add(self.location),
+            LoadSingleQuarter(self.location), Halt(self.location)
+        )
+        self.assertEqual(
+            tuple(peephole_optimization(instructions)), (LoadLocalQuarter(self.location, -14), Halt(self.location))
+        )
+        self.assertEqual(hit_counts()['combine_local_offset'], 1)
+        self.assertEqual(hit_counts()['fuse_local_access'], 1)
+
+    def test_fixed_point(self):  # removing the Swaps exposes the Dup/Pop which in turn exposes the Push/Pop
+        instructions = (
+            Push(self.location, 1), DupSingle(self.location), SwapSingle(self.location), SwapSingle(self.location),
+            Pop(self.location), Pop(self.location), Push(self.location, 0), Add(self.location), Halt(self.location)
+        )
+        self.assertEqual(tuple(peephole_optimization(instructions)), (Halt(self.location),))
+
+    def test_jump_targets(self):
+        target = Push(self.location, 3)
+        jump = JumpFalse(self.location, Offset(target, self.location))
+        push = Push(self.location, 2)
+        instructions = (push, jump, Push(self.location, 1), target, Add(self.location), Halt(self.location))
+        optimized = tuple(peephole_optimization(instructions))
+        self.assertEqual(optimized, instructions)  # Push 1; Push 3; Add can't be folded, 3 is a jump target ...
+        self.assertIs(jump[0].obj, target)
+
+    def test_jump_target_rebound(self):
+        target = Pass(self.location)
+        jump_0 = RelativeJump(self.location, Offset(target, self.location))
+        halt = Halt(self.location)
+        jump_1 = JumpFalse(self.location, Offset(target, self.location))
+        pop = Pop(self.location)
+        instructions = jump_1, pop, jump_0, target, Push(self.location, 0), Add(self.location), halt
+        optimized = tuple(peephole_optimization(instructions))
+        self.assertEqual(optimized, (jump_1, pop, halt))  # jump_0 to the next instruction and Push 0; Add removed ...
+        self.assertIs(jump_1[0].obj, halt)
+        self.assertEqual(hit_counts()['remove_jump_to_next'], 1)
+
+    def test_rules_are_registered(self):
+        names = set(rule.name for rule in peephole_rules)
+        self.assertTrue({'fold_add', 'remove_push_pop', 'remove_dup_pop', 'remove_swap_single_swap_single'} <= names)
+
+
+class TestPeepholeOptimizedPrograms(TestDeclarations):
+    def evaluate(self, code):
+        self.cpu, self.mem = CPU(), VirtualMemory()
+        load(
+            InstructionBuffer(instrs(
+                (StringIO(code),),
+                optimizer=lambda i: peephole_optimization(optimize(i, first_level_optimization))
+            )),
+            self.mem
+        )
+        evaluate(self.cpu, self.mem)
+
+    def test_second_level_optimization(self):
+        code = """
+        int main()
+        {
+            int index = 0, total = 0, values[4] = {1, 2, 3, 4};
+            start:
+            {
+                int a;
+                for (a = 0; a < 4; a++)
+                    if (a == 1)
+                        continue;
+                    else
+                        total += values[a] * 1 + 0;
+            }
+            if (++index < 5)
+                goto start;
+            return total;
+        }
+        """
+        self.evaluate(code)
+        self.assert_base_element(ConstantExpression(40, IntegerType()))
@@ -13,10 +13,34 @@ from back_end.loader.load import load
 from back_end.emitter.system_calls import CALLS
 from test.test_back_end.test_emitter.test_declarations.test_definitions import TestDeclarations
 
+try:  # the C virtual machine ...
+    from back_end.emitter.cpu import checkpoint, reset
+except ImportError as _:  # python machine, every test gets a new memory ...
+    checkpoint = reset = None
+
 
 class TestStdLib(TestDeclarations):
+    machine = None  # (memory, checkpoint of it before anything was loaded) shared by every test ...
+
+    @staticmethod
+    def memory():  # the shared memory, reset by releasing the pages touched since the checkpoint ...
+        if reset is None:  # python machine ...
+            return VirtualMemory()
+        if TestStdLib.machine is None:
+            mem = VirtualMemory()
+            TestStdLib.machine = mem, checkpoint(CPU(), mem)
+        mem, state = TestStdLib.machine
+        reset(state, CPU(), mem)
+        return mem
+
+    def setUp(self):  # every test starts from an empty memory, whatever the last one did (or failed to do) ...
+        self.empty_memory = self.memory()
+
+    def tearDown(self):
+        self.memory()
+
     def evaluate(self, code, cpu=None, mem=None, os=None):
-        self.cpu, self.mem, self.os = cpu or CPU(), mem or VirtualMemory(), os or Kernel(CALLS)
+        self.cpu, self.mem, self.os = cpu or CPU(), mem or self.empty_memory, os or Kernel(CALLS)
         load(set_addresses(
             instrs(
                 (StringIO(code),),
@@ -25,6 +25,7 @@ class TestPrintf(TestStdLib):
     def tearDown(self):
         for file_obj in self.os.opened_files.itervalues():
             file_obj.close()
+        super(TestPrintf, self).tearDown()
 
     def test_printf_string(self):
         code = """
@@ -0,0 +1,72 @@
+__author__ = 'samyvilar'
+
+import os
+import sys
+import shutil
+import subprocess
+from unittest import TestCase
+from tempfile import NamedTemporaryFile, mkdtemp
+
+import back_end.loader.image as image
+
+curr_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestCC(TestCase):
+    code = """
+    #include <stdio.h>
+
+    int square(int value) { return value * value; }
+
+    int main()
+    {
+        printf("%i\\n", square(12));
+        return 0;
+    }
+    """
+
+    def setUp(self):
+        with NamedTemporaryFile(suffix='.c', delete=False) as file_obj:
+            file_obj.write(self.code)
+        self.file_name = file_obj.name
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    @staticmethod
+    def start_script(script, args, directory=curr_dir):  # (exit code, stdout, stderr) ...
+        process = subprocess.Popen(
+            (sys.executable, os.path.join(directory, script)) + args,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=directory
+        )
+        output, errors = process.communicate()
+        return process.returncode, output, errors
+
+    def run_script(self, script, args, directory=curr_dir):
+        exit_code, output, errors = self.start_script(script, args, directory)
+        self.assertEqual(exit_code, 0, errors)
+        return output
+
+    def cc(self, *args):
+        return self.run_script('cc.py', args)
+
+    def test_vm(self):  # compile, link and run the instructions in one go ...
+        self.assertEqual(self.cc(self.file_name, '--vm'), '144\n')
+
+    def test_without_libvm(self):  # same image whether or not the C virtual machine can be loaded ...
+        temp_dir = mkdtemp()
+        try:
+            directory = os.path.join(temp_dir, 'package')
+            shutil.copytree(curr_dir, directory, ignore=shutil.ignore_patterns('.git', '*.pyc', 'libvm.so'))
+            file_names = os.path.join(temp_dir, 'python.img'), os.path.join(temp_dir, 'c.img')
+            self.run_script('cc.py', (self.file_name, '-o', file_names[0]), directory)
+            self.cc(self.file_name, '-o', file_names[1])
+            self.assertEqual(self.run_script('vm.py', (file_names[0], '--python'), directory), '144\n')
+            self.assertEqual(self.run_script('cc.py', (self.file_name, '--vm'), directory), '144\n')
+            exit_code, output, errors = self.start_script('vm.py', (file_names[0],), directory)  # C only ...
+            self.assertEqual((exit_code, output), (2, ''))
+            self.assertIn('the C virtual machine (libvm) is unavailable', errors)
+            with image.read(file_names[0]) as python_image, image.read(file_names[1]) as c_image:
+                self.assertEqual(python_image.words(), c_image.words())
+        finally:
+            shutil.rmtree(temp_dir)
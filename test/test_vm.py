@@ -0,0 +1,89 @@
+__author__ = 'samyvilar'
+
+import os
+import sys
+import shutil
+import subprocess
+import resource
+from unittest import TestCase
+from tempfile import mkdtemp
+
+from vm import batch
+
+curr_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBatch(TestCase):
+    code = """
+    #include <stdio.h>
+
+    extern long long __read__(long long, char *, unsigned long long);
+
+    int runs = 0;
+
+    int main()
+    {
+        char value[1] = {'0'};
+        __read__(0, value, 1);
+        runs++;
+        printf("%c %i\\n", value[0], runs);
+        return value[0] - '0';
+    }
+    """
+
+    def setUp(self):
+        self.dir_name = mkdtemp()
+        self.file_name = os.path.join(self.dir_name, 'main.c')
+        with open(self.file_name, 'w') as file_obj:
+            file_obj.write(self.source())
+        process = subprocess.Popen(
+            (sys.executable, os.path.join(curr_dir, 'cc.py'), self.file_name, '-o', self.file_name + '.out'),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=curr_dir
+        )
+        _, errors = process.communicate()
+        self.assertEqual(process.returncode, 0, errors)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_name)
+
+    def source(self):
+        return self.code
+
+    def inputs(self, values):
+        for index, value in enumerate(values):
+            input_file_name = os.path.join(self.dir_name, 'input_{0}'.format(index))
+            with open(input_file_name, 'wb') as input_file:
+                input_file.write(value)
+            yield input_file_name
+
+    def test_batch(self):  # each run gets its own stdin, stdout and exit code, from the same initial globals ...
+        values = '3', '7', '1', '4', '0'
+        input_file_names = list(self.inputs(values))
+        self.assertEqual(
+            list(batch(self.file_name + '.out', input_file_names, processes=2, number_of_words=1 << 24)),
+            [(name, '{0} 1\n'.format(value), int(value)) for name, value in zip(input_file_names, values)]
+        )
+
+
+class TestBatchFiles(TestBatch):  # files opened by a run are closed before the next one ...
+    code = """
+    #include <stdio.h>
+
+    int main()
+    {
+        return fopen("%s", "r") == NULL;
+    }
+    """
+
+    def source(self):  # (opens itself) ...
+        return self.code % self.file_name
+
+    def test_batch(self):  # more runs per worker than it can have opened files ...
+        limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+        input_file_names = list(self.inputs(('',) * 256))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (64, limits[1]))
+        try:
+            exit_codes = [exit_code for _, _, exit_code in batch(self.file_name + '.out', input_file_names, 2)]
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, limits)
+        self.assertEqual(exit_codes, [0] * len(input_file_names))
@@ -5,40 +5,256 @@ import argparse
 import os
 import inspect
 import sys
+from multiprocessing import Pool
+from tempfile import TemporaryFile
+from shutil import copyfileobj
 
 try:
     import cPickle as pickle
 except ImportError as _:
     import pickle
 
-from back_end.emitter.cpu import CPU, VirtualMemory, Kernel, evaluate
-from back_end.linker.link import set_addresses
+from back_end.emitter.cpu import CPU, VirtualMemory, Kernel, evaluate, base_element, word_type_factories
+from back_end.virtual_machine.instructions.buffer import InstructionBuffer
 from back_end.emitter.system_calls import CALLS
 from back_end.loader.load import load
+import back_end.loader.image as image
+from back_end.native.translate import is_shared_object
+import back_end.emitter.blocks as blocks
+from back_end.virtual_machine.hot_spots import HotSpots
+
+try:  # the C virtual machine (libvm), without it programs can only be run on the python one (--python) ...
+    from back_end.emitter.cpu import load_image, load_native, checkpoint, restore, resume, run_until
+    c_virtual_machine = True
+except ImportError as _:
+    c_virtual_machine = False
 
 
 curr_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 sys.path.append(curr_dir)
 
 
-def start(instrs):
-    mem = VirtualMemory()
+def memory_options(number_of_words):  # default address space unless given ...
+    return {} if number_of_words is None else {'number_of_words': number_of_words}
+
+
+def memory(number_of_words):  # the loaded values aren't kept by python, only their locations ...
+    return VirtualMemory(keep_code=False, **memory_options(number_of_words))
+
+
+def print_profile(profile, top=20, file_obj=sys.stderr):  # the most executed instructions and addresses ...
+    total = sum(profile.instructions.itervalues()) or 1
+    for title, counts, name in (
+        ('instruction', profile.instructions, lambda instr_type: getattr(instr_type, '__name__', instr_type)),
+        ('address', profile.addresses, str)
+    ):
+        print >> file_obj, '{0:>40} {1:>16} {2:>8}'.format(title, 'executions', '%')
+        for key, count in sorted(counts.iteritems(), key=lambda item: item[1], reverse=True)[:top]:
+            print >> file_obj, '{0:>40} {1:>16} {2:>8.2f}'.format(name(key), count, 100.0 * count / total)
+
+
+def report_profile(profile, text=True, callgrind=None, file_obj=sys.stderr):
+    # the hottest functions and source lines, from the locations and symbols of the loaded program ...
+    hot_spots = HotSpots(profile)
+    if text:
+        print_profile(profile, file_obj=file_obj)
+        hot_spots.report(file_obj)
+    if callgrind is not None:
+        with open(callgrind, 'w') as callgrind_file:
+            hot_spots.callgrind(callgrind_file)
+
+
+def run(cpu, mem, os, runs=1, address=None, profile=False, callgrind=None):
+    # evaluate the loaded program runs times, each run restores a checkpoint of the machine taken once loaded
+    # or, given an address, once it reached it (skipping whatever warm up precedes it) ...
+    if profile or callgrind is not None:
+        mem.profiled()
+    if runs == 1 and address is None:
+        evaluate(cpu, mem, os)
+    else:
+        if address is not None:
+            run_until(cpu, mem, address, os)
+        state = checkpoint(cpu, mem, os)
+        for _ in xrange(runs):
+            restore(state, cpu, mem, os)
+            (evaluate if address is None else resume)(cpu, mem, os)
+        state.close()
+    if profile or callgrind is not None:
+        report_profile(mem.profile, profile, callgrind)
+
+
+def start(instrs, threaded=False, number_of_words=None, runs=1, address=None, profile=False, callgrind=None):
+    # instrs is either an InstructionBuffer or the linked instructions (cc.py --vm) ...
+    instrs = instrs if isinstance(instrs, InstructionBuffer) else InstructionBuffer(instrs)
+    mem = memory(number_of_words)
+    cpu = CPU()
+    os = Kernel(CALLS)
+    load(instrs, mem)
+    if threaded:
+        mem.thread(instrs.instruction_addresses())
+    run(cpu, mem, os, runs, address, profile, callgrind)
+
+
+def start_image(file_name, threaded=False, number_of_words=None, runs=1, address=None, profile=False, callgrind=None):
+    mem = memory(number_of_words)
+    cpu = CPU()
+    os = Kernel(CALLS)
+    with image.read(file_name) as executable:
+        load_image(executable, mem)
+    if threaded:  # images don't record which words are instructions, so they are threaded as they are executed ...
+        mem.thread()
+    run(cpu, mem, os, runs, address, profile, callgrind)
+
+
+def start_python(file_name=None, instrs=None, number_of_words=None):  # basic blocks compiled to python ...
+    mem = blocks.PagedMemory(**memory_options(number_of_words))
+    cpu = blocks.CPU()
+    if file_name is None:
+        load(instrs, mem)
+    else:
+        with image.read(file_name) as executable:
+            blocks.load_image(executable, mem)
+    blocks.evaluate(cpu, mem, blocks.Kernel())
+
+
+def start_native(file_name, number_of_words=None, runs=1):  # shared object translated by cc.py --native ...
+    mem = memory(number_of_words)
     cpu = CPU()
     os = Kernel(CALLS)
-    load(set_addresses(instrs), mem)
+    load_native(file_name, mem)
+    run(cpu, mem, os, runs)
+
+
+def load_program(file_name, threaded=False, number_of_words=None):  # image, native or pickled instructions ...
+    mem = memory(number_of_words)
+    if image.is_image(file_name):
+        with image.read(file_name) as executable:
+            load_image(executable, mem)
+        if threaded:
+            mem.thread()
+    elif is_shared_object(file_name):
+        load_native(file_name, mem)
+    else:
+        with open(file_name) as input_file:
+            instrs = InstructionBuffer(pickle.load(input_file))
+        load(instrs, mem)
+        if threaded:
+            mem.thread(instrs.instruction_addresses())
+    return mem
+
+
+batch_machine = None  # (cpu, mem, kernel, checkpoint) of a worker, only ever set within it, by batch_worker ...
+
+
+def batch_worker(cpu, mem, state):
+    # Pool initializer, each worker is forked with its own copy of the machine (and of its checkpoint) along with
+    # its own kernel, whose stdin and stdout are re-written by each run, the kernel is checkpointed so that
+    # restoring the machine closes the files opened by the previous run ...
+    global batch_machine
+    os = Kernel(CALLS, open_files=((0, TemporaryFile()), (1, TemporaryFile()), (2, sys.stderr)))
+    state.files = os.checkpoint()
+    batch_machine = cpu, mem, os, state
+
+
+def batch_run(input_file_name):  # run the program once on a single input, from the loaded machines checkpoint ...
+    cpu, mem, os, state = batch_machine
+    stdin, stdout = os.opened_files[0], os.opened_files[1]
+    for file_obj in stdin, stdout:
+        file_obj.seek(0)
+        file_obj.truncate()
+    with open(input_file_name, 'rb') as input_file:
+        copyfileobj(input_file, stdin)
+    stdin.flush()
+    restore(state, cpu, mem, os)  # (rewinds stdin and stdout) ...
     evaluate(cpu, mem, os)
+    stdout.seek(0)
+    return input_file_name, stdout.read(), base_element(cpu, mem, word_type_factories['signed_half_word'])
+
+
+def batch(file_name, input_file_names, processes=None, threaded=False, number_of_words=None):
+    # run the program on each input (as its stdin) yielding (input file name, stdout, exit code) in order,
+    # the program is loaded and relocated once, each worker (process) forks a copy of the machine restoring its
+    # checkpoint (copy on write) before every run ...
+    mem = load_program(file_name, threaded, number_of_words)
+    state = checkpoint(CPU(), mem)
+    pool = Pool(processes, batch_worker, (CPU(), mem, state))
+    try:
+        for result in pool.imap(batch_run, input_file_names):
+            yield result
+    finally:
+        pool.terminate()
+        state.close()
+
+
+def start_batch(file_name, input_file_names, output_dir=None, processes=None, threaded=False, number_of_words=None):
+    # write the stdout of every run next to its input (or in output_dir) as <input>.out, reporting its exit code ...
+    for input_file_name, output, exit_code in batch(file_name, input_file_names, processes, threaded, number_of_words):
+        output_file_name = input_file_name + '.out'
+        if output_dir is not None:
+            output_file_name = os.path.join(output_dir, os.path.basename(output_file_name))
+        with open(output_file_name, 'wb') as output_file:
+            output_file.write(output)
+        print '{0} {1}'.format(input_file_name, exit_code)
 
 
 def main():
     cli = argparse.ArgumentParser(description='Virtual Machine')
-    cli.add_argument('binary_file', nargs=1, help='Executable file (pickled list of Instruction of objects...)')
+    cli.add_argument(
+        'binary_file', nargs=1,
+        help='Executable file (image, native shared object or pickled list of Instruction of objects...)'
+    )
+    cli.add_argument('--threaded', action='store_true', default=False,
+                     help='Replace instruction ids by the address of their implementation (C virtual machine only).')
+    cli.add_argument('--python', action='store_true', default=False,
+                     help='Run on the python virtual machine, compiling each basic block to python.')
+    cli.add_argument('--address-space', type=lambda value: int(value, 0), default=None, dest='number_of_words',
+                     help='Number of addressable words of the machine, (default 1 << 32), the stack starts at its end.')
+    cli.add_argument('--runs', type=int, default=1,
+                     help='Run the program this many times, restoring a checkpoint of the machine before each run '
+                          '(C virtual machine only).')
+    cli.add_argument('--checkpoint-at', type=lambda value: int(value, 0), default=None, dest='address',
+                     help='Checkpoint once the instruction at this (virtual) address is reached, each run resuming '
+                          'from it (C virtual machine only, not native programs).')
+    cli.add_argument('--profile', action='store_true', default=False,
+                     help='Count the executions of every instruction and call, printing the most executed instruction '
+                          'types, addresses, functions and source lines (C virtual machine only, not native programs).')
+    cli.add_argument('--callgrind', default=None, metavar='FILE',
+                     help='Profile, writing the counts by function and source line to FILE in callgrind format '
+                          '(kcachegrind, callgrind_annotate).')
+    cli.add_argument('--batch', nargs='+', default=None, metavar='INPUT',
+                     help='Run the program once per input file (as its stdin) across a pool of processes, '
+                          'writing each stdout to INPUT.out and printing its exit code (C virtual machine only).')
+    cli.add_argument('--output-dir', default=None,
+                     help='Directory of the batch outputs (default next to each input).')
+    cli.add_argument('--processes', type=int, default=None,
+                     help='Number of batch processes (default number of cpus).')
 
     args = cli.parse_args()
 
-    with open(args.binary_file[0]) as input_file:
-        instrs = pickle.load(input_file)
+    if not c_virtual_machine and (args.batch or not args.python or is_shared_object(args.binary_file[0])):
+        cli.error(
+            'the C virtual machine (libvm) is unavailable, build it (make vm) '
+            'or run the program on the python virtual machine (--python, images and pickled instructions only)'
+        )
 
-    start(instrs)
+    if args.batch:
+        return start_batch(
+            args.binary_file[0], args.batch, args.output_dir, args.processes, args.threaded, args.number_of_words
+        )
+    if args.python and image.is_image(args.binary_file[0]):
+        start_python(args.binary_file[0], number_of_words=args.number_of_words)
+    elif image.is_image(args.binary_file[0]):
+        start_image(args.binary_file[0], args.threaded, args.number_of_words, args.runs, args.address, args.profile,
+                    args.callgrind)
+    elif is_shared_object(args.binary_file[0]):
+        start_native(args.binary_file[0], args.number_of_words, args.runs)
+    else:
+        with open(args.binary_file[0]) as input_file:
+            instrs = InstructionBuffer(pickle.load(input_file))  # the instructions themselves aren't kept ...
+        if args.python:
+            start_python(instrs=instrs, number_of_words=args.number_of_words)
+        else:
+            start(instrs, args.threaded, args.number_of_words, args.runs, args.address, args.profile, args.callgrind)
 
 
 if __name__ == '__main__':